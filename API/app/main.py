@@ -1,16 +1,122 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import Response
 from dotenv import load_dotenv
 import os
-from app.routers import file_ops, scan_ops, exec_ops
+from app.routers import file_ops, scan_ops, exec_ops, job_ops
+from app.services import index_service, job_service, session_service, scan_service
+from app.utils.common import create_response, logger, FastJSONResponse
+from app.utils.dispatch import check_pool_config, pool_stats, shutdown_pools, set_process_preload, warm_pool, run_in_pool
+from app.utils import metrics, profiling, compression
 
 load_dotenv()
-app = FastAPI(title="Remote Ops API")
+app = FastAPI(title="Remote Ops API", default_response_class=FastJSONResponse,
+              dependencies=[Depends(metrics.track_in_flight)])
+startup_info = {"import_seconds": round(time.perf_counter() - _import_started, 4), "preload": {}}
+
+# Nén response theo Accept-Encoding (middleware trong cùng, nên thời gian nén được tính vào độ trễ ở /metrics)
+app.add_middleware(compression.CompressionMiddleware)
+# Đếm request, độ trễ và số request đang xử lý theo route (xuất ở /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+if profiling.PROFILING_ENABLED:
+    # Profile từng request theo yêu cầu (header X-Profile hoặc ?profile=), xem /system/profiles
+    app.add_middleware(profiling.ProfilingMiddleware)
 
 # Đăng ký các router
 app.include_router(file_ops.router, prefix="/files", tags=["FileOps"])
 app.include_router(scan_ops.router, prefix="/scan", tags=["ScanOps"])
 app.include_router(exec_ops.router, prefix="/exec", tags=["ExecOps"])
+app.include_router(job_ops.router, prefix="/jobs", tags=["Jobs"])
+
+@app.on_event("startup")
+def check_worker_pools():
+    # Báo lỗi cấu hình pool (ví dụ IO_POOL_KIND=process) khi khởi động thay vì ở request đầu tiên
+    check_pool_config()
+
+@app.on_event("startup")
+def preload_parsers():
+    # Worker của pool cpu được fork từ forkserver đã import sẵn scan_service (và các parser trong PRELOAD_PARSERS);
+    # process chính import sẵn các parser trong PRELOAD_PARSERS (mặc định: import khi dùng lần đầu)
+    modules = scan_service.preload_modules()
+    set_process_preload(["app.services.scan_service"] + modules)
+    if modules:
+        # Khởi động pool cpu ngay (forkserver import các parser ở nền) thay vì ở request đầu tiên
+        warm_pool("cpu")
+        startup_info["preload"] = scan_service.preload_parsers()
+        logger.info(f"Preloaded parsers: {startup_info['preload']}")
+
+@app.on_event("startup")
+def start_metadata_index():
+    # Crawl ban đầu + inotify cho chỉ mục metadata (chỉ khi METADATA_INDEX_ENABLED=true)
+    index_service.start()
+
+@app.on_event("startup")
+def start_job_scheduler():
+    # Khôi phục job dở dang từ lần chạy trước và bắt đầu lấy job trong hàng đợi
+    job_service.start()
+
+@app.on_event("shutdown")
+def shutdown_worker_pools():
+    # Dừng các worker pool (thread/process) khi tắt server
+    job_service.stop()
+    session_service.close_all()
+    shutdown_pools(wait=False)
+    index_service.stop()
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to Remote Ops API"} 
\ No newline at end of file
+    return {"message": "Welcome to Remote Ops API"}
+
+@app.get("/system/pools", summary="Thống kê worker pool")
+def get_pool_stats():
+    """
+    Trả về độ sâu hàng đợi, số tác vụ đang chạy và thời gian chờ của từng worker pool (io, cpu, exec).
+    """
+    return create_response(True, "Pool statistics retrieved successfully", pool_stats())
+
+@app.get("/system/startup", summary="Thời gian khởi động và thư viện đã nạp")
+def get_startup_info():
+    """
+    Thời gian import ứng dụng, thời gian import sẵn các parser (PRELOAD_PARSERS)
+    và các parser đã được import trong process này.
+    """
+    return create_response(True, "Startup information retrieved successfully",
+                           {**startup_info, "loaded_parsers": scan_service.loaded_parsers()})
+
+@app.get("/metrics", summary="Metric theo định dạng Prometheus")
+async def get_metrics():
+    """
+    Số request, histogram độ trễ và số request đang xử lý theo route; số byte đọc/ghi của file ops;
+    thời gian phân tích theo parser; thời gian khởi tạo/chạy và CPU của process con; thống kê pool, cache, job, session.
+    Mỗi worker (WORKERS > 1) có bộ đếm riêng.
+    """
+    content = await run_in_pool("io", metrics.render)
+    return Response(content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _require_profiling():
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING_ENABLED=true)")
+
+@app.get("/system/profiles", summary="Danh sách profile đã lưu")
+async def list_profiles():
+    """
+    Các profile được tạo bởi request có header X-Profile (hoặc ?profile=sample|trace), mới nhất trước.
+    """
+    _require_profiling()
+    result = await run_in_pool("io", profiling.list_profiles)
+    return create_response(True, "Profiles retrieved successfully", result)
+
+@app.get("/system/profiles/{profile_id}", summary="Tải profile (collapsed stacks)")
+async def get_profile(profile_id: str):
+    """
+    Profile dạng collapsed stacks ("hàm;hàm;hàm trọng_số" mỗi dòng), mở được bằng speedscope,
+    flamegraph.pl hoặc inferno-flamegraph. Trọng số là số mẫu (sample) hoặc micro giây (trace).
+    """
+    _require_profiling()
+    result = await run_in_pool("io", profiling.read_profile, profile_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    name, content = result
+    return Response(content, media_type="text/plain; charset=utf-8",
+                    headers={"Content-Disposition": f'attachment; filename="{name}"'})
\ No newline at end of file
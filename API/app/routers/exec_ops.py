@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Query, Body, HTTPException
-from typing import Optional, Dict, Any
-from app.services import exec_service
-from app.utils.common import create_response
+from fastapi import APIRouter, Query, Body, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import Optional, Dict, Any, List
+from app.services import exec_service, session_service
+from app.utils.common import create_response, json_bytes, logger
+from app.utils.dispatch import run_in_pool
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -10,13 +12,35 @@ class CommandRequest(BaseModel):
     command: str
     timeout: Optional[int] = None
 
+class StreamCommandRequest(CommandRequest):
+    shell_type: Optional[str] = None
+    max_output: Optional[int] = None
+    tail_lines: Optional[int] = None
+
+class BatchCommandRequest(BaseModel):
+    commands: List[CommandRequest]
+    concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    shell_type: Optional[str] = None
+    stream: bool = False
+
+class SessionRequest(BaseModel):
+    shell_type: Optional[str] = None
+    cwd: Optional[str] = None
+    env: Optional[Dict[str, str]] = None
+
+async def _iter_sse(events):
+    # Định dạng Server-Sent Events: "event: <loại>" + "data: <json>"
+    async for event in events:
+        yield b"event: " + str(event["event"]).encode("utf-8") + b"\ndata: " + json_bytes(event) + b"\n\n"
+
 @router.post("/cmd", summary="Thực thi lệnh shell/bash")
 async def execute_command(request: CommandRequest):
     """
     Thực thi lệnh shell/bash và trả về kết quả.
     Ví dụ: ls -la, cat file.txt, mkdir folder, ...
     """
-    result = exec_service.execute_command(request.command, request.timeout)
+    result = await run_in_pool("exec", exec_service.execute_command, request.command, request.timeout)
     
     message = "Command executed successfully"
     if not result["success"]:
@@ -30,7 +54,7 @@ async def execute_powershell(request: CommandRequest):
     Thực thi lệnh PowerShell (chỉ trên hệ điều hành Windows) và trả về kết quả.
     Ví dụ: Get-Process, Get-ChildItem, New-Item, ...
     """
-    result = exec_service.execute_powershell(request.command, request.timeout)
+    result = await run_in_pool("exec", exec_service.execute_powershell, request.command, request.timeout)
     
     message = "PowerShell command executed successfully"
     if not result["success"]:
@@ -44,7 +68,7 @@ async def execute_cmd(request: CommandRequest):
     Thực thi lệnh CMD (chỉ trên hệ điều hành Windows) và trả về kết quả.
     Ví dụ: dir, type file.txt, ...
     """
-    result = exec_service.execute_cmd(request.command, request.timeout)
+    result = await run_in_pool("exec", exec_service.execute_cmd, request.command, request.timeout)
     
     message = "CMD command executed successfully"
     if not result["success"]:
@@ -58,7 +82,7 @@ async def execute_bash(request: CommandRequest):
     Thực thi lệnh Bash (chỉ trên hệ điều hành Unix/Linux) và trả về kết quả.
     Ví dụ: ls -la, cat file.txt, mkdir folder, ...
     """
-    result = exec_service.execute_bash(request.command, request.timeout)
+    result = await run_in_pool("exec", exec_service.execute_bash, request.command, request.timeout)
     
     message = "Bash command executed successfully"
     if not result["success"]:
@@ -66,10 +90,113 @@ async def execute_bash(request: CommandRequest):
     
     return create_response(result["success"], message, result)
 
+async def _iter_ndjson(events):
+    # Mỗi kết quả một dòng JSON, gửi ngay khi lệnh hoàn thành
+    async for event in events:
+        yield json_bytes(event) + b"\n"
+
+@router.post("/batch", summary="Thực thi nhiều lệnh đồng thời")
+async def execute_batch(request: BatchCommandRequest):
+    """
+    Chạy nhiều lệnh trong một request, tối đa concurrency lệnh cùng lúc (asyncio subprocess).
+    timeout của từng lệnh giới hạn riêng lệnh đó, timeout của batch giới hạn cả batch.
+    stream=true: trả về NDJSON, mỗi dòng là kết quả của một lệnh theo thứ tự hoàn thành, dòng cuối là summary.
+    Ngược lại trả về kết quả theo thứ tự đầu vào. Mỗi kết quả có index, wait và duration (giây).
+    """
+    commands = [{"command": item.command, "timeout": item.timeout} for item in request.commands]
+    if request.stream:
+        events = exec_service.run_batch(commands, request.concurrency, request.timeout, request.shell_type)
+        return StreamingResponse(_iter_ndjson(events), media_type="application/x-ndjson")
+    
+    result = await exec_service.execute_batch(commands, request.concurrency, request.timeout, request.shell_type)
+    message = "Batch executed successfully"
+    if not result["success"]:
+        message = "Some commands in the batch failed"
+    
+    return create_response(result["success"], message, result)
+
+@router.post("/stream", summary="Thực thi lệnh, stream output (Server-Sent Events)")
+async def stream_command(request: StreamCommandRequest):
+    """
+    Thực thi lệnh và stream từng dòng stdout/stderr ngay khi có dạng Server-Sent Events
+    (event: stdout | stderr | truncated | exit). Output vượt max_output byte chỉ được giữ
+    tail_lines dòng cuối trong sự kiện exit. Ngắt kết nối sẽ dừng lệnh.
+    """
+    events = exec_service.stream_command(request.command, request.timeout, request.shell_type,
+                                         request.max_output, request.tail_lines)
+    return StreamingResponse(_iter_sse(events), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/ws")
+async def stream_command_ws(websocket: WebSocket):
+    """
+    Thực thi lệnh qua WebSocket: client gửi một message JSON giống body của /exec/stream,
+    server gửi lại từng sự kiện (stdout, stderr, truncated, exit) rồi đóng kết nối.
+    """
+    await websocket.accept()
+    try:
+        request = StreamCommandRequest(**await websocket.receive_json())
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        await websocket.send_json({"event": "error", "data": f"Invalid request: {str(e)}"})
+        await websocket.close(code=1003)
+        return
+    
+    events = exec_service.stream_command(request.command, request.timeout, request.shell_type,
+                                         request.max_output, request.tail_lines)
+    try:
+        async for event in events:
+            await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket client disconnected, stopping command: {request.command}")
+    finally:
+        await events.aclose()
+
+@router.post("/sessions", summary="Mở shell session chạy lâu dài")
+async def create_session(request: SessionRequest):
+    """
+    Mở một process shell (bash/sh hoặc powershell) chạy lâu dài để chạy nhiều lệnh liên tiếp
+    mà không phải khởi động shell mỗi lần. Thư mục hiện tại và biến môi trường được giữ giữa các lệnh.
+    Session không dùng quá EXEC_SESSION_IDLE_TIMEOUT giây sẽ bị đóng.
+    """
+    result = await run_in_pool("exec", session_service.create_session, request.shell_type, request.cwd, request.env)
+    return create_response(True, "Session created successfully", result)
+
+@router.get("/sessions", summary="Danh sách shell session")
+async def list_sessions():
+    result = await run_in_pool("exec", session_service.list_sessions)
+    return create_response(True, "Sessions retrieved successfully", result)
+
+@router.get("/sessions/{session_id}", summary="Thông tin shell session")
+async def get_session(session_id: str):
+    result = await run_in_pool("exec", session_service.get_session, session_id)
+    return create_response(True, "Session retrieved successfully", result)
+
+@router.post("/sessions/{session_id}/run", summary="Chạy lệnh trong shell session")
+async def run_in_session(session_id: str, request: CommandRequest):
+    """
+    Chạy lệnh trong session đã mở; trả về stdout, stderr, return_code, cwd sau khi chạy và duration.
+    Hết timeout hoặc lệnh thoát shell (exit) thì session bị đóng (closed=true).
+    """
+    result = await run_in_pool("exec", session_service.run_in_session, session_id, request.command, request.timeout)
+    
+    message = "Command executed successfully"
+    if not result["success"]:
+        message = "Command execution failed"
+    
+    return create_response(result["success"], message, result)
+
+@router.delete("/sessions/{session_id}", summary="Đóng shell session")
+async def close_session(session_id: str):
+    result = await run_in_pool("exec", session_service.close_session, session_id)
+    return create_response(True, "Session closed successfully", result)
+
 @router.get("/system-info", summary="Lấy thông tin hệ thống")
 async def get_system_info():
     """
     Lấy thông tin chi tiết về hệ thống đang chạy API.
     """
-    result = exec_service.get_system_info()
+    result = await run_in_pool("exec", exec_service.get_system_info)
     return create_response(True, "System information retrieved successfully", result) 
\ No newline at end of file
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Path, Query, Body, HTTPException
+import io
+import asyncio
+from fastapi import APIRouter, Path, Query, Body, HTTPException, Request, UploadFile, File, Form, Header
+from fastapi.responses import Response, StreamingResponse
+from urllib.parse import quote
 from typing import Optional, List, Dict, Any
-from app.services import file_service
-from app.utils.common import create_response
+from app.services import file_service, index_service, copy_service, archive_service, hash_service
+from app.utils.common import create_response, iter_ndjson, json_bytes
+from app.utils.dispatch import run_in_pool, get_pool
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -20,28 +25,253 @@ class FileMoveRequest(BaseModel):
     source_path: str
     destination_path: str
 
+class FileCopyRequest(FileMoveRequest):
+    skip: Optional[str] = None
+    resume: bool = False
+    workers: Optional[int] = None
+    stream: bool = False
+
+class BatchOperation(BaseModel):
+    op: str
+    path: Optional[str] = None
+    content: Optional[str] = None
+    source_path: Optional[str] = None
+    destination_path: Optional[str] = None
+    skip: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    mode: str = "best_effort"
+    concurrency: Optional[int] = None
+
+class UploadSessionRequest(BaseModel):
+    path: str
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    overwrite: Optional[bool] = True
+
+async def _write_chunks(chunks, writer: file_service.UploadWriter, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Ghi luồng dữ liệu vào UploadWriter qua io pool, gom thành khối UPLOAD_BUFFER_SIZE trước khi ghi
+    """
+    buffer = bytearray()
+    try:
+        async for chunk in chunks:
+            buffer.extend(chunk)
+            if len(buffer) >= file_service.UPLOAD_BUFFER_SIZE:
+                await run_in_pool("io", writer.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_pool("io", writer.write, bytes(buffer))
+    except BaseException:
+        await run_in_pool("io", writer.abort)
+        raise
+    return await run_in_pool("io", writer.finish, expected_sha256)
+
+async def _iter_upload_file(upload: UploadFile):
+    while True:
+        chunk = await upload.read(file_service.UPLOAD_BUFFER_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+class _RequestBodyReader(io.RawIOBase):
+    """
+    File-like đọc body request (async) từ thread worker: mỗi lần hết dữ liệu, lấy chunk tiếp theo
+    trên event loop. Dữ liệu chỉ được nhận khi worker cần nên bộ nhớ không tăng theo kích thước body.
+    """
+    
+    def __init__(self, request: Request):
+        self._chunks = request.stream().__aiter__()
+        self._loop = asyncio.get_running_loop()
+        self._buffer = memoryview(b"")
+        self._eof = False
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._eof:
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(self._chunks.__anext__(), self._loop).result()
+                self._buffer = memoryview(chunk)
+            except StopAsyncIteration:
+                self._eof = True
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
 @router.get("/list", summary="Liệt kê nội dung thư mục")
-async def list_directory(path: str = Query(..., description="Đường dẫn đến thư mục cần liệt kê")):
+async def list_directory(path: str = Query(..., description="Đường dẫn đến thư mục cần liệt kê"),
+                         fields: Optional[str] = Query(None, description="Các trường cần trả về, ví dụ: name,type (bỏ qua stat nếu không cần size/modified)"),
+                         sort: str = Query("name", description="Sắp xếp theo: name, type, size, modified"),
+                         order: str = Query("asc", description="Thứ tự: asc, desc"),
+                         pattern: Optional[str] = Query(None, description="Lọc tên theo glob, ví dụ: *.log"),
+                         item_type: Optional[str] = Query(None, alias="type", description="Lọc theo loại: file, directory"),
+                         modified_after: Optional[float] = Query(None, description="Chỉ lấy entry sửa đổi sau thời điểm này (epoch)"),
+                         modified_before: Optional[float] = Query(None, description="Chỉ lấy entry sửa đổi trước thời điểm này (epoch)"),
+                         limit: Optional[int] = Query(None, description="Số entry mỗi trang (bật phân trang)"),
+                         cursor: Optional[str] = Query(None, description="Cursor trang tiếp theo (next_cursor)"),
+                         refresh: bool = Query(False, description="Bỏ qua chỉ mục metadata, quét lại thư mục")):
     """
-    Liệt kê tất cả các file và thư mục trong đường dẫn được chỉ định.
+    Liệt kê các file và thư mục trong đường dẫn được chỉ định.
+    Khi có limit hoặc cursor, kết quả được phân trang: {"items", "count", "next_cursor"}.
     """
-    result = file_service.list_dir(path)
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    options = dict(fields=field_list, sort_by=sort, order=order, pattern=pattern, item_type=item_type,
+                   modified_after=modified_after, modified_before=modified_before, refresh=refresh)
+    
+    if limit is not None or cursor is not None:
+        result = await run_in_pool("io", file_service.list_dir_page, path, limit or 1000, cursor, **options)
+    else:
+        result = await run_in_pool("io", file_service.list_dir, path, **options)
     return create_response(True, "Directory listed successfully", result)
 
+@router.get("/walk", summary="Duyệt đệ quy cây thư mục (stream NDJSON)")
+async def walk_directory(path: str = Query(..., description="Thư mục gốc cần duyệt"),
+                         max_depth: Optional[int] = Query(None, description="Độ sâu tối đa (1 = chỉ con trực tiếp)"),
+                         include: Optional[List[str]] = Query(None, description="Glob chỉ lấy entry khớp, ví dụ: *.py"),
+                         exclude: Optional[List[str]] = Query(None, description="Glob bỏ qua (không duyệt vào), ví dụ: .git"),
+                         item_type: Optional[str] = Query(None, alias="type", description="Lọc theo loại: file, directory"),
+                         fields: Optional[str] = Query(None, description="Các trường cần trả về, ví dụ: path,type,depth"),
+                         follow_symlinks: bool = Query(False, description="Duyệt vào symlink thư mục"),
+                         limit: Optional[int] = Query(None, description="Số entry tối đa"),
+                         aggregate: bool = Query(False, description="Trả thêm tổng số file/thư mục/byte của từng thư mục")):
+    """
+    Duyệt toàn bộ cây thư mục bằng nhiều worker song song, trả về từng entry dạng NDJSON
+    ngay trong khi đang duyệt. Lỗi đọc thư mục con được trả về dạng {"path", "error"}.
+    Với aggregate=true, sau khi duyệt xong có thêm một dòng {"path", "depth", "aggregate"} cho mỗi thư mục
+    (tổng cộng dồn cả cây con, thư mục gốc ở dòng cuối).
+    """
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    entries = await run_in_pool("io", file_service.walk_tree, path, max_depth, include, exclude,
+                                item_type, field_list, follow_symlinks, limit, aggregate=aggregate)
+    return StreamingResponse(iter_ndjson(entries), media_type="application/x-ndjson")
+
+@router.get("/search/name", summary="Tìm file theo tên (stream NDJSON)")
+async def search_names(path: str = Query(..., description="Thư mục gốc cần tìm"),
+                       pattern: str = Query(..., description="Glob (mặc định) hoặc regex theo tên, ví dụ: *.log"),
+                       regex: bool = Query(False, description="pattern là biểu thức chính quy"),
+                       ignore_case: bool = Query(False, description="Không phân biệt hoa thường"),
+                       item_type: Optional[str] = Query(None, alias="type", description="Lọc theo loại: file, directory"),
+                       exclude: Optional[List[str]] = Query(None, description="Glob thư mục/file bỏ qua, ví dụ: .git"),
+                       max_depth: Optional[int] = Query(None, description="Độ sâu tối đa"),
+                       fields: Optional[str] = Query(None, description="Các trường cần trả về, ví dụ: path,size"),
+                       limit: Optional[int] = Query(1000, description="Số kết quả tối đa")):
+    """
+    Tìm file/thư mục theo tên trong cây thư mục (duyệt song song), trả về kết quả dạng NDJSON
+    ngay khi tìm thấy. Thay thế cho việc chạy find qua /exec/cmd.
+    """
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    matches = await run_in_pool("io", file_service.search_names, path, pattern, regex, ignore_case,
+                                item_type, exclude, max_depth, field_list, limit)
+    return StreamingResponse(iter_ndjson(matches), media_type="application/x-ndjson")
+
+@router.get("/search/content", summary="Tìm nội dung trong file (stream NDJSON)")
+async def search_content(path: str = Query(..., description="File hoặc thư mục gốc cần tìm"),
+                         query: str = Query(..., description="Chuỗi (mặc định) hoặc regex cần tìm"),
+                         regex: bool = Query(False, description="query là biểu thức chính quy"),
+                         ignore_case: bool = Query(False, description="Không phân biệt hoa thường"),
+                         include: Optional[List[str]] = Query(None, description="Chỉ tìm trong file khớp glob, ví dụ: *.py"),
+                         exclude: Optional[List[str]] = Query(None, description="Glob thư mục/file bỏ qua, ví dụ: .git"),
+                         max_matches: int = Query(1000, description="Tổng số kết quả tối đa"),
+                         max_matches_per_file: int = Query(100, description="Số kết quả tối đa mỗi file"),
+                         max_file_size: int = Query(file_service.SEARCH_MAX_FILE_SIZE, description="Bỏ qua file lớn hơn (byte)")):
+    """
+    Tìm nội dung trong các file văn bản (bỏ qua file binary), grep song song trên nhiều core.
+    Mỗi dòng kết quả: {"path", "line_number", "line", "match"}. Thay thế cho grep qua /exec/cmd.
+    """
+    matches = await run_in_pool("io", file_service.search_content, path, query, regex, ignore_case,
+                                include, exclude, max_matches, max_matches_per_file, max_file_size)
+    return StreamingResponse(iter_ndjson(matches), media_type="application/x-ndjson")
+
 @router.post("/create/file", summary="Tạo file mới")
 async def create_file(request: FileCreateRequest):
     """
     Tạo một file mới với nội dung tùy chọn.
     """
-    result = file_service.create_file(request.path, request.content)
+    result = await run_in_pool("io", file_service.create_file, request.path, request.content)
     return create_response(True, "File created successfully", result)
 
+@router.put("/upload", summary="Upload file (stream trực tiếp xuống đĩa)")
+async def upload_file(request: Request,
+                      path: str = Query(..., description="Đường dẫn file đích"),
+                      overwrite: bool = Query(True, description="Ghi đè nếu file đã tồn tại"),
+                      x_content_sha256: Optional[str] = Header(None, description="SHA-256 của toàn bộ nội dung (tùy chọn)")):
+    """
+    Upload nội dung binary trong body request. Dữ liệu được ghi xuống file tạm ngay khi nhận được,
+    sau đó rename nguyên tử sang file đích.
+    """
+    writer = await run_in_pool("io", file_service.open_upload, path, overwrite)
+    result = await _write_chunks(request.stream(), writer, x_content_sha256)
+    return create_response(True, "File uploaded successfully", result)
+
+@router.post("/upload/multipart", summary="Upload file (multipart/form-data)")
+async def upload_file_multipart(path: str = Form(..., description="Đường dẫn file đích"),
+                                file: UploadFile = File(..., description="Nội dung file"),
+                                overwrite: bool = Form(True, description="Ghi đè nếu file đã tồn tại"),
+                                sha256: Optional[str] = Form(None, description="SHA-256 của nội dung (tùy chọn)")):
+    """
+    Upload file qua multipart/form-data, ghi xuống đĩa theo từng chunk.
+    """
+    writer = await run_in_pool("io", file_service.open_upload, path, overwrite)
+    result = await _write_chunks(_iter_upload_file(file), writer, sha256)
+    return create_response(True, "File uploaded successfully", result)
+
+@router.post("/upload/sessions", summary="Tạo phiên upload nhiều chunk")
+async def create_upload_session(request: UploadSessionRequest):
+    """
+    Tạo phiên upload có thể tải tiếp. Gửi từng chunk bằng PUT /files/upload/sessions/{id}?offset=N,
+    sau đó gọi POST /files/upload/sessions/{id}/commit.
+    """
+    result = await run_in_pool("io", file_service.create_upload_session, request.path, request.size,
+                               request.sha256, request.overwrite)
+    return create_response(True, "Upload session created successfully", result)
+
+@router.get("/upload/sessions/{session_id}", summary="Trạng thái phiên upload")
+async def get_upload_session(session_id: str):
+    """
+    Trả về số byte server đã nhận để client biết vị trí cần tải tiếp.
+    """
+    result = await run_in_pool("io", file_service.get_upload_session, session_id)
+    return create_response(True, "Upload session retrieved successfully", result)
+
+@router.put("/upload/sessions/{session_id}", summary="Gửi một chunk của phiên upload")
+async def upload_chunk(session_id: str, request: Request,
+                       offset: int = Query(..., description="Vị trí byte bắt đầu của chunk"),
+                       x_chunk_sha256: Optional[str] = Header(None, description="SHA-256 của chunk (tùy chọn)")):
+    """
+    Ghi chunk (body request) vào phiên upload tại offset. Nếu checksum chunk không khớp,
+    dữ liệu của chunk bị hủy và trả về lỗi 400.
+    """
+    writer = await run_in_pool("io", file_service.open_upload_chunk, session_id, offset)
+    await _write_chunks(request.stream(), writer, x_chunk_sha256)
+    result = await run_in_pool("io", file_service.get_upload_session, session_id)
+    return create_response(True, "Chunk uploaded successfully", result)
+
+@router.post("/upload/sessions/{session_id}/commit", summary="Hoàn tất phiên upload")
+async def commit_upload_session(session_id: str):
+    """
+    Kiểm tra kích thước/checksum và rename nguyên tử file tạm sang file đích.
+    """
+    result = await run_in_pool("io", file_service.commit_upload_session, session_id)
+    return create_response(True, "Upload committed successfully", result)
+
+@router.delete("/upload/sessions/{session_id}", summary="Hủy phiên upload")
+async def abort_upload_session(session_id: str):
+    """
+    Hủy phiên upload và xóa dữ liệu tạm.
+    """
+    result = await run_in_pool("io", file_service.abort_upload_session, session_id)
+    return create_response(True, "Upload session aborted successfully", result)
+
 @router.post("/create/directory", summary="Tạo thư mục mới")
 async def create_directory(request: DirectoryCreateRequest):
     """
     Tạo một thư mục mới.
     """
-    result = file_service.create_directory(request.path)
+    result = await run_in_pool("io", file_service.create_directory, request.path)
     return create_response(True, "Directory created successfully", result)
 
 @router.get("/read", summary="Đọc nội dung file")
@@ -49,15 +279,97 @@ async def read_file(path: str = Query(..., description="Đường dẫn đến f
     """
     Đọc và trả về nội dung của file.
     """
-    result = file_service.read_file(path)
+    result = await run_in_pool("io", file_service.read_file, path)
     return create_response(True, "File read successfully", result)
 
+async def _download_response(request: Request, path: str, head: bool):
+    """
+    Response cho GET/HEAD /download: kiểm tra ETag/If-None-Match, Range/If-Range rồi stream file (HEAD chỉ trả header)
+    """
+    info = await run_in_pool("io", file_service.get_download_info, path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": info["etag"],
+        "Last-Modified": info["last_modified"],
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(info['name'])}"
+    }
+    
+    if file_service.etag_matches(request.headers.get("if-none-match"), info["etag"]):
+        return Response(status_code=304, headers=headers)
+    
+    byte_range = file_service.resolve_range(
+        request.headers.get("range"),
+        info["size"],
+        request.headers.get("if-range"),
+        info["etag"],
+        info["last_modified"]
+    )
+    
+    status_code = 200
+    start, end = 0, info["size"] - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{info['size']}"
+    headers["Content-Length"] = str(max(0, end - start + 1))
+    
+    if head:
+        return Response(status_code=status_code, headers=headers, media_type=info["media_type"])
+    
+    return StreamingResponse(
+        file_service.iter_file_binary(info["path"], start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=info["media_type"]
+    )
+
+@router.get("/download", summary="Tải file (stream, hỗ trợ Range)")
+async def download_file(request: Request, path: str = Query(..., description="Đường dẫn đến file cần tải")):
+    """
+    Stream nội dung file dạng binary theo từng chunk, bộ nhớ không phụ thuộc kích thước file.
+    Hỗ trợ Range (tải tiếp), If-Range và ETag/If-None-Match.
+    """
+    return await _download_response(request, path, head=False)
+
+@router.head("/download", summary="Thông tin file cần tải (chỉ header)")
+async def download_file_head(request: Request, path: str = Query(..., description="Đường dẫn đến file cần tải")):
+    """
+    Như GET /download nhưng chỉ trả header (kích thước, ETag, Last-Modified, Content-Range nếu có Range).
+    """
+    return await _download_response(request, path, head=True)
+
+@router.get("/archive", summary="Tải thư mục dạng archive tar/zip (stream)")
+async def download_archive(path: str = Query(..., description="Thư mục (hoặc file) cần tải"),
+                           format: str = Query("tar", description="Định dạng: tar, zip"),
+                           compression: str = Query("none", description="Nén: none, gzip (zip: deflate), zstd (chỉ tar)"),
+                           include: Optional[List[str]] = Query(None, description="Glob chỉ lấy entry khớp, ví dụ: *.py"),
+                           exclude: Optional[List[str]] = Query(None, description="Glob bỏ qua (không duyệt vào), ví dụ: .git")):
+    """
+    Tạo archive của cây thư mục trong lúc gửi cho client, bộ nhớ không phụ thuộc kích thước cây.
+    Symlink được lưu nguyên dạng (không theo link); file đặc biệt (FIFO, socket, thiết bị) bị bỏ qua.
+    """
+    archive = await run_in_pool("io", archive_service.open_archive, path, format, compression, include, exclude)
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(archive['filename'])}"}
+    return StreamingResponse(archive["chunks"], headers=headers, media_type=archive["media_type"])
+
+@router.post("/extract", summary="Giải nén archive upload vào thư mục (stream)")
+async def extract_archive(request: Request,
+                          path: str = Query(..., description="Thư mục đích (tạo nếu chưa có)"),
+                          overwrite: bool = Query(True, description="Ghi đè file đã tồn tại")):
+    """
+    Giải nén archive trong body request (tar, tar.gz, tar.bz2, tar.xz, tar.zst, zip - nhận dạng tự động)
+    trực tiếp xuống đĩa trong lúc nhận. Entry có đường dẫn không an toàn (tuyệt đối, "..", link ra ngoài
+    thư mục đích) được bỏ qua và liệt kê trong skipped.
+    """
+    result = await run_in_pool("io", archive_service.extract_archive, _RequestBodyReader(request), path, overwrite)
+    return create_response(True, "Archive extracted successfully", result)
+
 @router.delete("/delete", summary="Xóa file hoặc thư mục")
 async def delete_item(path: str = Query(..., description="Đường dẫn đến file/thư mục cần xóa")):
     """
     Xóa file hoặc thư mục được chỉ định.
     """
-    result = file_service.delete_item(path)
+    result = await run_in_pool("io", file_service.delete_item, path)
     return create_response(True, f"{result['type']} deleted successfully", result)
 
 @router.post("/move", summary="Di chuyển file hoặc thư mục")
@@ -65,21 +377,122 @@ async def move_item(request: FileMoveRequest):
     """
     Di chuyển file hoặc thư mục từ vị trí nguồn đến đích.
     """
-    result = file_service.move_item(request.source_path, request.destination_path)
+    result = await run_in_pool("io", file_service.move_item, request.source_path, request.destination_path)
     return create_response(True, f"{result['type']} moved successfully", result)
 
+async def _iter_copy_progress(future, progress: copy_service.CopyProgress):
+    # NDJSON: {"event": "progress", ...} mỗi COPY_PROGRESS_INTERVAL giây, cuối cùng là "done" hoặc "error"
+    waiter = asyncio.wrap_future(future)
+    try:
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=copy_service.COPY_PROGRESS_INTERVAL)
+            if done:
+                break
+            yield json_bytes({"event": "progress", **progress.snapshot()}) + b"\n"
+        try:
+            yield json_bytes({"event": "done", "data": waiter.result()}) + b"\n"
+        except HTTPException as e:
+            yield json_bytes({"event": "error", "status_code": e.status_code, "detail": e.detail,
+                              "progress": progress.snapshot()}) + b"\n"
+    finally:
+        # Client ngắt kết nối: dừng chép, các file dở được giữ dạng .part để resume
+        if not future.done():
+            progress.cancel()
+
 @router.post("/copy", summary="Sao chép file hoặc thư mục")
-async def copy_item(request: FileMoveRequest):
+async def copy_item(request: FileCopyRequest):
     """
-    Sao chép file hoặc thư mục từ vị trí nguồn đến đích.
+    Sao chép file hoặc thư mục từ vị trí nguồn đến đích. Nhiều file được chép song song (workers),
+    dùng reflink/copy_file_range/sendfile khi hệ thống file hỗ trợ.
+    - skip: size_mtime hoặc hash - bỏ qua file đích đã giống nguồn
+    - resume: tiếp tục các file .part của lần chép bị gián đoạn (và cho phép gộp vào thư mục đích có sẵn)
+    - stream: trả về tiến độ dạng NDJSON thay vì chờ chép xong
+    Với bản sao lớn không cần giữ kết nối, dùng POST /jobs/copy.
     """
-    result = file_service.copy_item(request.source_path, request.destination_path)
+    if request.stream:
+        progress = copy_service.CopyProgress()
+        future = get_pool("io").submit(file_service.copy_item, request.source_path, request.destination_path,
+                                       request.skip, request.resume, request.workers, progress)
+        return StreamingResponse(_iter_copy_progress(future, progress), media_type="application/x-ndjson")
+    
+    result = await run_in_pool("io", file_service.copy_item, request.source_path, request.destination_path,
+                               request.skip, request.resume, request.workers)
     return create_response(True, f"{result['type']} copied successfully", result)
 
+@router.post("/batch", summary="Thực hiện nhiều thao tác file trong một request")
+async def execute_batch(request: BatchRequest):
+    """
+    Chạy danh sách thao tác create_file, create_directory, delete, move, copy theo thứ tự gửi lên:
+    thao tác liên quan tới cùng đường dẫn (hoặc thư mục cha/con của nhau) chạy tuần tự, các thao tác
+    độc lập chạy song song (concurrency). Kết quả trả về theo từng thao tác.
+    - best_effort: chạy tất cả các thao tác
+    - stop_on_error: dừng ở lỗi đầu tiên, các thao tác chưa chạy có trạng thái skipped
+    """
+    operations = [{"op": item.op, "path": item.path, "content": item.content, "source_path": item.source_path,
+                   "destination_path": item.destination_path, "skip": item.skip} for item in request.operations]
+    result = await run_in_pool("io", file_service.execute_batch, operations, request.mode, request.concurrency)
+    if result["failed"]:
+        message = f"Batch finished with {result['failed']} failed and {result['skipped']} skipped operations"
+    else:
+        message = "Batch executed successfully"
+    return create_response(result["failed"] == 0, message, result)
+
 @router.get("/info", summary="Lấy thông tin chi tiết về file/thư mục")
-async def get_file_info(path: str = Query(..., description="Đường dẫn đến file/thư mục cần lấy thông tin")):
+async def get_file_info(path: str = Query(..., description="Đường dẫn đến file/thư mục cần lấy thông tin"),
+                        refresh: bool = Query(False, description="Bỏ qua chỉ mục metadata, stat lại file")):
     """
     Lấy thông tin chi tiết về file hoặc thư mục.
     """
-    result = file_service.get_file_info(path)
-    return create_response(True, "File info retrieved successfully", result) 
\ No newline at end of file
+    result = await run_in_pool("io", file_service.get_file_info, path, refresh)
+    return create_response(True, "File info retrieved successfully", result) 
+
+@router.get("/hash", summary="Tính digest của file hoặc cả cây thư mục")
+async def hash_path(path: str = Query(..., description="File hoặc thư mục gốc cần hash"),
+                    algorithm: str = Query("sha256", description="Thuật toán: sha256, sha1, sha512, md5, blake2b, blake2s, xxh64, xxh3_64, xxh3_128"),
+                    include: Optional[List[str]] = Query(None, description="Glob chỉ lấy file khớp, ví dụ: *.bin"),
+                    exclude: Optional[List[str]] = Query(None, description="Glob bỏ qua (không duyệt vào), ví dụ: .git"),
+                    expected: Optional[str] = Query(None, description="Digest mong đợi (chỉ với file), kết quả có trường match"),
+                    refresh: bool = Query(False, description="Bỏ qua cache, đọc lại nội dung file"),
+                    workers: Optional[int] = Query(None, description="Số file được hash song song")):
+    """
+    Tính digest của file (JSON) hoặc của mọi file trong thư mục (stream NDJSON theo thứ tự hoàn thành,
+    nhiều file song song). Digest được cache theo (device, inode, size, mtime_ns) nên file không đổi
+    được trả lời ngay mà không đọc lại nội dung (cached=true).
+    """
+    result = await run_in_pool("io", hash_service.hash_path, path, algorithm, include, exclude, refresh, workers)
+    if result["type"] == "directory":
+        return StreamingResponse(iter_ndjson(result["items"]), media_type="application/x-ndjson")
+    
+    if expected is not None:
+        result["match"] = expected.strip().lower() == result["digest"]
+    return create_response(True, "File hashed successfully", result)
+
+@router.get("/index/search", summary="Tìm file trong chỉ mục metadata")
+async def search_index(pattern: Optional[str] = Query(None, description="Glob theo tên, ví dụ: *.log"),
+                       path: Optional[str] = Query(None, description="Chỉ tìm trong thư mục này (mặc định gốc chỉ mục)"),
+                       item_type: Optional[str] = Query(None, alias="type", description="Lọc theo loại: file, directory"),
+                       modified_after: Optional[float] = Query(None, description="Sửa đổi sau thời điểm này (epoch)"),
+                       modified_before: Optional[float] = Query(None, description="Sửa đổi trước thời điểm này (epoch)"),
+                       limit: int = Query(1000, description="Số kết quả tối đa")):
+    """
+    Tìm file/thư mục từ chỉ mục metadata (cần METADATA_INDEX_ENABLED=true), không cần quét ổ đĩa.
+    """
+    result = await run_in_pool("io", index_service.search, path, pattern, item_type,
+                               modified_after, modified_before, limit)
+    return create_response(True, "Index searched successfully", result)
+
+@router.get("/index/status", summary="Trạng thái chỉ mục metadata")
+async def get_index_status():
+    """
+    Số entry, số thư mục đang được theo dõi bằng inotify và tiến độ crawl.
+    """
+    result = await run_in_pool("io", index_service.status)
+    return create_response(True, "Index status retrieved successfully", result)
+
+@router.post("/index/refresh", summary="Crawl lại chỉ mục metadata")
+async def refresh_index(path: Optional[str] = Query(None, description="Cây con cần crawl lại (mặc định toàn bộ)")):
+    """
+    Buộc quét lại một cây con và cập nhật chỉ mục.
+    """
+    result = await run_in_pool("io", index_service.refresh, path)
+    return create_response(True, "Index refreshed successfully", result)
\ No newline at end of file
@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Query, HTTPException
+from typing import Optional, List, Any
+from app.services import job_service
+from app.utils.common import create_response
+from app.utils.dispatch import run_in_pool
+from pydantic import BaseModel
+
+router = APIRouter()
+
+class CommandJobRequest(BaseModel):
+    command: str
+    timeout: Optional[int] = None
+    shell_type: Optional[str] = None
+    priority: int = 0
+
+class ScanJobRequest(BaseModel):
+    path: str
+    parser: str = "auto"
+    sheet_name: Optional[str] = None
+    delimiter: Optional[str] = ","
+    priority: int = 0
+
+class CopyJobRequest(BaseModel):
+    source_path: str
+    destination_path: str
+    skip: Optional[str] = None
+    workers: Optional[int] = None
+    priority: int = 0
+
+@router.post("/command", summary="Tạo job chạy lệnh shell")
+async def submit_command(request: CommandJobRequest):
+    """
+    Đưa lệnh vào hàng đợi job và trả về ngay job id. Lệnh chạy nền, không phụ thuộc vào request;
+    output được ghi ra file và đọc lại qua /jobs/{job_id}/output.
+    Job có priority cao hơn được chạy trước.
+    """
+    result = await run_in_pool("io", job_service.submit_command, request.command, request.timeout,
+                               request.shell_type, request.priority)
+    return create_response(True, "Job submitted successfully", result)
+
+@router.post("/scan", summary="Tạo job phân tích file")
+async def submit_scan(request: ScanJobRequest):
+    """
+    Đưa việc phân tích file (parser: auto, docx, excel, pdf, csv, text) vào hàng đợi job.
+    Kết quả được lưu lại và lấy qua /jobs/{job_id}/result bao nhiêu lần cũng được.
+    """
+    args: List[Any] = []
+    if request.parser == "excel":
+        args = [request.sheet_name]
+    elif request.parser == "csv":
+        args = [request.delimiter]
+    result = await run_in_pool("io", job_service.submit_scan, request.path, request.parser, args, request.priority)
+    return create_response(True, "Job submitted successfully", result)
+
+@router.post("/copy", summary="Tạo job sao chép file/thư mục")
+async def submit_copy(request: CopyJobRequest):
+    """
+    Đưa việc sao chép (như POST /files/copy) vào hàng đợi job. Tiến độ (file/byte đã chép, tốc độ, ETA)
+    nằm trong trường progress của GET /jobs/{job_id}. Job bị hủy hoặc gián đoạn (server khởi động lại)
+    tiếp tục từ các file .part khi chạy lại; skip=size_mtime bỏ qua các file đã chép xong.
+    """
+    result = await run_in_pool("io", job_service.submit_copy, request.source_path, request.destination_path,
+                               request.skip, request.workers, request.priority)
+    return create_response(True, "Job submitted successfully", result)
+
+@router.get("", summary="Danh sách job")
+async def list_jobs(status: Optional[str] = Query(None, description="Lọc theo trạng thái: queued, running, succeeded, failed, cancelled"),
+                    kind: Optional[str] = Query(None, description="Lọc theo loại: command, scan, copy"),
+                    limit: int = Query(100, description="Số job tối đa")):
+    """
+    Liệt kê các job mới nhất.
+    """
+    result = await run_in_pool("io", job_service.list_jobs, status, kind, limit)
+    return create_response(True, "Jobs retrieved successfully", result)
+
+@router.get("/status", summary="Trạng thái bộ lập lịch job")
+async def get_status():
+    """
+    Số job theo từng trạng thái và số job đang chạy trong process này.
+    """
+    result = await run_in_pool("io", job_service.status)
+    return create_response(True, "Job scheduler status retrieved successfully", result)
+
+@router.get("/{job_id}", summary="Thông tin job")
+async def get_job(job_id: str):
+    """
+    Trạng thái, thời gian và tóm tắt kết quả của job.
+    """
+    result = await run_in_pool("io", job_service.get_job, job_id)
+    return create_response(True, "Job retrieved successfully", result)
+
+@router.get("/{job_id}/output", summary="Đọc output của job lệnh")
+async def get_job_output(job_id: str,
+                         stream: str = Query("stdout", description="stdout hoặc stderr"),
+                         offset: int = Query(0, description="Vị trí byte bắt đầu đọc"),
+                         limit: int = Query(65536, description="Số byte tối đa")):
+    """
+    Đọc output theo từng trang byte; gửi lại next_offset để đọc tiếp (kể cả khi job đang chạy).
+    eof=true khi job đã kết thúc và đã đọc hết.
+    """
+    result = await run_in_pool("io", job_service.get_job_output, job_id, stream, offset, limit)
+    return create_response(True, "Job output retrieved successfully", result)
+
+@router.get("/{job_id}/result", summary="Kết quả của job phân tích file")
+async def get_job_result(job_id: str):
+    """
+    Kết quả đã lưu của job scan (không phân tích lại file).
+    """
+    result = await run_in_pool("io", job_service.get_job_result, job_id)
+    return create_response(True, "Job result retrieved successfully", result)
+
+@router.post("/{job_id}/cancel", summary="Hủy job")
+async def cancel_job(job_id: str):
+    """
+    Hủy job đang chờ, hoặc dừng job đang chạy (process của lệnh bị dừng).
+    """
+    result = await run_in_pool("io", job_service.cancel_job, job_id)
+    return create_response(True, "Job cancellation requested", result)
+
+@router.delete("/{job_id}", summary="Xóa job")
+async def delete_job(job_id: str):
+    """
+    Xóa job đã kết thúc cùng output/kết quả đã lưu.
+    """
+    result = await run_in_pool("io", job_service.delete_job, job_id)
+    return create_response(True, "Job deleted successfully", result)
\ No newline at end of file
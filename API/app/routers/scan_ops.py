@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Query, Body, HTTPException
-from typing import Optional, Dict, Any
-from app.services import scan_service
-from app.utils.common import create_response
+from fastapi import APIRouter, Query, Body, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional, Dict, Any, List
+from app.services import scan_service, cache_service
+from app.utils.common import create_response, iter_ndjson
+from app.utils.dispatch import run_in_pool
+from app.utils import tabular
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -10,15 +13,64 @@ class ScanFileRequest(BaseModel):
     path: str
     sheet_name: Optional[str] = None
     delimiter: Optional[str] = ","
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+    parallel: bool = False
+    offset: int = 0
+    limit: Optional[int] = None
+    columns: Optional[List[str]] = None
+    engine: Optional[str] = None
+    chunksize: Optional[int] = None
+    format: Optional[str] = None
+    refresh: bool = False
+
+async def _run_parser(parser: str, func, path: str, *args, refresh: bool = False, pool: str = "cpu"):
+    """
+    Chạy parser trên pool (mặc định cpu), dùng cache (bộ nhớ rồi đĩa) nếu file chưa thay đổi
+    """
+    # make_key gọi stat (có thể chậm trên ổ mạng) nên chạy trên pool io, không chặn event loop
+    key = await run_in_pool("io", cache_service.make_key, parser, path, list(args))
+    if key is not None and not refresh:
+        raw = cache_service.lookup_memory(key)
+        if raw is not None:
+            # Bản nhỏ giải ngay trên event loop, bản lớn trên pool io
+            if len(raw) <= cache_service.INLINE_DECODE_BYTES:
+                return cache_service.decode(raw)
+            return await run_in_pool("io", cache_service.decode, raw)
+        result = await run_in_pool("io", cache_service.lookup_disk, key)
+        if result is not None:
+            return result
+    
+    with scan_service.PARSE_SECONDS.time(parser=parser):
+        result = await run_in_pool(pool, func, path, *args)
+    
+    # Chỉ lưu nếu file không bị thay đổi trong lúc phân tích
+    if key is not None and await run_in_pool("io", cache_service.make_key, parser, path, list(args)) == key:
+        await run_in_pool("io", cache_service.store, key, result)
+    return result
+
+async def _tabular_response(result: Dict[str, Any], message: str, accept: Optional[str], fmt: Optional[str]):
+    """
+    Trả kết quả dạng bảng theo định dạng được yêu cầu (tham số format hoặc header Accept):
+    records (mặc định), columns, arrow hoặc parquet
+    """
+    fmt = tabular.negotiate_format(accept, fmt)
+    if fmt == "records":
+        return create_response(True, message, result)
+    if fmt == "columns":
+        return create_response(True, message, await run_in_pool("io", tabular.to_columnar, result))
+    content = await run_in_pool("io", tabular.encode_table, result, fmt)
+    return Response(content=content, media_type=tabular.MEDIA_TYPES[fmt])
 
 @router.post("/read", summary="Đọc và phân tích file")
-async def read_file_auto(request: ScanFileRequest):
+async def read_file_auto(request: ScanFileRequest, accept: Optional[str] = Header(None)):
     """
     Tự động nhận diện loại file và đọc nội dung với phương thức thích hợp.
     Hỗ trợ các định dạng: DOCX, XLSX, PDF, CSV, TXT, và nhiều loại file văn bản khác.
+    Với file dạng bảng (CSV, Excel) có thể chọn định dạng trả về như /read/csv.
     """
-    result = scan_service.read_file_auto(request.path)
-    return create_response(True, "File analyzed successfully", result)
+    result = await _run_parser("auto", scan_service.read_file_auto, request.path, refresh=request.refresh)
+    return await _tabular_response(result, "File analyzed successfully", accept, request.format)
 
 @router.post("/read/docx", summary="Đọc file Word")
 async def read_docx(request: ScanFileRequest):
@@ -26,40 +78,112 @@ async def read_docx(request: ScanFileRequest):
     Đọc và phân tích file Microsoft Word (.docx).
     Trả về văn bản, nội dung và cấu trúc bảng.
     """
-    result = scan_service.read_docx(request.path)
+    result = await _run_parser("docx", scan_service.read_docx, request.path, refresh=request.refresh)
     return create_response(True, "Word document analyzed successfully", result)
 
 @router.post("/read/excel", summary="Đọc file Excel")
-async def read_excel(request: ScanFileRequest):
+async def read_excel(request: ScanFileRequest, accept: Optional[str] = Header(None)):
     """
     Đọc và phân tích file Microsoft Excel (.xlsx, .xls).
     Nếu không chỉ định sheet_name, sẽ đọc sheet đầu tiên.
+    Hỗ trợ phân trang theo dòng (offset/limit) và chọn cột (columns).
+    Định dạng trả về: xem /read/csv.
     """
-    result = scan_service.read_excel(request.path, request.sheet_name)
-    return create_response(True, "Excel document analyzed successfully", result)
+    result = await _run_parser("excel", scan_service.read_excel, request.path, request.sheet_name, request.offset,
+                               request.limit, request.columns, refresh=request.refresh)
+    return await _tabular_response(result, "Excel document analyzed successfully", accept, request.format)
+
+@router.post("/read/excel/stream", summary="Đọc file Excel, stream từng dòng (NDJSON)")
+async def stream_excel(request: ScanFileRequest):
+    """
+    Stream các dòng của sheet dạng NDJSON, đọc trực tiếp từ workbook (read_only) nên bộ nhớ
+    không phụ thuộc kích thước sheet. Hỗ trợ sheet_name, offset, limit và columns.
+    """
+    rows = await run_in_pool("io", scan_service.stream_excel_rows, request.path, request.sheet_name,
+                             request.offset, request.limit, request.columns)
+    return StreamingResponse(iter_ndjson(rows), media_type="application/x-ndjson")
 
 @router.post("/read/pdf", summary="Đọc file PDF")
 async def read_pdf(request: ScanFileRequest):
     """
     Đọc và phân tích file PDF.
     Trả về thông tin metadata và nội dung text từ mỗi trang.
+    Có thể giới hạn khoảng trang bằng page_start/page_end (đánh số từ 1);
+    parallel=true trích xuất các khoảng trang song song trên nhiều core.
     """
-    result = scan_service.read_pdf(request.path)
+    if request.parallel:
+        # Điều phối chạy trên pool io, các khoảng trang được phân tích trên pool cpu
+        result = await _run_parser("pdf", scan_service.read_pdf_parallel, request.path, request.page_start,
+                                   request.page_end, refresh=request.refresh, pool="io")
+    else:
+        result = await _run_parser("pdf", scan_service.read_pdf, request.path, request.page_start,
+                                   request.page_end, refresh=request.refresh)
     return create_response(True, "PDF document analyzed successfully", result)
 
+@router.post("/read/pdf/stream", summary="Đọc file PDF, stream từng trang (NDJSON)")
+async def stream_pdf(request: ScanFileRequest):
+    """
+    Trích xuất text các trang song song trên pool cpu và stream từng trang ngay khi xong,
+    mỗi dòng: {"page", "text"} (không theo thứ tự trang). Hỗ trợ page_start/page_end.
+    """
+    pages = await run_in_pool("io", scan_service.stream_pdf_pages, request.path, request.page_start, request.page_end)
+    return StreamingResponse(iter_ndjson(pages), media_type="application/x-ndjson")
+
 @router.post("/read/csv", summary="Đọc file CSV")
-async def read_csv(request: ScanFileRequest):
+async def read_csv(request: ScanFileRequest, accept: Optional[str] = Header(None)):
     """
     Đọc và phân tích file CSV.
     Có thể chỉ định delimiter (mặc định là dấu phẩy).
+    Hỗ trợ cửa sổ dòng (offset/limit), chọn cột (columns) và engine (c, python, pyarrow).
+    Định dạng trả về chọn qua format hoặc header Accept: records (mặc định), columns
+    (Accept: application/json; format=columns), arrow (application/vnd.apache.arrow.stream)
+    hoặc parquet (application/vnd.apache.parquet).
     """
-    result = scan_service.read_csv(request.path, request.delimiter)
-    return create_response(True, "CSV file analyzed successfully", result)
+    result = await _run_parser("csv", scan_service.read_csv, request.path, request.delimiter, request.offset,
+                               request.limit, request.columns, request.engine, refresh=request.refresh)
+    return await _tabular_response(result, "CSV file analyzed successfully", accept, request.format)
+
+@router.post("/read/csv/stream", summary="Đọc file CSV, stream từng dòng (NDJSON)")
+async def stream_csv(request: ScanFileRequest):
+    """
+    Đọc file CSV theo từng khối (chunksize dòng) và stream các dòng dạng NDJSON,
+    bộ nhớ không phụ thuộc kích thước file. Hỗ trợ offset, limit, columns, engine.
+    """
+    rows = await run_in_pool("io", scan_service.stream_csv_rows, request.path, request.delimiter, request.offset,
+                             request.limit, request.columns, request.engine, request.chunksize)
+    return StreamingResponse(iter_ndjson(rows), media_type="application/x-ndjson")
+
+@router.post("/read/csv/profile", summary="Hồ sơ file CSV")
+async def profile_csv(request: ScanFileRequest):
+    """
+    Đọc file CSV một lượt theo khối và trả về số dòng/cột, kiểu dữ liệu, số giá trị rỗng
+    của từng cột và vài dòng đầu, không giữ toàn bộ dữ liệu trong bộ nhớ.
+    """
+    result = await _run_parser("csv_profile", scan_service.profile_csv, request.path, request.delimiter,
+                               request.columns, request.engine, refresh=request.refresh)
+    return create_response(True, "CSV file profiled successfully", result)
 
 @router.post("/read/text", summary="Đọc file văn bản")
 async def read_text(request: ScanFileRequest):
     """
     Đọc file văn bản thông thường (.txt, .md, .py, .java, .html, ...).
     """
-    result = scan_service.read_text_file(request.path)
-    return create_response(True, "Text file analyzed successfully", result) 
\ No newline at end of file
+    with scan_service.PARSE_SECONDS.time(parser="text"):
+        result = await run_in_pool("io", scan_service.read_text_file, request.path)
+    return create_response(True, "Text file analyzed successfully", result) 
+
+@router.get("/cache/stats", summary="Thống kê cache kết quả phân tích")
+async def get_cache_stats():
+    """
+    Số lần hit (bộ nhớ/đĩa), miss, eviction và dung lượng đang dùng của cache kết quả phân tích.
+    """
+    result = await run_in_pool("io", cache_service.stats)
+    return create_response(True, "Cache statistics retrieved successfully", result)
+
+@router.delete("/cache", summary="Xóa cache kết quả phân tích")
+async def clear_cache():
+    """
+    Xóa toàn bộ kết quả phân tích đã cache (bộ nhớ và đĩa).
+    """
+    result = await run_in_pool("io", cache_service.clear)
+    return create_response(True, "Cache cleared successfully", result)
\ No newline at end of file
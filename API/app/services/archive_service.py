@@ -0,0 +1,559 @@
+import os
+import io
+import stat
+import time
+import zlib
+import shutil
+import tarfile
+import zipfile
+import tempfile
+from typing import Dict, Any, List, Optional, Iterator, Tuple, BinaryIO
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.common import normalize_path, handle_exceptions, logger
+from app.services import file_service, copy_service
+
+try:
+    import zstandard
+except ImportError:  # zstd là tùy chọn (pip install zstandard)
+    zstandard = None
+
+# Load biến môi trường
+load_dotenv()
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", str(1024 * 1024)))  # Byte mỗi chunk gửi cho client / đọc từ file
+ARCHIVE_GZIP_LEVEL = int(os.getenv("ARCHIVE_GZIP_LEVEL", "6"))
+ARCHIVE_ZSTD_LEVEL = int(os.getenv("ARCHIVE_ZSTD_LEVEL", "3"))
+ARCHIVE_SPOOL_SIZE = int(os.getenv("ARCHIVE_SPOOL_SIZE", str(16 * 1024 * 1024)))  # Zip upload lớn hơn được spool xuống đĩa
+
+ARCHIVE_FORMATS = ("tar", "zip")
+ARCHIVE_COMPRESSIONS = ("none", "gzip", "zstd")
+
+MEDIA_TYPES = {
+    ("tar", "none"): "application/x-tar",
+    ("tar", "gzip"): "application/gzip",
+    ("tar", "zstd"): "application/zstd",
+    ("zip", "none"): "application/zip",
+    ("zip", "gzip"): "application/zip",
+}
+_EXTENSIONS = {"tar": ".tar", "zip": ".zip"}
+_COMPRESSION_EXTENSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# File đã nén sẵn: trong zip được lưu nguyên (STORED) thay vì nén lại vô ích
+_STORED_EXTENSIONS = {
+    ".gz", ".tgz", ".bz2", ".xz", ".zst", ".zip", ".7z", ".rar", ".jar", ".whl",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".mp4", ".mkv", ".mov", ".avi",
+    ".pdf", ".docx", ".xlsx", ".pptx", ".parquet",
+}
+
+_ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_TAR_MAGIC = {"gzip": b"\x1f\x8b", "bzip2": b"BZh", "xz": b"\xfd7zXZ"}  # tarfile "r|*" tự giải nén
+_ZIP_MIN_DATE = (1980, 1, 1, 0, 0, 0)
+_MAX_SKIPPED = 100
+
+class _ArchiveOutput:
+    """
+    Bộ đệm đầu ra của archive: nén (gzip/zstd) nếu cần và gom thành chunk ~ARCHIVE_CHUNK_SIZE.
+    Không có seek() nên zipfile ghi ở chế độ stream (data descriptor sau mỗi file).
+    """
+
+    def __init__(self, compression: str):
+        self._parts: List[bytes] = []
+        self._buffered = 0
+        self._position = 0
+        if compression == "gzip":
+            # wbits=31: định dạng gzip (header + CRC) thay vì zlib
+            self._compressor = zlib.compressobj(ARCHIVE_GZIP_LEVEL, zlib.DEFLATED, 31)
+        elif compression == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compressobj()
+        else:
+            self._compressor = None
+
+    def write(self, data) -> int:
+        size = len(data)
+        self._position += size
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        if data:
+            self._parts.append(bytes(data))
+            self._buffered += len(data)
+        return size
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def ready(self) -> bool:
+        return self._buffered >= ARCHIVE_CHUNK_SIZE
+
+    def take(self, final: bool = False) -> bytes:
+        if final and self._compressor is not None:
+            self._parts.append(self._compressor.flush())
+            self._compressor = None
+        data = b"".join(self._parts)
+        self._parts.clear()
+        self._buffered = 0
+        return data
+
+def _iter_entries(root: str, include: List[str], exclude: List[str]) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """
+    Duyệt cây theo chiều sâu, tên sắp xếp (archive tạo lại giống nhau), không theo symlink.
+    Trả về (đường dẫn, đường dẫn tương đối dùng "/", lstat). include/exclude giống /files/walk.
+    """
+    stack = [(root, "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                items = sorted(entries, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Cannot read directory for archive: {directory}: {str(e)}")
+            continue
+        subdirectories = []
+        for entry in items:
+            rel_path = prefix + entry.name
+            if exclude and file_service._matches_any(entry.name, rel_path, exclude):
+                continue
+            try:
+                stat_info = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            is_dir = stat.S_ISDIR(stat_info.st_mode)
+            if not include or file_service._matches_any(entry.name, rel_path, include):
+                yield entry.path, rel_path, stat_info
+            if is_dir:
+                subdirectories.append((entry.path, rel_path + "/"))
+        # Stack LIFO: đảo ngược để thư mục con được duyệt theo thứ tự tên
+        stack.extend(reversed(subdirectories))
+
+def _read_exactly(f: BinaryIO, size: int) -> Iterator[bytes]:
+    """
+    Đọc đúng size byte (kích thước lúc mở file): file bị cắt ngắn trong lúc đọc được bù byte 0,
+    file dài thêm bị bỏ phần sau - header đã ghi kích thước nên archive luôn hợp lệ.
+    """
+    remaining = size
+    while remaining > 0:
+        try:
+            chunk = f.read(min(ARCHIVE_CHUNK_SIZE, remaining))
+        except OSError as e:
+            logger.warning(f"Cannot read {f.name} for archive: {str(e)}")
+            chunk = b""
+        if not chunk:
+            chunk = bytes(min(ARCHIVE_CHUNK_SIZE, remaining))
+        else:
+            file_service.BYTES_READ.inc(len(chunk), op="archive")
+        remaining -= len(chunk)
+        yield chunk
+
+class _TarWriter:
+    def __init__(self, output: _ArchiveOutput):
+        self._output = output
+
+    def _header(self, name: str, stat_info: os.stat_result, kind: bytes, size: int = 0, linkname: str = ""):
+        info = tarfile.TarInfo(name)
+        info.type = kind
+        info.size = size
+        info.mode = stat.S_IMODE(stat_info.st_mode)
+        info.mtime = int(stat_info.st_mtime)
+        info.uid, info.gid = stat_info.st_uid, stat_info.st_gid
+        info.linkname = linkname
+        self._output.write(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+
+    def add_directory(self, name: str, stat_info: os.stat_result):
+        self._header(name, stat_info, tarfile.DIRTYPE)
+
+    def add_symlink(self, name: str, target: str, stat_info: os.stat_result):
+        self._header(name, stat_info, tarfile.SYMTYPE, linkname=target)
+
+    def add_file(self, name: str, f: BinaryIO, stat_info: os.stat_result) -> Iterator[None]:
+        self._header(name, stat_info, tarfile.REGTYPE, stat_info.st_size)
+        for chunk in _read_exactly(f, stat_info.st_size):
+            self._output.write(chunk)
+            yield
+        remainder = stat_info.st_size % tarfile.BLOCKSIZE
+        if remainder:
+            self._output.write(bytes(tarfile.BLOCKSIZE - remainder))
+
+    def close(self):
+        # Kết thúc bằng hai block 0, làm tròn tới RECORDSIZE như tarfile
+        self._output.write(bytes(2 * tarfile.BLOCKSIZE))
+        remainder = self._output.tell() % tarfile.RECORDSIZE
+        if remainder:
+            self._output.write(bytes(tarfile.RECORDSIZE - remainder))
+
+class _ZipWriter:
+    def __init__(self, output: _ArchiveOutput, compression: str):
+        self._zip = zipfile.ZipFile(output, "w", allowZip64=True)
+        self._compress_type = zipfile.ZIP_DEFLATED if compression == "gzip" else zipfile.ZIP_STORED
+
+    def _info(self, name: str, stat_info: os.stat_result, compress_type: int = zipfile.ZIP_STORED) -> zipfile.ZipInfo:
+        date_time = max(time.localtime(stat_info.st_mtime)[:6], _ZIP_MIN_DATE)
+        info = zipfile.ZipInfo(name, date_time)
+        info.create_system = 3  # Unix: external_attr chứa st_mode
+        info.external_attr = (stat_info.st_mode & 0xFFFF) << 16
+        info.compress_type = compress_type
+        if compress_type == zipfile.ZIP_DEFLATED:
+            info._compresslevel = ARCHIVE_GZIP_LEVEL
+        return info
+
+    def add_directory(self, name: str, stat_info: os.stat_result):
+        info = self._info(name + "/", stat_info)
+        info.external_attr |= 0x10  # MS-DOS directory
+        self._zip.writestr(info, b"")
+
+    def add_symlink(self, name: str, target: str, stat_info: os.stat_result):
+        self._zip.writestr(self._info(name, stat_info), os.fsencode(target))
+
+    def add_file(self, name: str, f: BinaryIO, stat_info: os.stat_result) -> Iterator[None]:
+        compress_type = self._compress_type
+        if os.path.splitext(name)[1].lower() in _STORED_EXTENSIONS:
+            compress_type = zipfile.ZIP_STORED
+        info = self._info(name, stat_info, compress_type)
+        with self._zip.open(info, "w", force_zip64=stat_info.st_size >= zipfile.ZIP64_LIMIT) as target:
+            for chunk in _read_exactly(f, stat_info.st_size):
+                target.write(chunk)
+                yield
+
+    def close(self):
+        self._zip.close()
+
+def _check_compression(fmt: str, compression: str):
+    if fmt not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format: {fmt}. Allowed: {', '.join(ARCHIVE_FORMATS)}")
+    if compression not in ARCHIVE_COMPRESSIONS:
+        raise HTTPException(status_code=400,
+                            detail=f"Invalid compression: {compression}. Allowed: {', '.join(ARCHIVE_COMPRESSIONS)}")
+    if compression == "zstd":
+        if fmt == "zip":
+            raise HTTPException(status_code=400, detail="zstd compression is only available for tar archives")
+        if zstandard is None:
+            raise HTTPException(status_code=400, detail="zstd compression requires the zstandard package")
+
+@handle_exceptions
+def open_archive(path: str, fmt: str = "tar", compression: str = "none", include: Optional[List[str]] = None,
+                 exclude: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Chuẩn bị tải thư mục (hoặc file) dạng archive. Trả về tên file, kiểu MIME và iterator các chunk;
+    archive được tạo trong lúc client đọc, bộ nhớ không phụ thuộc kích thước cây thư mục.
+
+    Params:
+        fmt: tar hoặc zip
+        compression: none, gzip (zip: deflate) hoặc zstd (chỉ tar, cần zstandard)
+        include: glob (theo tên hoặc đường dẫn tương đối) - chỉ đưa vào archive entry khớp
+        exclude: glob - bỏ qua entry khớp và không duyệt vào thư mục khớp
+    """
+    norm_path = normalize_path(path)
+
+    if not os.path.lexists(norm_path):
+        raise FileNotFoundError(f"Path does not exist: {path}")
+
+    _check_compression(fmt, compression)
+    name = os.path.basename(norm_path.rstrip(os.sep)) or "archive"
+    return {
+        "path": norm_path,
+        "filename": name + _EXTENSIONS[fmt] + (_COMPRESSION_EXTENSIONS[compression] if fmt == "tar" else ""),
+        "media_type": MEDIA_TYPES[(fmt, compression)],
+        "chunks": _iter_archive(norm_path, name, fmt, compression, include or [], exclude or []),
+    }
+
+def _iter_archive(norm_path: str, name: str, fmt: str, compression: str, include: List[str],
+                  exclude: List[str]) -> Iterator[bytes]:
+    if fmt == "zip":
+        # zip nén từng file (deflate) bên trong archive
+        output = _ArchiveOutput("none")
+        writer = _ZipWriter(output, compression)
+    else:
+        output = _ArchiveOutput(compression)
+        writer = _TarWriter(output)
+    started = time.time()
+    count = 0
+
+    root_stat = os.lstat(norm_path)
+    if stat.S_ISDIR(root_stat.st_mode):
+        # Các entry nằm dưới thư mục gốc cùng tên, giải nén ra đúng một thư mục
+        writer.add_directory(name, root_stat)
+        entries = ((entry_path, f"{name}/{rel_path}", stat_info)
+                   for entry_path, rel_path, stat_info in _iter_entries(norm_path, include, exclude))
+    else:
+        entries = iter([(norm_path, name, root_stat)])
+
+    for entry_path, arcname, stat_info in entries:
+        mode = stat_info.st_mode
+        try:
+            if stat.S_ISDIR(mode):
+                writer.add_directory(arcname, stat_info)
+            elif stat.S_ISLNK(mode):
+                # Lưu symlink nguyên dạng, không theo link nên không lộ dữ liệu ngoài cây
+                writer.add_symlink(arcname, os.readlink(entry_path), stat_info)
+            elif stat.S_ISREG(mode):
+                with open(entry_path, "rb") as f:
+                    for _ in writer.add_file(arcname, f, os.fstat(f.fileno())):
+                        if output.ready():
+                            yield output.take()
+            else:
+                continue  # FIFO, socket, thiết bị: bỏ qua (đọc FIFO có thể bị treo)
+        except OSError as e:
+            logger.warning(f"Skipping {entry_path} in archive: {str(e)}")
+            continue
+        count += 1
+        if output.ready():
+            yield output.take()
+
+    writer.close()
+    yield output.take(final=True)
+    logger.info(f"Archived {count} entries from {norm_path} ({fmt}, {compression}) in {time.time() - started:.2f}s")
+
+class _Extraction:
+    """
+    Ghi các entry của archive vào thư mục đích. Mọi đường dẫn được kiểm tra trước khi ghi:
+    bỏ qua đường dẫn tuyệt đối, "..", symlink có ".." hoặc trỏ ra ngoài thư mục đích, hardlink
+    ra ngoài và thư mục cha (kể cả symlink có sẵn trên đĩa) nằm ngoài thư mục đích.
+    """
+
+    def __init__(self, destination: str, overwrite: bool):
+        self.destination = destination
+        self.overwrite = overwrite
+        self._real_destination = os.path.realpath(destination)
+        self._safe_parents = set()
+        self._directories: List[Tuple[str, int, float]] = []
+        self.files = self.directories = self.symlinks = self.bytes = 0
+        self.skipped: List[Dict[str, str]] = []
+        self.skipped_count = 0
+
+    def skip(self, name: str, reason: str):
+        self.skipped_count += 1
+        if len(self.skipped) < _MAX_SKIPPED:
+            self.skipped.append({"name": name, "reason": reason})
+
+    def _inside(self, path: str) -> bool:
+        return os.path.commonpath([self._real_destination, path]) == self._real_destination
+
+    def _resolve(self, name: str) -> Optional[str]:
+        parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+        if not parts or name.startswith(("/", "\\")) or ".." in parts or ":" in parts[0]:
+            self.skip(name, "unsafe path")
+            return None
+        target = os.path.join(self.destination, *parts)
+        parent = os.path.dirname(target)
+        if parent not in self._safe_parents:
+            # Kiểm tra thư mục tổ tiên sâu nhất đang tồn tại trước khi tạo thư mục: symlink có sẵn
+            # trong thư mục đích không được dùng để tạo thư mục ở ngoài
+            ancestor = parent
+            while not os.path.lexists(ancestor):
+                ancestor = os.path.dirname(ancestor)
+            if not self._inside(os.path.realpath(ancestor)):
+                self.skip(name, "parent directory resolves outside the destination")
+                return None
+            os.makedirs(parent, exist_ok=True)
+            if not self._inside(os.path.realpath(parent)):
+                self.skip(name, "parent directory resolves outside the destination")
+                return None
+            self._safe_parents.add(parent)
+        return target
+
+    def target(self, name: str) -> Optional[str]:
+        """
+        Đường dẫn đích của entry, None (đã ghi vào skipped) nếu không an toàn hoặc không được ghi đè
+        """
+        target = self._resolve(name)
+        if target is None:
+            return None
+        if os.path.lexists(target) and not self.overwrite and not os.path.isdir(target):
+            self.skip(name, "already exists")
+            return None
+        return target
+
+    def _clear(self, target: str):
+        # Ghi đè: xóa file/symlink cũ (không theo symlink)
+        if os.path.islink(target) or (os.path.lexists(target) and not os.path.isdir(target)):
+            os.remove(target)
+
+    def add_directory(self, name: str, mode: int, mtime: float):
+        target = self.target(name)
+        if target is None:
+            return
+        if os.path.islink(target) and not self.overwrite:
+            self.skip(name, "already exists")
+            return
+        if os.path.islink(target) or (os.path.lexists(target) and not os.path.isdir(target)):
+            self._clear(target)
+        os.makedirs(target, exist_ok=True)
+        self._directories.append((target, mode, mtime))
+        self.directories += 1
+
+    def add_file(self, name: str, source: BinaryIO, mode: int, mtime: float):
+        target = self.target(name)
+        if target is None:
+            return
+        if os.path.isdir(target) and not os.path.islink(target):
+            self.skip(name, "a directory exists at this path")
+            return
+        # Ghi vào .part rồi rename: upload bị ngắt không để lại file dở.
+        # .part cũ (có thể là symlink do chính archive tạo ra) bị xóa, file mới được tạo với
+        # O_EXCL|O_NOFOLLOW nên không bao giờ ghi xuyên qua symlink
+        part = copy_service.part_path(target)
+        if os.path.lexists(part):
+            if os.path.isdir(part) and not os.path.islink(part):
+                self.skip(name, "a directory exists at the temporary path")
+                return
+            os.remove(part)
+        written = 0
+        fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0)
+                     | getattr(os, "O_BINARY", 0), 0o600)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = source.read(ARCHIVE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    written += len(chunk)
+                f.flush()
+                if os.chmod in os.supports_fd:
+                    os.chmod(f.fileno(), _safe_mode(mode, 0o644))
+                    os.utime(f.fileno(), (mtime, mtime))
+                else:
+                    os.chmod(part, _safe_mode(mode, 0o644))
+                    os.utime(part, (mtime, mtime))
+            file_service.BYTES_WRITTEN.inc(written, op="extract")
+            os.replace(part, target)
+        except BaseException:
+            if os.path.lexists(part):
+                os.remove(part)
+            raise
+        self.files += 1
+        self.bytes += written
+
+    def add_symlink(self, name: str, link_target: str):
+        target = self.target(name)
+        if target is None:
+            return
+        # Link chứa ".." bị từ chối: kernel theo symlink trước khi xử lý "..", kiểm tra bằng chuỗi
+        # không đủ và symlink trung gian có thể bị thay sau đó. Phần còn lại được resolve trên đĩa.
+        link_parts = link_target.replace("\\", "/").split("/")
+        if os.path.isabs(link_target) or link_target.startswith("\\") or ".." in link_parts:
+            self.skip(name, "symlink points outside the destination")
+            return
+        if not self._inside(os.path.realpath(os.path.join(os.path.dirname(target), link_target))):
+            self.skip(name, "symlink points outside the destination")
+            return
+        if os.path.isdir(target) and not os.path.islink(target):
+            self.skip(name, "a directory exists at this path")
+            return
+        self._clear(target)
+        os.symlink(link_target, target)
+        # Symlink mới có thể đổi nơi trỏ tới của các thư mục cha đã kiểm tra
+        self._safe_parents.clear()
+        self.symlinks += 1
+
+    def add_hardlink(self, name: str, link_name: str):
+        target = self.target(name)
+        source = self._resolve(link_name) if target is not None else None
+        if target is None or source is None:
+            return
+        if not os.path.isfile(source) or os.path.islink(source):
+            self.skip(name, "hard link target is not an extracted file")
+            return
+        self._clear(target)
+        os.link(source, target)
+        self.files += 1
+
+    def finish(self):
+        # Quyền/thời gian của thư mục được đặt sau cùng (ghi file bên trong làm đổi mtime), sâu trước
+        for target, mode, mtime in sorted(self._directories, key=lambda item: item[0], reverse=True):
+            if os.path.islink(target):
+                continue  # Đã bị thay bằng symlink sau khi tạo - không đổi quyền của nơi nó trỏ tới
+            try:
+                os.chmod(target, _safe_mode(mode, 0o755) | 0o700)
+                os.utime(target, (mtime, mtime))
+            except OSError as e:
+                logger.warning(f"Cannot set attributes of {target}: {str(e)}")
+
+def _safe_mode(mode: int, default: int) -> int:
+    # Bỏ setuid/setgid/sticky; chủ sở hữu luôn đọc/ghi được
+    mode = stat.S_IMODE(mode) & 0o777
+    return (mode or default) | 0o600
+
+def _extract_tar(archive: tarfile.TarFile, extraction: _Extraction):
+    for member in archive:
+        if member.isdir():
+            extraction.add_directory(member.name, member.mode, member.mtime)
+        elif member.isreg():
+            extraction.add_file(member.name, archive.extractfile(member), member.mode, member.mtime)
+        elif member.issym():
+            extraction.add_symlink(member.name, member.linkname)
+        elif member.islnk():
+            extraction.add_hardlink(member.name, member.linkname)
+        else:
+            extraction.skip(member.name, "unsupported entry type")
+
+def _extract_zip(archive: zipfile.ZipFile, extraction: _Extraction):
+    for info in archive.infolist():
+        mode = info.external_attr >> 16
+        mtime = time.mktime(info.date_time + (0, 0, -1))
+        if info.is_dir():
+            extraction.add_directory(info.filename, mode, mtime)
+        elif info.create_system == 3 and stat.S_ISLNK(mode):
+            extraction.add_symlink(info.filename, os.fsdecode(archive.read(info)))
+        else:
+            with archive.open(info) as source:
+                extraction.add_file(info.filename, source, mode, mtime)
+
+@handle_exceptions
+def extract_archive(stream: BinaryIO, path: str, overwrite: bool = True) -> Dict[str, Any]:
+    """
+    Giải nén archive đọc từ stream (body của request) vào thư mục path, nhận dạng định dạng theo magic bytes:
+    tar (thường, gzip, bz2, xz, zstd) được giải nén tuần tự ngay khi nhận dữ liệu;
+    zip cần đọc central directory ở cuối nên được spool ra file tạm trước.
+    Entry không an toàn hoặc không hỗ trợ được bỏ qua và liệt kê trong skipped.
+    """
+    norm_path = normalize_path(path)
+
+    if os.path.lexists(norm_path) and not os.path.isdir(norm_path):
+        raise HTTPException(status_code=409, detail=f"Path is not a directory: {path}")
+    os.makedirs(norm_path, exist_ok=True)
+
+    reader = stream if isinstance(stream, io.BufferedReader) else io.BufferedReader(stream, ARCHIVE_CHUNK_SIZE)
+    magic = reader.peek(4)[:4]
+    extraction = _Extraction(norm_path, overwrite)
+    started = time.time()
+
+    try:
+        if magic.startswith(_ZIP_MAGIC):
+            fmt, compression = "zip", "none"
+            with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE, dir=norm_path) as spool:
+                shutil.copyfileobj(reader, spool, ARCHIVE_CHUNK_SIZE)
+                spool.seek(0)
+                with zipfile.ZipFile(spool) as archive:
+                    _extract_zip(archive, extraction)
+        elif magic == _ZSTD_MAGIC:
+            if zstandard is None:
+                raise HTTPException(status_code=400, detail="zstd archives require the zstandard package")
+            fmt, compression = "tar", "zstd"
+            decompressed = zstandard.ZstdDecompressor().stream_reader(reader, read_size=ARCHIVE_CHUNK_SIZE)
+            with tarfile.open(fileobj=decompressed, mode="r|", bufsize=ARCHIVE_CHUNK_SIZE) as archive:
+                _extract_tar(archive, extraction)
+        else:
+            fmt = "tar"
+            compression = next((name for name, prefix in _TAR_MAGIC.items() if magic.startswith(prefix)), "none")
+            with tarfile.open(fileobj=reader, mode="r|*", bufsize=ARCHIVE_CHUNK_SIZE) as archive:
+                _extract_tar(archive, extraction)
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid or truncated archive: {str(e)}")
+    finally:
+        extraction.finish()
+
+    return {
+        "path": norm_path,
+        "format": fmt,
+        "compression": compression,
+        "files": extraction.files,
+        "directories": extraction.directories,
+        "symlinks": extraction.symlinks,
+        "bytes": extraction.bytes,
+        "skipped": extraction.skipped,
+        "skipped_count": extraction.skipped_count,
+        "elapsed": round(time.time() - started, 3),
+    }
\ No newline at end of file
@@ -0,0 +1,349 @@
+import os
+import json
+import zlib
+import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from dotenv import load_dotenv
+from app.utils.common import normalize_path, handle_exceptions, logger, ensure_private_dir, STATE_DIR
+from app.utils import metrics
+
+# Load biến môi trường
+load_dotenv()
+SCAN_CACHE_ENABLED = os.getenv("SCAN_CACHE_ENABLED", "true").lower() == "true"
+SCAN_CACHE_MEMORY_BYTES = int(os.getenv("SCAN_CACHE_MEMORY_BYTES", str(256 * 1024 * 1024)))
+SCAN_CACHE_DIR = os.getenv("SCAN_CACHE_DIR", os.path.join(STATE_DIR, "scan-cache"))
+SCAN_CACHE_DISK_BYTES = int(os.getenv("SCAN_CACHE_DISK_BYTES", str(2 * 1024 * 1024 * 1024)))
+SCAN_CACHE_COMPRESS_LEVEL = int(os.getenv("SCAN_CACHE_COMPRESS_LEVEL", "1"))
+
+# Đổi khi định dạng kết quả của parser thay đổi để bỏ qua các bản cache cũ trên đĩa
+CACHE_FORMAT_VERSION = 1
+# Bản trong bộ nhớ nhỏ hơn ngưỡng này được giải pickle ngay trên event loop, lớn hơn thì qua pool io
+INLINE_DECODE_BYTES = 256 * 1024
+
+def _prepare_disk_dir(path: str) -> bool:
+    """
+    Tầng đĩa unpickle các file trong thư mục cache, nên chỉ bật khi đó là thư mục riêng của user chạy server
+    (ensure_private_dir); ngược lại tắt tầng đĩa kèm cảnh báo.
+    """
+    try:
+        ensure_private_dir(path)
+    except OSError as e:
+        logger.warning(f"Scan cache disk tier disabled: {e}")
+        return False
+    return True
+
+class ParseCache:
+    """
+    Cache hai tầng cho kết quả phân tích tài liệu: LRU trong bộ nhớ (giới hạn theo byte)
+    và kho trên đĩa (pickle nén zlib). Khóa gồm parser, đường dẫn, kích thước, mtime_ns và tùy chọn.
+    Tầng bộ nhớ giữ bản pickle (bytes) thay vì object: mỗi lần hit tạo object mới,
+    nên caller sửa kết quả không làm hỏng các lần hit sau.
+    """
+
+    def __init__(self, memory_bytes: int, disk_dir: Optional[str], disk_bytes: int, compress_level: int):
+        self.memory_bytes = max(0, memory_bytes)
+        self.disk_dir = disk_dir if disk_dir and _prepare_disk_dir(disk_dir) else None
+        self.disk_bytes = max(0, disk_bytes)
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_used = 0
+        self._disk_lock = threading.Lock()
+        self._disk_used = None
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "disk_errors": 0
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # ---- Tầng bộ nhớ ----
+
+    def get_memory(self, key: str) -> Optional[bytes]:
+        """
+        Bản pickle của kết quả trong bộ nhớ (giải bằng decode)
+        """
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is None:
+                return None
+            self._memory.move_to_end(key)
+            self._counters["memory_hits"] += 1
+            return raw
+
+    def _put_memory(self, key: str, raw: bytes):
+        size = len(raw)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= len(old)
+            self._memory[key] = raw
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+                self._counters["memory_evictions"] += 1
+
+    # ---- Tầng đĩa ----
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".bin")
+
+    def _disk_usage(self) -> int:
+        if self._disk_used is None:
+            total = 0
+            try:
+                with os.scandir(self.disk_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".bin"):
+                            total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+            self._disk_used = total
+        return self._disk_used
+
+    def get_disk(self, key: str) -> Optional[Any]:
+        """
+        Đọc từ đĩa (blocking - gọi qua pool io), đưa lại vào tầng bộ nhớ nếu tìm thấy.
+        Không tìm thấy ở tầng đĩa được tính là một lần miss.
+        """
+        if self.disk_dir is None:
+            self._count("misses")
+            return None
+        disk_path = self._disk_path(key)
+        try:
+            with open(disk_path, "rb") as f:
+                raw = zlib.decompress(f.read())
+            stored_key, value = pickle.loads(raw)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable scan cache entry {disk_path}: {e}")
+            self._count("disk_errors")
+            self._count("misses")
+            self._remove_disk_file(disk_path)
+            return None
+        if stored_key != key:
+            self._count("misses")
+            return None
+        # Cập nhật mtime để việc dọn dẹp theo LRU giữ lại các bản được dùng gần đây
+        try:
+            os.utime(disk_path)
+        except OSError:
+            pass
+        self._count("disk_hits")
+        self._put_memory(key, raw)
+        return value
+
+    def _remove_disk_file(self, disk_path: str):
+        try:
+            size = os.path.getsize(disk_path)
+            os.remove(disk_path)
+        except OSError:
+            return
+        with self._disk_lock:
+            if self._disk_used is not None:
+                self._disk_used = max(0, self._disk_used - size)
+
+    def _put_disk(self, key: str, blob: bytes):
+        if self.disk_dir is None or len(blob) > self.disk_bytes:
+            return
+        if not os.path.isdir(self.disk_dir) and not _prepare_disk_dir(self.disk_dir):
+            self._count("disk_errors")
+            return
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        except OSError as e:
+            logger.warning(f"Cannot write scan cache entry: {e}")
+            self._count("disk_errors")
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            disk_path = self._disk_path(key)
+            with self._disk_lock:
+                used = self._disk_usage()
+                if os.path.exists(disk_path):
+                    used -= os.path.getsize(disk_path)
+                os.replace(temp_path, disk_path)
+                self._disk_used = used + len(blob)
+                if self._disk_used > self.disk_bytes:
+                    self._evict_disk()
+        except OSError as e:
+            logger.warning(f"Cannot write scan cache entry: {e}")
+            self._count("disk_errors")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _evict_disk(self):
+        # Xóa các bản cũ nhất (theo mtime) cho tới khi về dưới 90% giới hạn
+        entries = []
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".bin"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        target = self.disk_bytes * 0.9
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if used <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            used -= size
+            self._count("disk_evictions")
+        self._disk_used = used
+
+    # ---- API ----
+
+    def store(self, key: str, value: Any):
+        """
+        Lưu kết quả vào cả hai tầng (blocking - gọi qua pool io)
+        """
+        raw = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        self._count("stores")
+        self._put_memory(key, raw)
+        if self.disk_dir is not None:
+            self._put_disk(key, zlib.compress(raw, self.compress_level))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+        if self.disk_dir is not None and os.path.isdir(self.disk_dir):
+            with self._disk_lock:
+                with os.scandir(self.disk_dir) as it:
+                    for entry in it:
+                        if entry.name.endswith((".bin", ".tmp")):
+                            try:
+                                os.remove(entry.path)
+                            except OSError:
+                                pass
+                self._disk_used = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._disk_lock:
+            disk_used = self._disk_usage() if self.disk_dir is not None else 0
+        with self._lock:
+            counters = dict(self._counters)
+            hits = counters["memory_hits"] + counters["disk_hits"]
+            lookups = hits + counters["misses"]
+            return {
+                "enabled": True,
+                **counters,
+                "hits": hits,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "memory_limit": self.memory_bytes,
+                "disk_dir": self.disk_dir,
+                "disk_bytes": disk_used,
+                "disk_limit": self.disk_bytes if self.disk_dir is not None else 0
+            }
+
+_cache: Optional[ParseCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[ParseCache]:
+    """
+    Trả về cache nếu SCAN_CACHE_ENABLED=true, ngược lại None
+    """
+    global _cache
+    if not SCAN_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache(SCAN_CACHE_MEMORY_BYTES, SCAN_CACHE_DIR, SCAN_CACHE_DISK_BYTES, SCAN_CACHE_COMPRESS_LEVEL)
+        return _cache
+
+def make_key(parser: str, path: str, options: Dict[str, Any]) -> Optional[str]:
+    """
+    Tạo khóa cache từ (parser, đường dẫn, kích thước, mtime_ns, tùy chọn).
+    Trả về None nếu không stat được file - khi đó parser sẽ tự báo lỗi phù hợp.
+    """
+    if get_cache() is None:
+        return None
+    try:
+        norm_path = normalize_path(path)
+        stat = os.stat(norm_path)
+    except Exception:
+        return None
+    return json.dumps([CACHE_FORMAT_VERSION, parser, norm_path, stat.st_size, stat.st_mtime_ns, options],
+                      sort_keys=True, default=str)
+
+def lookup_memory(key: str) -> Optional[bytes]:
+    """
+    Bản pickle của kết quả nếu có trong bộ nhớ; giải bằng decode (mỗi lần một object mới)
+    """
+    cache = get_cache()
+    return cache.get_memory(key) if cache is not None else None
+
+def decode(raw: bytes) -> Any:
+    return pickle.loads(raw)[1]
+
+def lookup_disk(key: str) -> Optional[Any]:
+    cache = get_cache()
+    return cache.get_disk(key) if cache is not None else None
+
+def store(key: str, value: Any):
+    cache = get_cache()
+    if cache is not None:
+        cache.store(key, value)
+
+@handle_exceptions
+def stats() -> Dict[str, Any]:
+    """
+    Thống kê hit/miss/eviction của cache
+    """
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+    return cache.stats()
+
+@handle_exceptions
+def clear() -> Dict[str, Any]:
+    """
+    Xóa toàn bộ cache (bộ nhớ và đĩa)
+    """
+    cache = get_cache()
+    if cache is not None:
+        cache.clear()
+    return stats()
+
+def _collect_cache_metrics() -> list:
+    if _cache is None:
+        return []
+    data = _cache.stats()
+    return [
+        ("scan_cache_lookups_total", "counter", "Parse cache lookups by result",
+         [({"result": "memory_hit"}, data["memory_hits"]), ({"result": "disk_hit"}, data["disk_hits"]),
+          ({"result": "miss"}, data["misses"])]),
+        ("scan_cache_evictions_total", "counter", "Entries evicted from the parse cache",
+         [({"tier": "memory"}, data["memory_evictions"]), ({"tier": "disk"}, data["disk_evictions"])]),
+        ("scan_cache_bytes", "gauge", "Bytes used by the parse cache",
+         [({"tier": "memory"}, data["memory_bytes"]), ({"tier": "disk"}, data["disk_bytes"])]),
+    ]
+
+metrics.register_collector(_collect_cache_metrics)
\ No newline at end of file
@@ -0,0 +1,410 @@
+import os
+import sys
+import stat
+import time
+import errno
+import queue
+import shutil
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.common import logger
+from app.utils import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Load biến môi trường
+load_dotenv()
+COPY_WORKERS = int(os.getenv("COPY_WORKERS", "8"))  # Số file được sao chép đồng thời
+COPY_CHUNK_SIZE = int(os.getenv("COPY_CHUNK_SIZE", str(16 * 1024 * 1024)))  # Byte mỗi lần gọi copy_file_range/sendfile
+COPY_PROGRESS_INTERVAL = float(os.getenv("COPY_PROGRESS_INTERVAL", "0.5"))  # Giây giữa hai lần gửi tiến độ
+
+# Bỏ qua file đích đã giống nguồn:
+# - size_mtime: cùng kích thước và thời gian sửa đổi (copy giữ nguyên mtime nên chạy lại sẽ bỏ qua file đã xong)
+# - hash: cùng kích thước và SHA-256 (đọc cả hai file)
+SKIP_MODES = ("size_mtime", "hash")
+
+# Phương thức sao chép, theo thứ tự thử: reflink (FICLONE, btrfs/XFS/overlayfs...), copy_file_range,
+# sendfile (đều chép trong kernel, không qua bộ nhớ của process) và read/write thông thường
+COPY_METHODS = ("clone", "copy_file_range", "sendfile", "userspace")
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) trong linux/fs.h
+PART_SUFFIX = ".part"
+
+# Lỗi nghĩa là hệ thống file/kernel không hỗ trợ phương thức này - thử phương thức tiếp theo
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL,
+                       errno.ENOTTY, errno.EBADF}
+
+COPY_BYTES = metrics.counter("copy_bytes_total", "Bytes copied by the copy engine by method", ("method",))
+COPY_FILES = metrics.counter("copy_files_total", "Files handled by the copy engine by result", ("result",))
+
+class CopyCancelled(Exception):
+    pass
+
+class CopyProgress:
+    """
+    Tiến độ của một lần sao chép, cập nhật từ các worker và đọc bằng snapshot() (API stream, job).
+    Gọi cancel() để dừng: file đang chép dở được giữ lại dạng .part để tiếp tục (resume) lần sau.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.phase = "scanning"
+        self.files_total = 0
+        self.bytes_total = 0
+        self.files_copied = 0
+        self.files_skipped = 0
+        self.files_failed = 0
+        self.bytes_copied = 0
+        self.bytes_skipped = 0
+        self.bytes_resumed = 0
+        self.methods: Dict[str, int] = {}
+        self.errors: List[Dict[str, str]] = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def set_totals(self, files: int, size: int):
+        with self._lock:
+            self.files_total, self.bytes_total, self.phase = files, size, "copying"
+
+    def add_resumed(self, count: int):
+        with self._lock:
+            self.bytes_resumed += count
+
+    def add_bytes(self, count: int):
+        with self._lock:
+            self.bytes_copied += count
+
+    def file_done(self, method: str, size: int):
+        with self._lock:
+            if method == "skipped":
+                self.files_skipped += 1
+                self.bytes_skipped += size
+            else:
+                self.files_copied += 1
+                self.methods[method] = self.methods.get(method, 0) + 1
+        COPY_FILES.inc(result="skipped" if method == "skipped" else "copied")
+
+    def file_failed(self, path: str, error: Exception):
+        with self._lock:
+            self.files_failed += 1
+            if len(self.errors) < 100:
+                self.errors.append({"path": path, "error": str(error)})
+        COPY_FILES.inc(result="failed")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-6)
+            bytes_done = self.bytes_copied + self.bytes_skipped + self.bytes_resumed
+            throughput = self.bytes_copied / elapsed
+            remaining = max(self.bytes_total - bytes_done, 0)
+            return {
+                "phase": self.phase,
+                "files_total": self.files_total,
+                "files_done": self.files_copied + self.files_skipped + self.files_failed,
+                "files_copied": self.files_copied,
+                "files_skipped": self.files_skipped,
+                "files_failed": self.files_failed,
+                "bytes_total": self.bytes_total,
+                "bytes_done": bytes_done,
+                "bytes_copied": self.bytes_copied,
+                "bytes_skipped": self.bytes_skipped,
+                "bytes_resumed": self.bytes_resumed,
+                "elapsed": round(elapsed, 3),
+                "throughput": round(throughput),  # byte/giây (chỉ tính dữ liệu thực sự chép)
+                "eta": round(remaining / throughput, 1) if throughput > 0 and self.phase == "copying" else None,
+                "methods": dict(self.methods),
+                "errors": list(self.errors),
+                "cancelled": self.cancelled
+            }
+
+_unsupported: set = set()  # Phương thức đã thất bại vì không được hỗ trợ (áp dụng cho các file sau)
+_unsupported_lock = threading.Lock()
+
+def _mark_unsupported(method: str, error: OSError):
+    # Chỉ ghi nhớ khi kernel không có syscall; lỗi do hệ thống file (EXDEV...) có thể khác giữa các cặp file
+    if error.errno == errno.ENOSYS:
+        with _unsupported_lock:
+            _unsupported.add(method)
+
+def _try_clone(src_fd: int, dst_fd: int) -> bool:
+    # Reflink: file đích dùng chung block với nguồn (copy-on-write), gần như tức thời với mọi kích thước
+    if fcntl is None or not sys.platform.startswith("linux") or "clone" in _unsupported:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+        _mark_unsupported("clone", e)
+        return False
+
+def _copy_range(src_fd: int, dst_fd: int, offset: int, size: int, progress: CopyProgress) -> str:
+    """
+    Chép [offset, size) từ src_fd sang dst_fd (cùng offset), trả về phương thức đã dùng.
+    Chia thành các đoạn COPY_CHUNK_SIZE để cập nhật tiến độ và kiểm tra hủy giữa các đoạn.
+    """
+    if hasattr(os, "copy_file_range") and "copy_file_range" not in _unsupported:
+        position = offset
+        try:
+            while position < size:
+                if progress.cancelled:
+                    raise CopyCancelled()
+                copied = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - position), position, position)
+                if copied == 0:
+                    break  # File nguồn ngắn lại trong lúc chép
+                position += copied
+                progress.add_bytes(copied)
+            return "copy_file_range"
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS or position != offset:
+                raise
+            _mark_unsupported("copy_file_range", e)
+
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux") and "sendfile" not in _unsupported:
+        # sendfile ghi vào vị trí hiện tại của file đích
+        position = offset
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        try:
+            while position < size:
+                if progress.cancelled:
+                    raise CopyCancelled()
+                sent = os.sendfile(dst_fd, src_fd, position, min(COPY_CHUNK_SIZE, size - position))
+                if sent == 0:
+                    break
+                position += sent
+                progress.add_bytes(sent)
+            return "sendfile"
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS or position != offset:
+                raise
+            _mark_unsupported("sendfile", e)
+
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buffer = bytearray(min(COPY_CHUNK_SIZE, 1024 * 1024))
+    view = memoryview(buffer)
+    with os.fdopen(src_fd, "rb", buffering=0, closefd=False) as reader:
+        while True:
+            if progress.cancelled:
+                raise CopyCancelled()
+            count = reader.readinto(buffer)
+            if not count:
+                break
+            written = 0
+            while written < count:
+                written += os.write(dst_fd, view[written:count])
+            progress.add_bytes(count)
+    return "userspace"
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _identical(src: str, src_stat: os.stat_result, dst: str, skip: str) -> bool:
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISREG(dst_stat.st_mode) or dst_stat.st_size != src_stat.st_size:
+        return False
+    if skip == "size_mtime":
+        return dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+    return _sha256(src) == _sha256(dst)
+
+def part_path(dst: str) -> str:
+    """
+    File tạm khi chép file lớn: .<tên>.part cùng thư mục đích, đổi tên thành file đích khi chép xong
+    """
+    directory, name = os.path.split(dst)
+    return os.path.join(directory, f".{name}{PART_SUFFIX}")
+
+def copy_file(src: str, dst: str, progress: CopyProgress, skip: Optional[str] = None, resume: bool = False) -> str:
+    """
+    Chép một file (kèm quyền và thời gian như shutil.copy2). File lớn hơn COPY_CHUNK_SIZE được chép qua
+    file .part rồi đổi tên, nên file đích không bao giờ ở trạng thái chép dở và có thể resume.
+    Trả về phương thức đã dùng hoặc "skipped".
+    """
+    src_stat = os.stat(src)
+    size = src_stat.st_size
+    if skip and _identical(src, src_stat, dst, skip):
+        progress.file_done("skipped", size)
+        return "skipped"
+
+    # File nhỏ (chép xong trong một lần gọi) được ghi thẳng vào đích, tránh thêm một lần tạo và đổi tên file
+    part = part_path(dst) if size > COPY_CHUNK_SIZE else dst
+    offset = 0
+    if resume and part != dst:
+        try:
+            part_stat = os.stat(part)
+            # Chỉ tiếp tục khi .part được ghi sau lần sửa đổi cuối của nguồn và không dài hơn nguồn
+            if part_stat.st_mtime_ns >= src_stat.st_mtime_ns and part_stat.st_size <= size:
+                offset = part_stat.st_size
+        except FileNotFoundError:
+            pass
+
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        # Không mở bằng O_TRUNC: nếu đích (hoặc .part) hóa ra chính là file nguồn (hard link, symlink...)
+        # thì nguồn đã bị xóa trắng trước khi kịp kiểm tra
+        dst_fd = os.open(part, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600)
+        try:
+            dst_stat = os.fstat(dst_fd)
+            if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+                raise shutil.SameFileError(f"{src} and {part} are the same file")
+            os.ftruncate(dst_fd, offset)
+            if offset:
+                progress.add_resumed(offset)
+            if size == 0:
+                method = "userspace"
+            elif offset == 0 and _try_clone(src_fd, dst_fd):
+                method = "clone"
+                progress.add_bytes(size)
+            else:
+                method = _copy_range(src_fd, dst_fd, offset, size, progress)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    shutil.copystat(src, part)
+    if part != dst:
+        os.replace(part, dst)
+    COPY_BYTES.inc(size - offset, method=method)
+    progress.file_done(method, size)
+    return method
+
+def _plan(src: str, dst: str) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str, int]]]:
+    """
+    Duyệt cây nguồn: (thư mục nguồn, thư mục đích) và (file nguồn, file đích, kích thước).
+    Symlink được đi theo như shutil.copytree(symlinks=False).
+    """
+    directories, files = [(src, dst)], []
+    for root, dirnames, filenames in os.walk(src, followlinks=True):
+        target_root = os.path.join(dst, os.path.relpath(root, src))
+        for name in dirnames:
+            directories.append((os.path.join(root, name), os.path.join(target_root, name)))
+        for name in filenames:
+            path = os.path.join(root, name)
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                size = 0  # Symlink hỏng - lỗi được ghi nhận khi chép
+            files.append((path, os.path.join(target_root, name), size))
+    return directories, files
+
+def copy_tree(src: str, dst: str, progress: CopyProgress, skip: Optional[str] = None, resume: bool = False,
+              workers: Optional[int] = None) -> List[Tuple[str, str, str]]:
+    """
+    Chép thư mục: tạo cây thư mục đích, chép các file song song trên workers thread (file lớn trước),
+    sau đó sao chép quyền/thời gian của các thư mục. Lỗi của từng file được ghi vào progress.errors;
+    trả về list (nguồn, đích, lỗi) như shutil.Error.
+    """
+    directories, files = _plan(src, dst)
+    files.sort(key=lambda item: item[2], reverse=True)
+    progress.set_totals(len(files), sum(size for _, _, size in files))
+    for _, target in directories:
+        os.makedirs(target, exist_ok=True)
+
+    tasks: queue.Queue = queue.Queue()
+    for item in files:
+        tasks.put(item)
+    failures: List[Tuple[str, str, str]] = []
+
+    def worker():
+        while not progress.cancelled:
+            try:
+                source, target, _ = tasks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                copy_file(source, target, progress, skip, resume)
+            except CopyCancelled:
+                return
+            except OSError as e:
+                progress.file_failed(source, e)
+                failures.append((source, target, str(e)))
+
+    count = max(1, min(workers or COPY_WORKERS, len(files)))
+    threads = [threading.Thread(target=worker, name=f"copy-{index}", daemon=True) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if not progress.cancelled:
+        # Thư mục cha sau thư mục con, vì chép file vào thư mục sẽ đổi mtime của nó
+        for source, target in reversed(directories):
+            try:
+                shutil.copystat(source, target)
+            except OSError as e:
+                failures.append((source, target, str(e)))
+    return failures
+
+def _check_distinct(src: str, dst: str):
+    """
+    Chép một đường dẫn lên chính nó sẽ xóa trắng nguồn (file đích được ghi đè từ đầu), còn chép thư mục
+    vào bên trong chính nó thì không bao giờ kết thúc - cả hai bị từ chối trước khi chép
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise HTTPException(status_code=400, detail=f"Source and destination are the same: {src}")
+    if os.path.isdir(src):
+        real_src = os.path.realpath(src)
+        if os.path.realpath(dst).startswith(real_src.rstrip(os.sep) + os.sep):
+            raise HTTPException(status_code=400, detail=f"Cannot copy a directory into itself: {src} -> {dst}")
+
+def copy_paths(src: str, dst: str, skip: Optional[str] = None, resume: bool = False,
+               workers: Optional[int] = None, progress: Optional[CopyProgress] = None) -> Dict[str, Any]:
+    """
+    Chép file hoặc thư mục (đường dẫn đã chuẩn hóa), trả về thống kê của progress.
+    Đích là thư mục có sẵn: file được chép vào bên trong (như shutil.copy2); thư mục được gộp vào
+    khi có skip hoặc resume, nếu không thì báo lỗi 409 (như shutil.copytree).
+    """
+    if skip is not None and skip not in SKIP_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid skip mode: {skip}. Allowed: {', '.join(SKIP_MODES)}")
+    if workers is not None and workers <= 0:
+        raise HTTPException(status_code=400, detail="workers must be positive")
+    progress = progress or CopyProgress()
+    if not os.path.isdir(src) and os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    _check_distinct(src, dst)
+
+    if os.path.isdir(src):
+        if os.path.exists(dst) and not (skip or resume):
+            raise HTTPException(status_code=409, detail=f"Destination already exists: {dst} "
+                                                        "(use skip or resume to merge into it)")
+        failures = copy_tree(src, dst, progress, skip, resume, workers)
+        item_type = "directory"
+    else:
+        progress.set_totals(1, os.path.getsize(src))
+        failures = []
+        try:
+            copy_file(src, dst, progress, skip, resume)
+        except CopyCancelled:
+            pass
+        item_type = "file"
+
+    progress.phase = "cancelled" if progress.cancelled else "done"
+    summary = progress.snapshot()
+    logger.info(f"Copied {src} -> {dst}: {summary['files_copied']} copied, {summary['files_skipped']} skipped, "
+                f"{summary['files_failed']} failed, {summary['bytes_copied']} bytes in {summary['elapsed']}s")
+    if failures:
+        # Giống shutil.copytree: báo lỗi sau khi đã chép hết các file còn lại
+        raise shutil.Error(failures)
+    return {"source": src, "destination": dst, "type": item_type, **summary}
\ No newline at end of file
@@ -1,14 +1,64 @@
 import os
+import time
+import signal
+import asyncio
 import subprocess
 import platform
 import sys
-from typing import Dict, Any, List, Union
+from collections import deque
+from typing import Dict, Any, List, Union, Optional, AsyncIterator
+from fastapi import HTTPException
 from app.utils.common import handle_exceptions, logger
+from app.utils import metrics
 from dotenv import load_dotenv
 
 # Load biến môi trường
 load_dotenv()
 SHELL_TIMEOUT = int(os.getenv("SHELL_TIMEOUT", "60"))  # Timeout mặc định 60 giây
+STREAM_MAX_OUTPUT = int(os.getenv("EXEC_STREAM_MAX_OUTPUT", str(50 * 1024 * 1024)))  # Byte tối đa được gửi cho client
+STREAM_TAIL_LINES = int(os.getenv("EXEC_STREAM_TAIL_LINES", "200"))  # Số dòng cuối giữ lại cho sự kiện exit
+STREAM_QUEUE_SIZE = int(os.getenv("EXEC_STREAM_QUEUE_SIZE", "1000"))  # Số dòng chờ gửi tối đa (backpressure)
+STREAM_MAX_LINE = 64 * 1024
+BATCH_CONCURRENCY = int(os.getenv("EXEC_BATCH_CONCURRENCY", "8"))  # Số lệnh chạy đồng thời mặc định trong một batch
+BATCH_MAX_CONCURRENCY = int(os.getenv("EXEC_BATCH_MAX_CONCURRENCY", "64"))
+BATCH_MAX_COMMANDS = int(os.getenv("EXEC_BATCH_MAX_COMMANDS", "1000"))
+
+# kind: command, stream, batch, job, session; outcome: success, failure, timeout, cancelled, error
+SPAWN_SECONDS = metrics.histogram("exec_spawn_seconds", "Time to start a subprocess (fork/exec of the shell)", ("kind",),
+                                  buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+DURATION_SECONDS = metrics.histogram("exec_duration_seconds", "Wall time of commands from spawn to exit",
+                                     ("kind", "outcome"))
+
+def command_outcome(return_code: Optional[int], timed_out: bool = False) -> str:
+    if timed_out:
+        return "timeout"
+    return "success" if return_code == 0 else "failure"
+
+def _collect_child_cpu() -> list:
+    # CPU của các process con đã kết thúc (lệnh, job, session); không tính được riêng từng lệnh khi chạy đồng thời
+    try:
+        import resource
+    except ImportError:
+        return []
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return [("exec_child_cpu_seconds_total", "counter", "CPU time used by finished child processes",
+             [({"mode": "user"}, usage.ru_utime), ({"mode": "system"}, usage.ru_stime)])]
+
+metrics.register_collector(_collect_child_cpu)
+
+def build_shell_command(command: str, shell_type: Optional[str] = None) -> str:
+    """
+    Bọc lệnh theo loại shell (powershell, cmd, bash); mặc định chạy trực tiếp qua shell hệ thống
+    """
+    system = platform.system().lower()
+    if shell_type:
+        if shell_type.lower() == "powershell":
+            return f'powershell -Command "{command}"'
+        elif shell_type.lower() == "cmd" and system == "windows":
+            return f'cmd /c "{command}"'
+        elif shell_type.lower() == "bash" and system != "windows":
+            return f'bash -c "{command}"'
+    return command
 
 @handle_exceptions
 def execute_command(command: str, timeout: int = None, shell_type: str = None) -> Dict[str, Any]:
@@ -28,49 +78,41 @@ def execute_command(command: str, timeout: int = None, shell_type: str = None) -
     
     # Xác định shell dựa vào hệ điều hành và tham số
     system = platform.system().lower()
+    shell_cmd = build_shell_command(command, shell_type)
+    shell = True  # cmd.exe trên Windows, /bin/sh trên Unix/Linux
     
-    shell_cmd = None
-    if shell_type:
-        if shell_type.lower() == "powershell":
-            shell_cmd = f'powershell -Command "{command}"'
-        elif shell_type.lower() == "cmd" and system == "windows":
-            shell_cmd = f'cmd /c "{command}"'
-        elif shell_type.lower() == "bash" and system != "windows":
-            shell_cmd = f'bash -c "{command}"'
-    
-    if not shell_cmd:
-        # Mặc định
-        if system == "windows":
-            shell_cmd = command
-            shell = True  # Sử dụng cmd.exe trên Windows
-        else:
-            shell_cmd = command
-            shell = True  # Sử dụng /bin/sh trên Unix/Linux
-    else:
-        shell = True
-    
-    # Thực thi lệnh
+    # Thực thi lệnh (như subprocess.run nhưng đo riêng thời gian khởi tạo process)
+    started = time.perf_counter()
     try:
-        process = subprocess.run(
+        with subprocess.Popen(
             shell_cmd, 
             shell=shell, 
             stdout=subprocess.PIPE, 
             stderr=subprocess.PIPE,
             text=True,
-            encoding='utf-8',
-            timeout=timeout
-        )
+            encoding='utf-8'
+        ) as process:
+            SPAWN_SECONDS.observe(time.perf_counter() - started, kind="command")
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                raise
+        DURATION_SECONDS.observe(time.perf_counter() - started, kind="command",
+                                 outcome=command_outcome(process.returncode))
         
         # Lấy kết quả
         return {
             "command": command,
             "return_code": process.returncode,
-            "stdout": process.stdout,
-            "stderr": process.stderr,
+            "stdout": stdout,
+            "stderr": stderr,
             "success": process.returncode == 0,
             "system": system
         }
     except subprocess.TimeoutExpired:
+        DURATION_SECONDS.observe(time.perf_counter() - started, kind="command", outcome="timeout")
         logger.error(f"Command execution timed out after {timeout} seconds: {command}")
         return {
             "command": command,
@@ -81,6 +123,7 @@ def execute_command(command: str, timeout: int = None, shell_type: str = None) -
             "timed_out": True
         }
     except Exception as e:
+        DURATION_SECONDS.observe(time.perf_counter() - started, kind="command", outcome="error")
         logger.error(f"Error executing command '{command}': {str(e)}")
         return {
             "command": command,
@@ -203,4 +246,271 @@ def get_system_info() -> Dict[str, Any]:
         except:
             pass
     
-    return info 
\ No newline at end of file
+    return info
+
+def _kill_process(process: asyncio.subprocess.Process):
+    # Dừng cả nhóm process (shell và các process con) trên Unix
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+async def stream_command(command: str, timeout: Optional[int] = None, shell_type: Optional[str] = None,
+                         max_output: Optional[int] = None, tail_lines: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Chạy lệnh bằng asyncio subprocess và trả về từng dòng stdout/stderr ngay khi có.
+    Sự kiện: {"event": "stdout"|"stderr", "data": dòng}, "truncated" khi vượt max_output byte
+    (các dòng sau đó chỉ được giữ lại ở phần tail), và "exit" ở cuối kèm mã thoát và tail.
+    Hàng đợi giới hạn tạo backpressure: client đọc chậm thì process bị chặn khi ghi ra pipe.
+    Process bị dừng khi hết thời gian hoặc khi client ngắt kết nối.
+    """
+    logger.info(f"Streaming command: {command}")
+    timeout = SHELL_TIMEOUT if timeout is None else timeout
+    max_output = STREAM_MAX_OUTPUT if max_output is None else max_output
+    tail_lines = STREAM_TAIL_LINES if tail_lines is None else tail_lines
+    
+    started = time.monotonic()
+    process = await asyncio.create_subprocess_shell(
+        build_shell_command(command, shell_type),
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=os.name == "posix"
+    )
+    SPAWN_SECONDS.observe(time.monotonic() - started, kind="stream")
+    
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, STREAM_QUEUE_SIZE))
+    tails = {"stdout": deque(maxlen=max(0, tail_lines)), "stderr": deque(maxlen=max(0, tail_lines))}
+    totals = {"stdout": 0, "stderr": 0}
+    state = {"sent": 0, "truncated": False}
+    finished = asyncio.Event()
+    
+    async def pump(name: str, reader: asyncio.StreamReader):
+        pending = b""
+        while True:
+            chunk = await reader.read(STREAM_MAX_LINE)
+            if not chunk:
+                break
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            # Dòng quá dài được cắt thành nhiều phần
+            while len(pending) >= STREAM_MAX_LINE:
+                lines.append(pending[:STREAM_MAX_LINE])
+                pending = pending[STREAM_MAX_LINE:]
+            for line in lines:
+                await emit(name, line)
+        if pending:
+            await emit(name, pending)
+    
+    async def emit(name: str, raw: bytes):
+        text = raw.decode("utf-8", errors="replace").rstrip("\r")
+        totals[name] += len(raw) + 1
+        tails[name].append(text)
+        if state["truncated"]:
+            return
+        if state["sent"] + len(raw) > max_output:
+            state["truncated"] = True
+            await queue.put({"event": "truncated", "data": f"Output exceeded {max_output} bytes, only the tail is kept"})
+            return
+        state["sent"] += len(raw) + 1
+        await queue.put({"event": name, "data": text})
+    
+    async def run():
+        try:
+            await asyncio.gather(pump("stdout", process.stdout), pump("stderr", process.stderr))
+            await process.wait()
+        finally:
+            # Không chờ chỗ trống: runner bị hủy khi hàng đợi đầy thì put sẽ treo mãi (không còn ai đọc)
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                finished.set()
+    
+    runner = asyncio.ensure_future(run())
+    deadline = started + timeout
+    timed_out = False
+    try:
+        while True:
+            if finished.is_set() and queue.empty():
+                break
+            remaining = deadline - time.monotonic()
+            item = None
+            if remaining > 0:
+                # Client đọc chậm thì hàng đợi luôn có sẵn dòng, nên hết giờ được kiểm tra trước khi lấy
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    remaining = 0
+            if remaining <= 0:
+                timed_out = True
+                logger.error(f"Command execution timed out after {timeout} seconds: {command}")
+                _kill_process(process)
+                break
+            if item is None:
+                break
+            yield item
+    except (GeneratorExit, asyncio.CancelledError):
+        # Client ngắt kết nối
+        DURATION_SECONDS.observe(time.monotonic() - started, kind="stream", outcome="cancelled")
+        raise
+    finally:
+        if process.returncode is None:
+            _kill_process(process)
+        if not runner.done():
+            # Giải phóng các reader đang chờ hàng đợi để runner kết thúc
+            runner.cancel()
+        # gather trả về lỗi của runner thay vì ném ra, nhưng vẫn để yêu cầu hủy từ bên ngoài đi qua
+        await asyncio.gather(runner, return_exceptions=True)
+        if process.returncode is None:
+            await process.wait()
+    
+    DURATION_SECONDS.observe(time.monotonic() - started, kind="stream",
+                             outcome=command_outcome(process.returncode, timed_out))
+    yield {
+        "event": "exit",
+        "command": command,
+        "return_code": -1 if timed_out else process.returncode,
+        "success": not timed_out and process.returncode == 0,
+        "timed_out": timed_out,
+        "duration": round(time.monotonic() - started, 3),
+        "stdout_bytes": totals["stdout"],
+        "stderr_bytes": totals["stderr"],
+        "truncated": state["truncated"],
+        "tail": {"stdout": list(tails["stdout"]), "stderr": list(tails["stderr"])}
+    }
+
+async def _run_batch_item(index: int, command: str, timeout: Optional[int], shell_type: Optional[str],
+                          semaphore: asyncio.Semaphore, batch_started: float,
+                          deadline: Optional[float]) -> Dict[str, Any]:
+    # Chạy một lệnh của batch khi có chỗ trống; giới hạn thời gian là min(timeout của lệnh, thời gian còn lại của batch)
+    timeout = SHELL_TIMEOUT if timeout is None else timeout
+    async with semaphore:
+        started = time.monotonic()
+        result = {
+            "index": index,
+            "command": command,
+            "return_code": -1,
+            "stdout": "",
+            "stderr": "",
+            "success": False,
+            "timed_out": False,
+            "wait": round(started - batch_started, 3),
+            "duration": 0.0
+        }
+        limit = timeout
+        if deadline is not None and deadline - started < timeout:
+            limit = deadline - started
+            if limit <= 0:
+                result.update(timed_out=True, stderr="Batch timed out before the command started")
+                return result
+        
+        process = None
+        try:
+            process = await asyncio.create_subprocess_shell(
+                build_shell_command(command, shell_type),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=os.name == "posix"
+            )
+            SPAWN_SECONDS.observe(time.monotonic() - started, kind="batch")
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=limit)
+            result.update(
+                return_code=process.returncode,
+                stdout=stdout.decode("utf-8", errors="replace"),
+                stderr=stderr.decode("utf-8", errors="replace"),
+                success=process.returncode == 0
+            )
+            outcome = command_outcome(process.returncode)
+        except asyncio.TimeoutError:
+            _kill_process(process)
+            await process.wait()
+            reason = "Batch timed out" if limit < timeout else f"Command execution timed out after {timeout} seconds"
+            logger.error(f"{reason}: {command}")
+            result.update(timed_out=True, stderr=reason)
+            outcome = "timeout"
+        except asyncio.CancelledError:
+            # Client ngắt kết nối - dừng lệnh đang chạy
+            if process is not None:
+                _kill_process(process)
+            DURATION_SECONDS.observe(time.monotonic() - started, kind="batch", outcome="cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Error executing batch command '{command}': {str(e)}")
+            result["stderr"] = str(e)
+            outcome = "error"
+        result["duration"] = round(time.monotonic() - started, 3)
+        DURATION_SECONDS.observe(result["duration"], kind="batch", outcome=outcome)
+        return result
+
+def run_batch(commands: List[Dict[str, Any]], concurrency: Optional[int] = None, timeout: Optional[float] = None,
+              shell_type: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Chạy nhiều lệnh đồng thời bằng asyncio subprocess (tối đa concurrency lệnh cùng lúc).
+    commands là list {"command": ..., "timeout": ...}; timeout là giới hạn thời gian của cả batch.
+    Trả về async iterator các kết quả theo thứ tự hoàn thành (có index, wait, duration),
+    cuối cùng là {"summary": {...}}. Kiểm tra tham số trước khi bắt đầu stream.
+    """
+    if not commands:
+        raise HTTPException(status_code=400, detail="commands must not be empty")
+    if len(commands) > BATCH_MAX_COMMANDS:
+        raise HTTPException(status_code=400, detail=f"Too many commands: {len(commands)} (max {BATCH_MAX_COMMANDS})")
+    concurrency = BATCH_CONCURRENCY if concurrency is None else concurrency
+    if not 1 <= concurrency <= BATCH_MAX_CONCURRENCY:
+        raise HTTPException(status_code=400, detail=f"concurrency must be between 1 and {BATCH_MAX_CONCURRENCY}")
+    if timeout is not None and timeout <= 0:
+        raise HTTPException(status_code=400, detail="timeout must be positive")
+    return _iter_batch(commands, concurrency, timeout, shell_type)
+
+async def _iter_batch(commands: List[Dict[str, Any]], concurrency: int, timeout: Optional[float],
+                      shell_type: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+    logger.info(f"Executing batch of {len(commands)} commands (concurrency {concurrency})")
+    started = time.monotonic()
+    deadline = started + timeout if timeout is not None else None
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.ensure_future(_run_batch_item(index, item["command"], item.get("timeout"), shell_type,
+                                              semaphore, started, deadline))
+        for index, item in enumerate(commands)
+    ]
+    counts = {"succeeded": 0, "failed": 0, "timed_out": 0}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            counts["succeeded" if result["success"] else "failed"] += 1
+            counts["timed_out"] += result["timed_out"]
+            yield result
+    finally:
+        # Client ngắt kết nối giữa chừng: hủy các lệnh chưa xong
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    yield {"summary": {
+        "total": len(commands),
+        **counts,
+        "success": counts["failed"] == 0,
+        "concurrency": concurrency,
+        "duration": round(time.monotonic() - started, 3)
+    }}
+
+async def execute_batch(commands: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                        timeout: Optional[float] = None, shell_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Như run_batch nhưng chờ tất cả lệnh xong và trả về kết quả theo thứ tự đầu vào kèm tổng kết
+    """
+    results, summary = [], {}
+    async for item in run_batch(commands, concurrency, timeout, shell_type):
+        if "summary" in item:
+            summary = item["summary"]
+        else:
+            results.append(item)
+    results.sort(key=lambda item: item["index"])
+    return {**summary, "results": results}
\ No newline at end of file
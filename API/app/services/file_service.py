@@ -1,13 +1,242 @@
 import os
+import re
+import stat
+import json
+import heapq
+import base64
+import fnmatch
+import time
+import uuid
 import shutil
+import queue
+import hashlib
+import threading
+import mimetypes
+from collections import deque
+from email.utils import formatdate
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import List, Dict, Any, Union
-from app.utils.common import normalize_path, handle_exceptions, logger
+from typing import List, Dict, Any, Union, Optional, Iterator, Tuple, Callable
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.common import normalize_path, handle_exceptions, logger, ensure_private_dir, STATE_DIR
+from app.services import index_service, copy_service
+from app.utils.dispatch import get_pool
+from app.utils import metrics
+
+# Load biến môi trường
+load_dotenv()
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))  # 1 MiB mỗi chunk
+UPLOAD_BUFFER_SIZE = int(os.getenv("UPLOAD_BUFFER_SIZE", str(1024 * 1024)))  # Gom dữ liệu upload trước khi ghi đĩa
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(STATE_DIR, "uploads"))
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "86400"))  # Phiên upload bỏ dở bị xóa sau 24 giờ
+WALK_WORKERS = int(os.getenv("WALK_WORKERS", str(min(16, (os.cpu_count() or 1) * 2))))
+WALK_QUEUE_SIZE = int(os.getenv("WALK_QUEUE_SIZE", "1000"))  # Số entry tối đa chờ gửi cho client
+SEARCH_MAX_FILE_SIZE = int(os.getenv("SEARCH_MAX_FILE_SIZE", str(100 * 1024 * 1024)))  # Bỏ qua file lớn hơn khi grep
+SEARCH_BATCH_BYTES = int(os.getenv("SEARCH_BATCH_BYTES", str(8 * 1024 * 1024)))  # Gom file nhỏ thành một tác vụ
+SEARCH_MAX_LINE_LENGTH = 1000
+SEARCH_READ_BLOCK = 1024 * 1024  # Byte đọc mỗi lần khi grep một file
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "10000"))  # Số thao tác tối đa của một /files/batch
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))  # Số thao tác độc lập chạy đồng thời
+
+LIST_FIELDS = ("name", "path", "type", "size", "modified")
+LIST_SORT_KEYS = ("name", "type", "size", "modified")
+WALK_FIELDS = LIST_FIELDS + ("depth",)
+_STAT_FIELDS = {"size", "modified"}
+
+BYTES_READ = metrics.counter("file_read_bytes_total", "Bytes read from disk by file operations", ("op",))
+BYTES_WRITTEN = metrics.counter("file_written_bytes_total", "Bytes written to disk by file operations", ("op",))
+
+def _entry_info(entry: os.DirEntry, need_stat: bool) -> Optional[Dict[str, Any]]:
+    """
+    Thông tin một entry từ os.scandir. Chỉ gọi stat khi cần size/modified
+    (DirEntry cache kết quả stat, trên Linux is_file() không tốn syscall).
+    Trả về None nếu entry đã bị xóa trong lúc liệt kê.
+    """
+    try:
+        is_file = entry.is_file()
+    except OSError:
+        is_file = False
+    
+    item_info = {
+        "name": entry.name,
+        "path": entry.path,
+        "type": "file" if is_file else "directory"
+    }
+    
+    if need_stat:
+        try:
+            stat_info = entry.stat()
+        except OSError:
+            # Symlink hỏng - lấy thông tin của chính symlink
+            try:
+                stat_info = entry.stat(follow_symlinks=False)
+            except OSError:
+                return None
+        item_info["size"] = stat_info.st_size if is_file else None
+        item_info["modified"] = stat_info.st_mtime
+    
+    return item_info
+
+def _iter_dir_entries(norm_path: str, need_stat: bool) -> Iterator[Dict[str, Any]]:
+    with os.scandir(norm_path) as entries:
+        for entry in entries:
+            item_info = _entry_info(entry, need_stat)
+            if item_info is not None:
+                yield item_info
+
+def _sort_key(item: Dict[str, Any], sort_by: str) -> Tuple:
+    value = item.get(sort_by)
+    if value is None:
+        value = -1
+    return (value, item["name"])
+
+def _encode_cursor(key: Tuple, sort_by: str, order: str) -> str:
+    # Cursor ghi cả khóa sắp xếp và chiều để không bị dùng lại với cách sắp xếp khác
+    data = {"sort": sort_by, "order": order, "after": list(key)}
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii")
+
+def _decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        value, name = data["after"]
+        sort_ok = data["sort"] == sort_by and data["order"] == order
+        if not isinstance(name, str) or isinstance(value, str) != (sort_by in ("name", "type")):
+            raise ValueError
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    if not sort_ok:
+        raise HTTPException(status_code=400, detail=f"Cursor was issued for sort={data['sort']}&order={data['order']}, "
+                                                    f"not sort={sort_by}&order={order}")
+    return value, name
+
+def _parse_list_options(fields: Optional[List[str]], sort_by: str, order: str,
+                        item_type: Optional[str], allowed_fields: Tuple = LIST_FIELDS) -> List[str]:
+    fields = list(fields) if fields else list(allowed_fields)
+    unknown = [field for field in fields if field not in allowed_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if sort_by not in LIST_SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort key: {sort_by}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Invalid sort order: {order}")
+    if item_type not in (None, "file", "directory"):
+        raise HTTPException(status_code=400, detail=f"Invalid type filter: {item_type}")
+    return fields
+
+def _select_entries(entries: Iterator[Dict[str, Any]], pattern: Optional[str] = None,
+                    item_type: Optional[str] = None, modified_after: Optional[float] = None,
+                    modified_before: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lọc entry theo glob tên, loại và khoảng thời gian sửa đổi
+    """
+    for item in entries:
+        if pattern and not fnmatch.fnmatch(item["name"], pattern):
+            continue
+        if item_type and item["type"] != item_type:
+            continue
+        if modified_after is not None and item["modified"] < modified_after:
+            continue
+        if modified_before is not None and item["modified"] > modified_before:
+            continue
+        yield item
+
+def _project(item: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {field: item.get(field) for field in fields}
+
+def _open_listing(path: str, fields: List[str], sort_by: str, modified_after: Optional[float],
+                  modified_before: Optional[float], refresh: bool = False) -> Iterator[Dict[str, Any]]:
+    norm_path = normalize_path(path)
+    
+    if not os.path.exists(norm_path):
+        raise FileNotFoundError(f"Path does not exist: {path}")
+    
+    if not os.path.isdir(norm_path):
+        raise HTTPException(status_code=400, detail=f"Path is not a directory: {path}")
+    
+    # Trả lời từ chỉ mục metadata nếu được bật (xem index_service)
+    indexed = index_service.lookup_dir(norm_path, refresh)
+    if indexed is not None:
+        return iter(indexed)
+    
+    # Chỉ stat khi client cần size/modified (hiển thị, sắp xếp hoặc lọc)
+    need_stat = (bool(_STAT_FIELDS.intersection(fields)) or sort_by in _STAT_FIELDS
+                 or modified_after is not None or modified_before is not None)
+    return _iter_dir_entries(norm_path, need_stat)
 
 @handle_exceptions
-def list_dir(path: str) -> List[Dict[str, Any]]:
+def list_dir(path: str, fields: Optional[List[str]] = None, sort_by: str = "name", order: str = "asc",
+             pattern: Optional[str] = None, item_type: Optional[str] = None,
+             modified_after: Optional[float] = None, modified_before: Optional[float] = None,
+             refresh: bool = False) -> List[Dict[str, Any]]:
     """
-    Liệt kê nội dung thư mục
+    Liệt kê nội dung thư mục (os.scandir), hỗ trợ lọc, sắp xếp và chọn trường trả về
+    """
+    fields = _parse_list_options(fields, sort_by, order, item_type)
+    entries = _open_listing(path, fields, sort_by, modified_after, modified_before, refresh)
+    
+    items = list(_select_entries(entries, pattern, item_type, modified_after, modified_before))
+    items.sort(key=lambda item: _sort_key(item, sort_by), reverse=(order == "desc"))
+    
+    return [_project(item, fields) for item in items]
+
+@handle_exceptions
+def list_dir_page(path: str, limit: int = 1000, cursor: Optional[str] = None,
+                  fields: Optional[List[str]] = None, sort_by: str = "name", order: str = "asc",
+                  pattern: Optional[str] = None, item_type: Optional[str] = None,
+                  modified_after: Optional[float] = None, modified_before: Optional[float] = None,
+                  refresh: bool = False) -> Dict[str, Any]:
+    """
+    Liệt kê thư mục theo trang với cursor. Chỉ giữ tối đa limit entry trong bộ nhớ (heap),
+    không phụ thuộc số lượng entry trong thư mục.
+    """
+    fields = _parse_list_options(fields, sort_by, order, item_type)
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail=f"Invalid limit: {limit}")
+    
+    entries = _open_listing(path, fields, sort_by, modified_after, modified_before, refresh)
+    selected = _select_entries(entries, pattern, item_type, modified_after, modified_before)
+    
+    after = _decode_cursor(cursor, sort_by, order) if cursor else None
+    key = lambda item: _sort_key(item, sort_by)
+    
+    if order == "asc":
+        if after is not None:
+            selected = (item for item in selected if key(item) > after)
+        page = heapq.nsmallest(limit + 1, selected, key=key)
+    else:
+        if after is not None:
+            selected = (item for item in selected if key(item) < after)
+        page = heapq.nlargest(limit + 1, selected, key=key)
+    
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    return {
+        "items": [_project(item, fields) for item in page],
+        "count": len(page),
+        "next_cursor": _encode_cursor(key(page[-1]), sort_by, order) if has_more else None
+    }
+
+def _matches_any(name: str, rel_path: str, patterns: List[str]) -> bool:
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p) for p in patterns)
+
+@handle_exceptions
+def walk_tree(path: str, max_depth: Optional[int] = None, include: Optional[List[str]] = None,
+              exclude: Optional[List[str]] = None, item_type: Optional[str] = None,
+              fields: Optional[List[str]] = None, follow_symlinks: bool = False,
+              limit: Optional[int] = None, workers: Optional[int] = None,
+              aggregate: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Duyệt đệ quy cây thư mục bằng nhiều worker scandir song song.
+    Trả về iterator, các entry được sinh ra ngay trong khi đang duyệt (thứ tự không cố định).
+    
+    Params:
+        include: glob (theo tên hoặc đường dẫn tương đối) - chỉ trả về entry khớp, vẫn duyệt mọi thư mục con
+        exclude: glob - bỏ qua entry khớp và không duyệt vào thư mục khớp
+        limit: số entry tối đa trả về
+        aggregate: khi duyệt xong, trả thêm tổng số file/thư mục/byte (cộng dồn cả cây con) của từng thư mục,
+                   thư mục con trước, thư mục gốc cuối cùng; truncated=true nếu max_depth chặn một phần cây con
     """
     norm_path = normalize_path(path)
     
@@ -15,21 +244,336 @@ def list_dir(path: str) -> List[Dict[str, Any]]:
         raise FileNotFoundError(f"Path does not exist: {path}")
     
     if not os.path.isdir(norm_path):
-        raise ValueError(f"Path is not a directory: {path}")
-    
-    items = []
-    for item in os.listdir(norm_path):
-        item_path = os.path.join(norm_path, item)
-        item_info = {
-            "name": item,
-            "path": item_path,
-            "type": "file" if os.path.isfile(item_path) else "directory",
-            "size": os.path.getsize(item_path) if os.path.isfile(item_path) else None,
-            "modified": os.path.getmtime(item_path)
-        }
-        items.append(item_info)
+        raise HTTPException(status_code=400, detail=f"Path is not a directory: {path}")
+    
+    fields = _parse_list_options(fields, "name", "asc", item_type, WALK_FIELDS)
+    if max_depth is not None and max_depth < 1:
+        raise HTTPException(status_code=400, detail=f"Invalid max_depth: {max_depth}")
+    
+    return _iter_walk(norm_path, max_depth, include or [], exclude or [], item_type, fields,
+                      bool(_STAT_FIELDS.intersection(fields)), follow_symlinks, limit, workers or WALK_WORKERS,
+                      aggregate=aggregate)
+
+def _iter_walk(root: str, max_depth: Optional[int], include: List[str], exclude: List[str],
+               item_type: Optional[str], fields: List[str], need_stat: bool, follow_symlinks: bool,
+               limit: Optional[int], workers: int,
+               match: Optional[Callable[[str], bool]] = None, aggregate: bool = False) -> Iterator[Dict[str, Any]]:
+    results = queue.Queue(maxsize=WALK_QUEUE_SIZE)
+    stop = threading.Event()
+    lock = threading.Lock()
+    done = object()
+    state = {"pending": 0}
+    visited = set()
+    # Tổng riêng của từng thư mục (không tính thư mục con):
+    # path -> [độ sâu, số file, số thư mục, số byte, bị cắt bởi max_depth]
+    totals: Dict[str, List[int]] = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="walk")
+    
+    def put(item) -> bool:
+        # Hàng đợi có giới hạn: worker chờ khi client đọc chậm (backpressure)
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def submit(dir_path: str, depth: int):
+        # Không gửi thêm việc khi đã dừng (đủ limit/client ngắt): executor có thể đã shutdown
+        if stop.is_set():
+            return
+        with lock:
+            state["pending"] += 1
+        try:
+            executor.submit(scan, dir_path, depth)
+        except RuntimeError:
+            with lock:
+                state["pending"] -= 1
+    
+    def scan(dir_path: str, depth: int):
+        own = [depth - 1, 0, 0, 0, False]
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if stop.is_set():
+                        return
+                    rel_path = os.path.relpath(entry.path, root) if (include or exclude) else entry.name
+                    if exclude and _matches_any(entry.name, rel_path, exclude):
+                        continue
+                    
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                    except OSError:
+                        is_dir = False
+                    
+                    if aggregate:
+                        if is_dir:
+                            own[2] += 1
+                        else:
+                            try:
+                                if entry.is_file(follow_symlinks=follow_symlinks):
+                                    own[1] += 1
+                                    own[3] += entry.stat(follow_symlinks=follow_symlinks).st_size
+                            except OSError:
+                                pass
+                    
+                    if is_dir and aggregate and max_depth is not None and depth >= max_depth:
+                        # Không duyệt tiếp nên tổng của thư mục này chưa đầy đủ
+                        own[4] = True
+                    
+                    if is_dir and (max_depth is None or depth < max_depth):
+                        descend = True
+                        if follow_symlinks:
+                            # Tránh vòng lặp symlink; lỗi stat của một entry không làm bỏ dở cả thư mục
+                            try:
+                                stat_info = entry.stat()
+                            except OSError as e:
+                                put({"path": entry.path, "error": str(e)})
+                                descend = False
+                            else:
+                                with lock:
+                                    key = (stat_info.st_dev, stat_info.st_ino)
+                                    descend = key not in visited
+                                    visited.add(key)
+                        if descend:
+                            submit(entry.path, depth + 1)
+                    
+                    if include and not _matches_any(entry.name, rel_path, include):
+                        continue
+                    if match is not None and not match(entry.name):
+                        continue
+                    item_info = _entry_info(entry, need_stat)
+                    if item_info is None:
+                        continue
+                    if item_type and item_info["type"] != item_type:
+                        continue
+                    item_info["depth"] = depth
+                    if not put(_project(item_info, fields)):
+                        return
+        except OSError as e:
+            put({"path": dir_path, "error": str(e)})
+        finally:
+            with lock:
+                if aggregate:
+                    totals[dir_path] = own
+                state["pending"] -= 1
+                finished = state["pending"] == 0
+            if finished:
+                put(done)
+    
+    submit(root, 1)
+    count = 0
+    try:
+        while True:
+            item = results.get()
+            if item is done:
+                break
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                # Cây chưa duyệt hết nên không trả tổng
+                return
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
     
-    return items
+    if aggregate:
+        # Cộng dồn từ thư mục sâu nhất lên thư mục cha, thư mục gốc ra cuối cùng
+        for dir_path in sorted(totals, key=lambda p: totals[p][0], reverse=True):
+            depth, files, directories, size, truncated = totals[dir_path]
+            parent = totals.get(os.path.dirname(dir_path)) if dir_path != root else None
+            if parent is not None:
+                parent[1] += files
+                parent[2] += directories
+                parent[3] += size
+                parent[4] = parent[4] or truncated
+            yield {"path": dir_path, "depth": depth,
+                   "aggregate": {"files": files, "directories": directories, "bytes": size,
+                                 "truncated": truncated}}
+
+def _compile_search_pattern(query: str, regex: bool, ignore_case: bool) -> "re.Pattern":
+    try:
+        return re.compile(query if regex else re.escape(query), re.IGNORECASE if ignore_case else 0)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regular expression: {str(e)}")
+
+@handle_exceptions
+def search_names(path: str, pattern: str, regex: bool = False, ignore_case: bool = False,
+                 item_type: Optional[str] = None, exclude: Optional[List[str]] = None,
+                 max_depth: Optional[int] = None, fields: Optional[List[str]] = None,
+                 limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Tìm file/thư mục theo tên (glob hoặc regex) trong cây thư mục, duyệt song song như walk_tree
+    """
+    if regex:
+        compiled = _compile_search_pattern(pattern, True, ignore_case)
+        match = lambda name: compiled.search(name) is not None
+    elif ignore_case:
+        lowered = pattern.lower()
+        match = lambda name: fnmatch.fnmatchcase(name.lower(), lowered)
+    else:
+        match = lambda name: fnmatch.fnmatchcase(name, pattern)
+    
+    norm_path = normalize_path(path)
+    
+    if not os.path.exists(norm_path):
+        raise FileNotFoundError(f"Path does not exist: {path}")
+    
+    if not os.path.isdir(norm_path):
+        raise HTTPException(status_code=400, detail=f"Path is not a directory: {path}")
+    
+    fields = _parse_list_options(fields, "name", "asc", item_type, WALK_FIELDS)
+    return _iter_walk(norm_path, max_depth, [], exclude or [], item_type, fields,
+                      bool(_STAT_FIELDS.intersection(fields)), False, limit, WALK_WORKERS, match)
+
+def _iter_line_blocks(f, head: bytes) -> Iterator[bytes]:
+    """
+    Đọc file theo từng khối gồm các dòng trọn vẹn (khối cuối có thể không kết thúc bằng xuống dòng).
+    Đọc bằng read() thay vì mmap: file bị cắt ngắn trong lúc grep chỉ làm read() kết thúc sớm,
+    còn truy cập mmap sẽ gây SIGBUS làm chết cả process.
+    """
+    pending = head
+    while True:
+        block = f.read(SEARCH_READ_BLOCK)
+        if not block:
+            if pending:
+                yield pending
+            return
+        pending += block
+        cut = pending.rfind(b"\n") + 1
+        if cut:
+            yield pending[:cut]
+            pending = pending[cut:]
+
+def _grep_files(paths: List[str], query: str, regex: bool, ignore_case: bool,
+                max_matches: int, max_file_size: int) -> List[Dict[str, Any]]:
+    """
+    Tìm nội dung trong một nhóm file (chạy trong cpu pool). Bỏ qua file binary và file quá lớn.
+    File được đọc theo từng khối dòng nên không đọc toàn bộ vào bộ nhớ.
+    """
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    compiled = re.compile((query if regex else re.escape(query)).encode("utf-8"), flags)
+    results = []
+    
+    for file_path in paths:
+        try:
+            with open(file_path, 'rb', buffering=0) as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0 or size > max_file_size:
+                    continue
+                # File có byte NUL trong 8 KB đầu được coi là binary
+                head = f.read(8192)
+                if b"\0" in head:
+                    continue
+                line_number = 1
+                matches = 0
+                for data in _iter_line_blocks(f, head):
+                    counted_until = 0
+                    block_line = line_number
+                    for m in compiled.finditer(data):
+                        block_line += data.count(b"\n", counted_until, m.start())
+                        counted_until = m.start()
+                        line_start = data.rfind(b"\n", 0, m.start()) + 1
+                        line_end = data.find(b"\n", m.start())
+                        if line_end < 0:
+                            line_end = len(data)
+                        line_end = min(line_end, line_start + SEARCH_MAX_LINE_LENGTH)
+                        results.append({
+                            "path": file_path,
+                            "line_number": block_line,
+                            "line": data[line_start:line_end].decode("utf-8", errors="replace").rstrip("\r"),
+                            "match": m.group(0)[:SEARCH_MAX_LINE_LENGTH].decode("utf-8", errors="replace")
+                        })
+                        matches += 1
+                        if matches >= max_matches:
+                            break
+                    if matches >= max_matches:
+                        break
+                    line_number += data.count(b"\n")
+        except (OSError, ValueError) as e:
+            results.append({"path": file_path, "error": str(e)})
+    
+    return results
+
+@handle_exceptions
+def search_content(path: str, query: str, regex: bool = False, ignore_case: bool = False,
+                   include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                   max_matches: int = 1000, max_matches_per_file: int = 100,
+                   max_file_size: int = SEARCH_MAX_FILE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Tìm nội dung (chuỗi hoặc regex) trong các file của cây thư mục.
+    Các nhóm file được grep song song trên cpu pool, kết quả trả về dần khi từng nhóm hoàn tất.
+    """
+    norm_path = normalize_path(path)
+    
+    if not os.path.exists(norm_path):
+        raise FileNotFoundError(f"Path does not exist: {path}")
+    
+    _compile_search_pattern(query, regex, ignore_case)
+    
+    if os.path.isfile(norm_path):
+        files = iter([{"path": norm_path, "size": os.path.getsize(norm_path)}])
+    else:
+        files = _iter_walk(norm_path, None, include or [], exclude or [], "file", ["path", "size"],
+                           True, False, None, WALK_WORKERS)
+    return _iter_content_matches(files, query, regex, ignore_case, max_matches, max_matches_per_file, max_file_size)
+
+def _iter_content_matches(files: Iterator[Dict[str, Any]], query: str, regex: bool, ignore_case: bool,
+                          max_matches: int, max_matches_per_file: int, max_file_size: int) -> Iterator[Dict[str, Any]]:
+    pool = get_pool("cpu")
+    max_in_flight = pool.max_workers * 2
+    in_flight = set()
+    emitted = 0
+    
+    def submit(batch: List[str]):
+        while True:
+            try:
+                in_flight.add(pool.submit(_grep_files, batch, query, regex, ignore_case,
+                                          max_matches_per_file, max_file_size))
+                return
+            except HTTPException:
+                # Pool đang bận - chờ bớt tác vụ của chính request này rồi thử lại
+                if in_flight:
+                    yield from drain(FIRST_COMPLETED)
+                else:
+                    time.sleep(0.05)
+    
+    def drain(return_when):
+        nonlocal emitted
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            in_flight.discard(future)
+            for item in future.result():
+                if emitted >= max_matches:
+                    return
+                emitted += 1
+                yield item
+    
+    try:
+        batch, batch_bytes = [], 0
+        for item in files:
+            if "error" in item or item.get("size") is None or item["size"] == 0 or item["size"] > max_file_size:
+                continue
+            batch.append(item["path"])
+            batch_bytes += item["size"]
+            if batch_bytes >= SEARCH_BATCH_BYTES or len(batch) >= 256:
+                yield from submit(batch)
+                batch, batch_bytes = [], 0
+                while len(in_flight) >= max_in_flight and emitted < max_matches:
+                    yield from drain(FIRST_COMPLETED)
+            if emitted >= max_matches:
+                return
+        if batch:
+            yield from submit(batch)
+        while in_flight and emitted < max_matches:
+            yield from drain(FIRST_COMPLETED)
+    finally:
+        for future in in_flight:
+            future.cancel()
+        close = getattr(files, "close", None)
+        if close is not None:
+            close()
 
 @handle_exceptions
 def create_file(path: str, content: str = "") -> Dict[str, Any]:
@@ -40,12 +584,12 @@ def create_file(path: str, content: str = "") -> Dict[str, Any]:
     
     # Kiểm tra xem thư mục cha có tồn tại không
     parent_dir = os.path.dirname(norm_path)
-    if not os.path.exists(parent_dir):
-        os.makedirs(parent_dir)
+    os.makedirs(parent_dir, exist_ok=True)
     
     # Tạo file
     with open(norm_path, 'w', encoding='utf-8') as f:
         f.write(content)
+    BYTES_WRITTEN.inc(len(content.encode('utf-8')), op="create")
     
     return {
         "path": norm_path,
@@ -53,6 +597,248 @@ def create_file(path: str, content: str = "") -> Dict[str, Any]:
         "created": True
     }
 
+class UploadWriter:
+    """
+    Ghi dữ liệu upload trực tiếp xuống đĩa theo từng chunk (không giữ toàn bộ nội dung trong RAM)
+    và tính SHA-256 của phần dữ liệu đã ghi.
+    """
+    
+    def __init__(self, part_path: str, offset: int = 0, destination: Optional[str] = None):
+        self.part_path = part_path
+        self.destination = destination
+        self.offset = offset
+        self.written = 0
+        self._hash = hashlib.sha256()
+        self._file = open(part_path, 'r+b' if os.path.exists(part_path) else 'wb')
+        self._file.seek(offset)
+        self._file.truncate()
+    
+    @handle_exceptions
+    def write(self, data: bytes) -> int:
+        self._file.write(data)
+        BYTES_WRITTEN.inc(len(data), op="upload")
+        self._hash.update(data)
+        self.written += len(data)
+        return self.written
+    
+    def abort(self):
+        """
+        Hủy phần dữ liệu vừa ghi (cắt file về offset ban đầu)
+        """
+        if self._file.closed:
+            return
+        self._file.truncate(self.offset)
+        self._file.close()
+        if self.destination is not None and os.path.exists(self.part_path):
+            os.remove(self.part_path)
+    
+    @handle_exceptions
+    def finish(self, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Kết thúc ghi: kiểm tra checksum, fsync và (với upload trực tiếp) rename nguyên tử sang file đích
+        """
+        digest = self._hash.hexdigest()
+        if expected_sha256 and expected_sha256.strip().lower() != digest:
+            self.abort()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Checksum mismatch: expected {expected_sha256}, got {digest}"
+            )
+        
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        
+        result = {
+            "offset": self.offset,
+            "written": self.written,
+            "sha256": digest
+        }
+        
+        if self.destination is not None:
+            os.replace(self.part_path, self.destination)
+            result.update({"path": self.destination, "size": os.path.getsize(self.destination)})
+        
+        return result
+
+def _part_path_for(norm_path: str, token: str) -> str:
+    # File tạm nằm cùng thư mục với file đích để os.replace là thao tác nguyên tử
+    return os.path.join(os.path.dirname(norm_path), f".{os.path.basename(norm_path)}.{token}.part")
+
+def _prepare_upload_target(path: str, overwrite: bool) -> str:
+    norm_path = normalize_path(path)
+    
+    if os.path.isdir(norm_path):
+        raise HTTPException(status_code=409, detail=f"Path is a directory: {path}")
+    
+    if not overwrite and os.path.exists(norm_path):
+        raise HTTPException(status_code=409, detail=f"File already exists: {path}")
+    
+    # Kiểm tra xem thư mục cha có tồn tại không
+    parent_dir = os.path.dirname(norm_path)
+    os.makedirs(parent_dir, exist_ok=True)
+    
+    return norm_path
+
+@handle_exceptions
+def open_upload(path: str, overwrite: bool = True) -> UploadWriter:
+    """
+    Mở upload trực tiếp (một lần): dữ liệu ghi vào file tạm, rename sang file đích khi hoàn tất
+    """
+    norm_path = _prepare_upload_target(path, overwrite)
+    return UploadWriter(_part_path_for(norm_path, uuid.uuid4().hex), destination=norm_path)
+
+def _session_file(session_id: str) -> str:
+    if not session_id.isalnum():
+        raise HTTPException(status_code=404, detail=f"Upload session not found: {session_id}")
+    # File phiên quyết định đường dẫn đích của upload nên thư mục phải thuộc riêng server
+    return os.path.join(ensure_private_dir(UPLOAD_SESSION_DIR), f"{session_id}.json")
+
+def _load_session(session_id: str) -> Dict[str, Any]:
+    session_file = _session_file(session_id)
+    if not os.path.exists(session_file):
+        raise HTTPException(status_code=404, detail=f"Upload session not found: {session_id}")
+    with open(session_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_session(session: Dict[str, Any]):
+    session_file = _session_file(session["id"])
+    tmp_file = session_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(session, f)
+    os.replace(tmp_file, session_file)
+
+def _remove_session(session: Dict[str, Any]):
+    for file_path in (session["part_path"], _session_file(session["id"])):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+def _session_status(session: Dict[str, Any]) -> Dict[str, Any]:
+    received = os.path.getsize(session["part_path"]) if os.path.exists(session["part_path"]) else 0
+    return {
+        "id": session["id"],
+        "path": session["path"],
+        "size": session["size"],
+        "received": received,
+        "complete": session["size"] is not None and received == session["size"],
+        "created": session["created"],
+        "updated": session["updated"]
+    }
+
+def _purge_expired_sessions():
+    # Dọn các phiên upload bị bỏ dở quá UPLOAD_SESSION_TTL giây
+    now = time.time()
+    for entry in os.scandir(ensure_private_dir(UPLOAD_SESSION_DIR)):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            session = _load_session(entry.name[:-len(".json")])
+            if now - session["updated"] > UPLOAD_SESSION_TTL:
+                logger.info(f"Removing expired upload session: {session['id']}")
+                _remove_session(session)
+        except Exception as e:
+            logger.warning(f"Cannot inspect upload session {entry.name}: {str(e)}")
+
+@handle_exceptions
+def create_upload_session(path: str, size: Optional[int] = None, sha256: Optional[str] = None,
+                          overwrite: bool = True) -> Dict[str, Any]:
+    """
+    Tạo phiên upload nhiều chunk (có thể tải tiếp sau khi mất kết nối)
+    """
+    norm_path = _prepare_upload_target(path, overwrite)
+    _purge_expired_sessions()
+    
+    session_id = uuid.uuid4().hex
+    now = time.time()
+    session = {
+        "id": session_id,
+        "path": norm_path,
+        "part_path": _part_path_for(norm_path, session_id),
+        "size": size,
+        "sha256": sha256,
+        "overwrite": overwrite,
+        "created": now,
+        "updated": now
+    }
+    open(session["part_path"], 'wb').close()
+    _save_session(session)
+    
+    return _session_status(session)
+
+@handle_exceptions
+def get_upload_session(session_id: str) -> Dict[str, Any]:
+    """
+    Lấy trạng thái phiên upload (số byte server đã nhận để client tải tiếp)
+    """
+    return _session_status(_load_session(session_id))
+
+@handle_exceptions
+def open_upload_chunk(session_id: str, offset: int) -> UploadWriter:
+    """
+    Mở phiên upload để ghi một chunk bắt đầu từ offset.
+    offset phải <= số byte đã nhận (chunk gửi lại sẽ ghi đè phần cũ).
+    """
+    session = _load_session(session_id)
+    received = _session_status(session)["received"]
+    
+    if offset < 0 or offset > received:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Invalid offset {offset}, server has received {received} bytes"
+        )
+    
+    session["updated"] = time.time()
+    _save_session(session)
+    return UploadWriter(session["part_path"], offset)
+
+@handle_exceptions
+def commit_upload_session(session_id: str) -> Dict[str, Any]:
+    """
+    Hoàn tất phiên upload: kiểm tra kích thước/checksum rồi rename nguyên tử sang file đích
+    """
+    session = _load_session(session_id)
+    status = _session_status(session)
+    
+    if session["size"] is not None and status["received"] != session["size"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: received {status['received']} of {session['size']} bytes"
+        )
+    
+    if session["sha256"]:
+        digest = hashlib.sha256()
+        with open(session["part_path"], 'rb') as f:
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                BYTES_READ.inc(len(chunk), op="upload_verify")
+        if digest.hexdigest() != session["sha256"].strip().lower():
+            raise HTTPException(
+                status_code=400,
+                detail=f"Checksum mismatch: expected {session['sha256']}, got {digest.hexdigest()}"
+            )
+    
+    if not session["overwrite"] and os.path.exists(session["path"]):
+        raise HTTPException(status_code=409, detail=f"File already exists: {session['path']}")
+    
+    os.replace(session["part_path"], session["path"])
+    os.remove(_session_file(session_id))
+    
+    return {
+        "id": session_id,
+        "path": session["path"],
+        "size": os.path.getsize(session["path"]),
+        "committed": True
+    }
+
+@handle_exceptions
+def abort_upload_session(session_id: str) -> Dict[str, Any]:
+    """
+    Hủy phiên upload và xóa dữ liệu tạm
+    """
+    session = _load_session(session_id)
+    _remove_session(session)
+    return {"id": session_id, "aborted": True}
+
 @handle_exceptions
 def create_directory(path: str) -> Dict[str, Any]:
     """
@@ -89,6 +875,7 @@ def read_file(path: str) -> Dict[str, Any]:
     # Đọc nội dung file
     with open(norm_path, 'r', encoding='utf-8') as f:
         content = f.read()
+        BYTES_READ.inc(os.fstat(f.fileno()).st_size, op="text")
     
     return {
         "path": norm_path,
@@ -97,9 +884,9 @@ def read_file(path: str) -> Dict[str, Any]:
     }
 
 @handle_exceptions
-def read_file_binary(path: str) -> bytes:
+def read_file_binary(path: str, offset: int = 0, length: Optional[int] = None) -> bytes:
     """
-    Đọc nội dung file dưới dạng binary
+    Đọc nội dung file dưới dạng binary (có thể chỉ đọc một đoạn từ offset)
     """
     norm_path = normalize_path(path)
     
@@ -110,10 +897,113 @@ def read_file_binary(path: str) -> bytes:
         raise ValueError(f"Path is not a file: {path}")
     
     # Đọc nội dung file dưới dạng binary
-    with open(norm_path, 'rb') as f:
-        content = f.read()
+    end = None if length is None else offset + length - 1
+    return b"".join(iter_file_binary(norm_path, offset, end))
+
+def iter_file_binary(norm_path: str, start: int = 0, end: Optional[int] = None,
+                     chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Đọc file theo từng chunk trong khoảng [start, end] (end tính cả byte cuối).
+    Đọc thẳng bằng read() không qua bộ đệm nên bộ nhớ không tăng theo kích thước file. Không dùng mmap:
+    file bị cắt ngắn trong lúc tải (ví dụ log bị rotate) làm truy cập mmap gây SIGBUS và chết cả worker,
+    còn read() chỉ trả về ít byte hơn - khi đó coi như hết file.
+    """
+    with open(norm_path, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size - 1 if end is None else min(end, size - 1)
+        if start > end:
+            return
+        
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            BYTES_READ.inc(len(chunk), op="binary")
+            yield chunk
+
+@handle_exceptions
+def get_download_info(path: str) -> Dict[str, Any]:
+    """
+    Lấy thông tin phục vụ tải file: kích thước, ETag, Last-Modified, kiểu MIME
+    """
+    norm_path = normalize_path(path)
+    
+    if not os.path.exists(norm_path):
+        raise FileNotFoundError(f"File does not exist: {path}")
     
-    return content
+    if not os.path.isfile(norm_path):
+        raise ValueError(f"Path is not a file: {path}")
+    
+    stat_info = os.stat(norm_path)
+    media_type, _ = mimetypes.guess_type(norm_path)
+    
+    return {
+        "path": norm_path,
+        "name": os.path.basename(norm_path),
+        "size": stat_info.st_size,
+        "modified": stat_info.st_mtime,
+        "etag": f'"{stat_info.st_mtime_ns:x}-{stat_info.st_size:x}"',
+        "last_modified": formatdate(stat_info.st_mtime, usegmt=True),
+        "media_type": media_type or "application/octet-stream"
+    }
+
+def etag_matches(header_value: Optional[str], etag: str) -> bool:
+    """
+    So khớp (weak) ETag với giá trị header If-None-Match / If-Range
+    """
+    if not header_value:
+        return False
+    
+    candidates = [value.strip() for value in header_value.split(",")]
+    if "*" in candidates:
+        return True
+    
+    bare_etag = etag[2:] if etag.startswith("W/") else etag
+    return any((c[2:] if c.startswith("W/") else c) == bare_etag for c in candidates)
+
+def resolve_range(range_header: Optional[str], size: int, if_range: Optional[str] = None,
+                  etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """
+    Phân tích header Range (một khoảng byte duy nhất).
+    Trả về (start, end) hoặc None nếu phải trả về toàn bộ file.
+    """
+    if not range_header:
+        return None
+    
+    # If-Range: file đã thay đổi thì bỏ qua Range và gửi lại toàn bộ
+    if if_range and if_range != last_modified and not etag_matches(if_range, etag or ""):
+        return None
+    
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        # Không hỗ trợ multipart/byteranges - trả về toàn bộ file
+        return None
+    
+    start_text, _, end_text = ranges.strip().partition("-")
+    try:
+        if start_text == "":
+            # bytes=-N: N byte cuối
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    
+    if start >= size or start > end or start < 0:
+        raise HTTPException(
+            status_code=416,
+            detail=f"Requested range not satisfiable: {range_header}",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    
+    return start, min(end, size - 1)
 
 @handle_exceptions
 def delete_item(path: str) -> Dict[str, Any]:
@@ -151,8 +1041,7 @@ def move_item(src_path: str, dst_path: str) -> Dict[str, Any]:
     
     # Kiểm tra xem thư mục cha của destination có tồn tại không
     parent_dir = os.path.dirname(norm_dst)
-    if not os.path.exists(parent_dir):
-        os.makedirs(parent_dir)
+    os.makedirs(parent_dir, exist_ok=True)
     
     # Di chuyển item
     shutil.move(norm_src, norm_dst)
@@ -165,9 +1054,12 @@ def move_item(src_path: str, dst_path: str) -> Dict[str, Any]:
     }
 
 @handle_exceptions
-def copy_item(src_path: str, dst_path: str) -> Dict[str, Any]:
+def copy_item(src_path: str, dst_path: str, skip: Optional[str] = None, resume: bool = False,
+              workers: Optional[int] = None, progress: Optional[copy_service.CopyProgress] = None) -> Dict[str, Any]:
     """
-    Sao chép file hoặc thư mục
+    Sao chép file hoặc thư mục bằng copy_service: nhiều file song song, reflink/copy_file_range/sendfile
+    khi hệ thống file hỗ trợ. skip bỏ qua file đích đã giống nguồn (size_mtime, hash); resume tiếp tục
+    từ các file .part của lần chép bị gián đoạn. Truyền progress để theo dõi hoặc hủy giữa chừng.
     """
     norm_src = normalize_path(src_path)
     norm_dst = normalize_path(dst_path)
@@ -177,45 +1069,198 @@ def copy_item(src_path: str, dst_path: str) -> Dict[str, Any]:
     
     # Kiểm tra xem thư mục cha của destination có tồn tại không
     parent_dir = os.path.dirname(norm_dst)
-    if not os.path.exists(parent_dir):
-        os.makedirs(parent_dir)
+    os.makedirs(parent_dir, exist_ok=True)
     
-    # Sao chép item
-    if os.path.isfile(norm_src):
-        shutil.copy2(norm_src, norm_dst)
-        item_type = "file"
-    else:
-        shutil.copytree(norm_src, norm_dst)
-        item_type = "directory"
+    result = copy_service.copy_paths(norm_src, norm_dst, skip, resume, workers, progress)
+    BYTES_READ.inc(result["bytes_copied"], op="copy")
+    BYTES_WRITTEN.inc(result["bytes_copied"], op="copy")
     
     return {
-        "source": norm_src,
-        "destination": norm_dst,
-        "copied": True,
-        "type": item_type
+        **result,
+        "copied": not result["cancelled"]
     }
 
 @handle_exceptions
-def get_file_info(path: str) -> Dict[str, Any]:
+def get_file_info(path: str, refresh: bool = False) -> Dict[str, Any]:
     """
     Lấy thông tin chi tiết về file/thư mục
     """
     norm_path = normalize_path(path)
     
+    indexed = index_service.lookup_info(norm_path, refresh)
+    if indexed is not None:
+        return indexed
+    
     if not os.path.exists(norm_path):
         raise FileNotFoundError(f"Path does not exist: {path}")
     
-    stat_info = os.stat(norm_path)
-    
-    info = {
+    return info_from_stat(norm_path, os.stat(norm_path))
+
+def info_from_stat(norm_path: str, stat_info: os.stat_result) -> Dict[str, Any]:
+    """
+    Thông tin file/thư mục từ kết quả os.stat (không gọi thêm syscall).
+    inode, device, modified_ns xác định phiên bản nội dung của file (dùng cho cache hash).
+    """
+    is_file = stat.S_ISREG(stat_info.st_mode)
+    return {
         "path": norm_path,
         "name": os.path.basename(norm_path),
-        "type": "file" if os.path.isfile(norm_path) else "directory",
-        "size": stat_info.st_size if os.path.isfile(norm_path) else None,
+        "type": "file" if is_file else "directory",
+        "size": stat_info.st_size if is_file else None,
         "created": stat_info.st_ctime,
         "modified": stat_info.st_mtime,
         "accessed": stat_info.st_atime,
-        "permissions": stat_info.st_mode
+        "permissions": stat_info.st_mode,
+        "inode": stat_info.st_ino,
+        "device": stat_info.st_dev,
+        "modified_ns": stat_info.st_mtime_ns
     }
-    
-    return info 
\ No newline at end of file
+
+# Thao tác của /files/batch: tên -> (hàm service, các trường đường dẫn, các trường tham số khác)
+BATCH_OPERATIONS: Dict[str, Tuple[Callable, Tuple[str, ...], Tuple[str, ...]]] = {
+    "create_file": (create_file, ("path",), ("content",)),
+    "create_directory": (create_directory, ("path",), ()),
+    "delete": (delete_item, ("path",), ()),
+    "move": (move_item, ("source_path", "destination_path"), ()),
+    "copy": (copy_item, ("source_path", "destination_path"), ("skip",)),
+}
+BATCH_MODES = ("best_effort", "stop_on_error")
+
+def _ancestors(path: str) -> Iterator[str]:
+    # Chính path và các thư mục cha của nó tới gốc
+    while True:
+        yield path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return
+        path = parent
+
+def _plan_batch(paths: List[List[str]]) -> List[set]:
+    """
+    Phụ thuộc giữa các thao tác: thao tác sau phải chờ mọi thao tác trước có đường dẫn trùng,
+    là thư mục cha hoặc nằm bên trong đường dẫn của nó (ví dụ tạo thư mục rồi tạo file bên trong,
+    xóa thư mục sau khi di chuyển file ra ngoài). Các thao tác còn lại độc lập và chạy song song.
+    """
+    last_touch: Dict[str, int] = {}  # đường dẫn -> thao tác gần nhất dùng đúng đường dẫn đó
+    subtree: Dict[str, List[int]] = {}  # đường dẫn -> các thao tác dùng đường dẫn đó hoặc bên trong nó
+    dependencies = []
+    for index, op_paths in enumerate(paths):
+        deps = set()
+        for path in op_paths:
+            for ancestor in _ancestors(path):
+                if ancestor in last_touch:
+                    deps.add(last_touch[ancestor])
+            deps.update(subtree.get(path, ()))
+        deps.discard(index)
+        dependencies.append(deps)
+        for path in op_paths:
+            last_touch[path] = index
+            # Thao tác này đã chờ mọi thao tác bên trong path nên thao tác sau chỉ cần chờ nó
+            subtree[path] = [index]
+            for ancestor in list(_ancestors(path))[1:]:
+                subtree.setdefault(ancestor, []).append(index)
+    return dependencies
+
+def _batch_error(e: Exception) -> Tuple[int, str]:
+    if isinstance(e, HTTPException):
+        return e.status_code, str(e.detail)
+    return 500, str(e)
+
+@handle_exceptions
+def execute_batch(operations: List[Dict[str, Any]], mode: str = "best_effort",
+                  concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Chạy nhiều thao tác file (create_file, create_directory, delete, move, copy) trong một request.
+    Thứ tự giữa các thao tác liên quan tới cùng đường dẫn được giữ nguyên, các thao tác độc lập chạy song song.
+    - best_effort: chạy tất cả, thao tác lỗi không ảnh hưởng các thao tác khác
+    - stop_on_error: thao tác đầu tiên bị lỗi dừng việc bắt đầu các thao tác chưa chạy (trạng thái skipped);
+      lỗi kiểm tra tham số/đường dẫn được phát hiện trước khi chạy bất kỳ thao tác nào
+    """
+    if mode not in BATCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {mode}. Allowed: {', '.join(BATCH_MODES)}")
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=413,
+                            detail=f"Too many operations: {len(operations)} (max {BATCH_MAX_OPERATIONS})")
+    if concurrency is not None and concurrency <= 0:
+        raise HTTPException(status_code=400, detail="concurrency must be positive")
+    started = time.monotonic()
+
+    results: List[Dict[str, Any]] = [{"index": index, "op": op.get("op"), "status": "skipped"}
+                                     for index, op in enumerate(operations)]
+    calls: List[Optional[Tuple[Callable, list]]] = []
+    paths: List[List[str]] = []
+    for index, op in enumerate(operations):
+        spec = BATCH_OPERATIONS.get(op.get("op"))
+        try:
+            if spec is None:
+                raise HTTPException(status_code=400, detail=f"Invalid op: {op.get('op')}. "
+                                                            f"Allowed: {', '.join(BATCH_OPERATIONS)}")
+            func, path_fields, extra_fields = spec
+            missing = [field for field in path_fields if not op.get(field)]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"Missing field(s) for {op['op']}: {', '.join(missing)}")
+            paths.append([normalize_path(op[field]) for field in path_fields])
+            calls.append((func, [op[field] for field in path_fields] +
+                          [op[field] for field in extra_fields if op.get(field) is not None]))
+        except HTTPException as e:
+            results[index].update(status="failed", status_code=e.status_code, error=str(e.detail))
+            paths.append([])
+            calls.append(None)
+
+    invalid = [result for result in results if result["status"] == "failed"]
+    if invalid and mode == "stop_on_error":
+        return _batch_summary(results, mode, started)
+
+    dependencies = _plan_batch(paths)
+    dependents: Dict[int, List[int]] = {}
+    waiting = {}
+    for index, deps in enumerate(dependencies):
+        if calls[index] is None:
+            continue
+        deps = {dep for dep in deps if calls[dep] is not None}
+        waiting[index] = len(deps)
+        for dep in deps:
+            dependents.setdefault(dep, []).append(index)
+
+    workers = max(1, concurrency or BATCH_CONCURRENCY)
+    stopped = False
+    ready = deque(index for index, count in waiting.items() if count == 0)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as executor:
+        running = {}
+        while ready or running:
+            # Không để thao tác chờ sẵn trong executor: stop_on_error dừng ngay sau thao tác lỗi
+            while ready and not stopped and len(running) < workers:
+                index = ready.popleft()
+                func, args = calls[index]
+                running[executor.submit(func, *args)] = index
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    results[index].update(status="succeeded", data=future.result())
+                except Exception as e:
+                    status_code, detail = _batch_error(e)
+                    results[index].update(status="failed", status_code=status_code, error=detail)
+                    stopped = stopped or mode == "stop_on_error"
+                for dependent in dependents.get(index, ()):
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        ready.append(dependent)
+            if stopped:
+                ready.clear()
+
+    return _batch_summary(results, mode, started)
+
+def _batch_summary(results: List[Dict[str, Any]], mode: str, started: float) -> Dict[str, Any]:
+    counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+    for result in results:
+        counts[result["status"]] += 1
+    return {
+        "mode": mode,
+        "total": len(results),
+        **counts,
+        "duration": round(time.monotonic() - started, 3),
+        "results": results
+    }
\ No newline at end of file
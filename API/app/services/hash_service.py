@@ -0,0 +1,297 @@
+import os
+import mmap
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional, Iterator
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.common import normalize_path, handle_exceptions, logger, ensure_private_file, STATE_DIR
+from app.services import file_service
+from app.utils import metrics
+
+try:
+    import xxhash
+except ImportError:  # xxhash là tùy chọn (pip install xxhash)
+    xxhash = None
+
+# Load biến môi trường
+load_dotenv()
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(16, (os.cpu_count() or 1) * 2))))  # Số file được hash đồng thời
+HASH_BUFFER_SIZE = int(os.getenv("HASH_BUFFER_SIZE", str(4 * 1024 * 1024)))  # Byte mỗi lần đọc
+HASH_CACHE_ENABLED = os.getenv("HASH_CACHE_ENABLED", "true").lower() == "true"
+HASH_CACHE_PATH = os.getenv("HASH_CACHE_PATH", os.path.join(STATE_DIR, "hashes.sqlite3"))
+HASH_CACHE_MAX_ENTRIES = int(os.getenv("HASH_CACHE_MAX_ENTRIES", "1000000"))  # Vượt quá thì xóa các bản ghi cũ nhất
+
+HASH_ALGORITHMS = ("sha256", "sha1", "sha512", "md5", "blake2b", "blake2s", "xxh64", "xxh3_64", "xxh3_128")
+_XXHASH_ALGORITHMS = ("xxh64", "xxh3_64", "xxh3_128")
+
+# Bộ đệm đọc làm tròn theo trang bộ nhớ; mmap ẩn danh luôn bắt đầu tại biên trang
+_BUFFER_SIZE = max(mmap.PAGESIZE, -(-HASH_BUFFER_SIZE // mmap.PAGESIZE) * mmap.PAGESIZE)
+
+HASH_BYTES = metrics.counter("file_hash_bytes_total", "Bytes read and hashed by /files/hash", ("algorithm",))
+HASH_FILES = metrics.counter("file_hash_files_total", "Files handled by /files/hash by result", ("result",))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    algorithm TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    path TEXT,
+    hashed REAL NOT NULL,
+    PRIMARY KEY (device, inode, algorithm)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_hashes_hashed ON hashes(hashed);
+"""
+
+class HashCache:
+    """
+    Cache digest trên đĩa (SQLite), khóa (device, inode, thuật toán) và chỉ hợp lệ khi size và mtime_ns
+    còn khớp: file không đổi được trả lời chỉ bằng một lần stat, file đổi tên/di chuyển trong cùng
+    hệ thống file vẫn dùng lại được digest.
+    """
+
+    def __init__(self, db_path: str, max_entries: int):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stores = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Digest trong cache được trả về thay cho nội dung thật, nên DB của user khác không được dùng
+            conn = sqlite3.connect(ensure_private_file(self.db_path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, stat_info: os.stat_result, algorithm: str) -> Optional[str]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT size, mtime_ns, digest FROM hashes WHERE device = ? AND inode = ? AND algorithm = ?",
+                (stat_info.st_dev, stat_info.st_ino, algorithm)
+            ).fetchone()
+        if row is None or row[0] != stat_info.st_size or row[1] != stat_info.st_mtime_ns:
+            return None
+        return row[2]
+
+    def store(self, stat_info: os.stat_result, algorithm: str, digest: str, path: str):
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                "INSERT OR REPLACE INTO hashes (device, inode, algorithm, size, mtime_ns, digest, path, hashed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (stat_info.st_dev, stat_info.st_ino, algorithm, stat_info.st_size, stat_info.st_mtime_ns,
+                 digest, path, time.time())
+            )
+            self._stores += 1
+            if self._stores % 1000 == 0:
+                self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection):
+        # Giữ lại tối đa max_entries bản ghi, xóa bớt các bản ghi cũ nhất xuống 90% khi vượt quá
+        count = conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        if count > self.max_entries:
+            excess = count - int(self.max_entries * 0.9)
+            conn.execute("DELETE FROM hashes WHERE hashed <= (SELECT hashed FROM hashes ORDER BY hashed LIMIT 1 OFFSET ?)",
+                         (excess - 1,))
+            logger.info(f"Pruned about {excess} entries from hash cache")
+
+_cache: Optional[HashCache] = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[HashCache]:
+    """
+    Trả về cache nếu HASH_CACHE_ENABLED=true, ngược lại None.
+    Không mở được database (thuộc user khác, thư mục dùng chung...) thì tắt cache kèm cảnh báo.
+    """
+    global _cache, _cache_failed
+    if not HASH_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_failed:
+            cache = HashCache(HASH_CACHE_PATH, HASH_CACHE_MAX_ENTRIES)
+            try:
+                cache._db()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Hash cache disabled, cannot open {HASH_CACHE_PATH}: {str(e)}")
+                _cache_failed = True
+                return None
+            _cache = cache
+        return _cache
+
+def _new_hasher(algorithm: str):
+    if algorithm in _XXHASH_ALGORITHMS:
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+def _check_algorithm(algorithm: str):
+    if algorithm not in HASH_ALGORITHMS:
+        raise HTTPException(status_code=400,
+                            detail=f"Invalid algorithm: {algorithm}. Allowed: {', '.join(HASH_ALGORITHMS)}")
+    if algorithm in _XXHASH_ALGORITHMS and xxhash is None:
+        raise HTTPException(status_code=400, detail=f"{algorithm} requires the xxhash package")
+
+_readers: Optional[ThreadPoolExecutor] = None
+_readers_lock = threading.Lock()
+
+def _reader_pool() -> ThreadPoolExecutor:
+    global _readers
+    with _readers_lock:
+        if _readers is None:
+            _readers = ThreadPoolExecutor(max_workers=max(1, HASH_WORKERS), thread_name_prefix="hash-read")
+        return _readers
+
+def _digest(f, size: int, algorithm: str) -> str:
+    """
+    Hash nội dung file. File lớn hơn một bộ đệm được đọc trước (read-ahead) trên thread khác trong khi
+    chunk hiện tại đang được hash; đọc và hash đều nhả GIL nên I/O và CPU chồng lên nhau.
+    """
+    hasher = _new_hasher(algorithm)
+    # Bộ đệm mmap ẩn danh: căn theo trang, chỉ các trang được đọc vào mới tốn bộ nhớ, giải phóng ngay sau khi xong
+    if size < _BUFFER_SIZE:
+        buffers = [mmap.mmap(-1, max(mmap.PAGESIZE, -(-(size + 1) // mmap.PAGESIZE) * mmap.PAGESIZE))]
+    else:
+        buffers = [mmap.mmap(-1, _BUFFER_SIZE), mmap.mmap(-1, _BUFFER_SIZE)]
+    views = [memoryview(buffer) for buffer in buffers]
+    try:
+        if len(buffers) == 1:
+            while True:
+                count = f.readinto(views[0])
+                if not count:
+                    break
+                hasher.update(views[0][:count])
+                HASH_BYTES.inc(count, algorithm=algorithm)
+            return hasher.hexdigest()
+
+        readers = _reader_pool()
+        current = 0
+        pending = readers.submit(f.readinto, views[current])
+        while True:
+            count = pending.result()
+            if not count:
+                break
+            pending = readers.submit(f.readinto, views[1 - current])
+            hasher.update(views[current][:count])
+            HASH_BYTES.inc(count, algorithm=algorithm)
+            current = 1 - current
+        return hasher.hexdigest()
+    finally:
+        for view in views:
+            view.release()
+        for buffer in buffers:
+            buffer.close()
+
+def _same_version(before: os.stat_result, after: os.stat_result) -> bool:
+    return ((before.st_dev, before.st_ino, before.st_size, before.st_mtime_ns)
+            == (after.st_dev, after.st_ino, after.st_size, after.st_mtime_ns))
+
+def _hash_file(norm_path: str, algorithm: str, refresh: bool) -> Dict[str, Any]:
+    """
+    Digest của một file kèm thông tin stat (như /files/info). Cache hit chỉ tốn một lần stat;
+    file bị sửa trong lúc đọc vẫn trả về digest nhưng không được lưu vào cache (changed=true).
+    """
+    stat_info = os.stat(norm_path)
+    info = file_service.info_from_stat(norm_path, stat_info)
+    if info["type"] != "file":
+        raise ValueError(f"Path is not a regular file: {norm_path}")
+
+    cache = get_cache()
+    if cache is not None and not refresh:
+        digest = cache.get(stat_info, algorithm)
+        if digest is not None:
+            HASH_FILES.inc(result="cached")
+            return {**info, "algorithm": algorithm, "digest": digest, "cached": True}
+
+    # buffering=0: readinto ghi thẳng vào bộ đệm căn trang, không qua bộ đệm của io.BufferedReader
+    with open(norm_path, "rb", buffering=0) as f:
+        opened = os.fstat(f.fileno())
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        digest = _digest(f, opened.st_size, algorithm)
+        finished = os.fstat(f.fileno())
+
+    changed = not (_same_version(stat_info, opened) and _same_version(opened, finished))
+    if cache is not None and not changed:
+        try:
+            cache.store(finished, algorithm, digest, norm_path)
+        except sqlite3.Error as e:
+            logger.warning(f"Cannot store hash of {norm_path}: {str(e)}")
+    HASH_FILES.inc(result="hashed")
+    result = {**file_service.info_from_stat(norm_path, finished), "algorithm": algorithm, "digest": digest,
+              "cached": False}
+    if changed:
+        result["changed"] = True
+    return result
+
+def _hash_entry(norm_path: str, algorithm: str, refresh: bool) -> Dict[str, Any]:
+    # Kết quả một dòng NDJSON khi hash cây thư mục: lỗi của từng file không dừng cả cây
+    try:
+        result = _hash_file(norm_path, algorithm, refresh)
+    except (OSError, ValueError) as e:
+        HASH_FILES.inc(result="error")
+        return {"path": norm_path, "error": str(e)}
+    return {key: result[key] for key in ("path", "size", "modified_ns", "digest", "cached")}
+
+@handle_exceptions
+def hash_path(path: str, algorithm: str = "sha256", include: Optional[List[str]] = None,
+              exclude: Optional[List[str]] = None, refresh: bool = False,
+              workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Tính digest của một file, hoặc của mọi file trong cây thư mục (nhiều file song song).
+    Với file: trả về digest kèm thông tin stat. Với thư mục: {"type": "directory", "items": iterator}
+    các dòng {"path", "size", "modified_ns", "digest", "cached"} theo thứ tự hoàn thành.
+
+    Params:
+        include/exclude: glob giống /files/walk
+        refresh: bỏ qua cache, đọc lại toàn bộ nội dung
+    """
+    norm_path = normalize_path(path)
+    _check_algorithm(algorithm)
+
+    if not os.path.exists(norm_path):
+        raise FileNotFoundError(f"Path does not exist: {path}")
+
+    if not os.path.isdir(norm_path):
+        return _hash_file(norm_path, algorithm, refresh)
+
+    entries = file_service.walk_tree(norm_path, include=include, exclude=exclude, item_type="file",
+                                     fields=["path"])
+    return {
+        "path": norm_path,
+        "type": "directory",
+        "algorithm": algorithm,
+        "items": _iter_tree_hashes(entries, algorithm, refresh, max(1, workers or HASH_WORKERS)),
+    }
+
+def _iter_tree_hashes(entries: Iterator[Dict[str, Any]], algorithm: str, refresh: bool,
+                      workers: int) -> Iterator[Dict[str, Any]]:
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hash")
+    pending = set()
+    try:
+        for entry in entries:
+            if "error" in entry:
+                yield entry
+                continue
+            pending.add(executor.submit(_hash_entry, entry["path"], algorithm, refresh))
+            # Giới hạn số file đang chờ để bộ nhớ không tăng theo kích thước cây
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -0,0 +1,637 @@
+import os
+import sys
+import time
+import select
+import struct
+import sqlite3
+import threading
+import ctypes
+import ctypes.util
+from typing import Dict, Any, List, Optional, Iterator
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.common import BASE_PATH, STATE_DIR, normalize_path, handle_exceptions, logger, ensure_private_file
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Load biến môi trường
+load_dotenv()
+INDEX_ENABLED = os.getenv("METADATA_INDEX_ENABLED", "false").lower() == "true"
+INDEX_DB_PATH = os.getenv("METADATA_INDEX_PATH", os.path.join(STATE_DIR, "index.sqlite3"))
+INDEX_ROOT = os.path.abspath(os.getenv("METADATA_INDEX_ROOT", BASE_PATH))
+INDEX_EXCLUDE = [os.path.abspath(p) for p in os.getenv("METADATA_INDEX_EXCLUDE", "/proc,/sys,/dev,/run").split(",") if p]
+INDEX_MAX_STALENESS = float(os.getenv("METADATA_INDEX_MAX_STALENESS", "30"))  # Giây
+INDEX_WATCH = os.getenv("METADATA_INDEX_WATCH", "true").lower() == "true"
+INDEX_ELECTION_INTERVAL = float(os.getenv("METADATA_INDEX_ELECTION_INTERVAL", "5"))  # Giây giữa hai lần thử giành quyền ghi
+
+# Các cờ inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONTFOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONTFOLLOW)
+_EVENT_HEADER = struct.Struct("iIII")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    size INTEGER,
+    created REAL,
+    modified REAL,
+    accessed REAL,
+    permissions INTEGER,
+    inode INTEGER,
+    device INTEGER,
+    modified_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_entries_parent ON entries(parent);
+CREATE INDEX IF NOT EXISTS idx_entries_name ON entries(name);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    indexed_at REAL NOT NULL,
+    watched INTEGER NOT NULL DEFAULT 0
+);
+"""
+# Tăng khi đổi SCHEMA: chỉ mục chỉ là bản sao của hệ thống file nên schema cũ được xóa và crawl lại
+SCHEMA_VERSION = 2
+
+# Cùng các khóa với file_service.info_from_stat để /files/info trả về giống nhau dù có dùng chỉ mục hay không
+ENTRY_COLUMNS = ("path", "name", "type", "size", "created", "modified", "accessed", "permissions",
+                 "inode", "device", "modified_ns")
+INSERT_ENTRY = "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+class _Inotify:
+    """
+    Wrapper tối giản quanh inotify (Linux) qua ctypes, không cần thư viện ngoài
+    """
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float) -> Iterator[tuple]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+class MetadataIndex:
+    """
+    Chỉ mục metadata (SQLite) cho cây BASE_PATH: crawl ban đầu, cập nhật tăng dần bằng inotify,
+    các thư mục không được theo dõi sẽ được quét lại khi quá hạn INDEX_MAX_STALENESS.
+    Khi chạy nhiều worker, chỉ một worker (giữ flock trên file khóa cạnh database) crawl và theo dõi inotify;
+    worker khác chỉ đọc và tự liệt kê từ ổ đĩa khi dữ liệu trong chỉ mục đã cũ.
+    """
+
+    def __init__(self, db_path: str, root: str, exclude: List[str], max_staleness: float, watch: bool):
+        self.db_path = db_path
+        self.root = root
+        self.exclude = exclude
+        self.max_staleness = max_staleness
+        self.watch = watch and sys.platform.startswith("linux")
+        self._lock = threading.RLock()
+        self._conn = None
+        self._inotify = None
+        self._watches: Dict[int, str] = {}
+        self._watched_paths: Dict[str, int] = {}
+        self._watch_limit_reached = False
+        self._lock_fd = None
+        self.writer = False
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.crawl_state = {"running": False, "started": None, "finished": None, "directories": 0}
+
+    # ---- Kết nối SQLite ----
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(ensure_private_file(self.db_path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    conn.execute("DROP TABLE IF EXISTS entries")
+                    conn.execute("DROP TABLE IF EXISTS directories")
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                for statement in SCHEMA.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                conn.close()
+                raise
+            conn.row_factory = sqlite3.Row
+            self._conn = conn
+        return self._conn
+
+    def covers(self, norm_path: str) -> bool:
+        """
+        Đường dẫn có nằm trong phạm vi chỉ mục không
+        """
+        if not (norm_path == self.root or norm_path.startswith(self.root.rstrip(os.sep) + os.sep)):
+            return False
+        return not any(norm_path == p or norm_path.startswith(p + os.sep) for p in self.exclude)
+
+    # ---- Cập nhật chỉ mục ----
+
+    @staticmethod
+    def _row_from_stat(path: str, stat_info: os.stat_result, is_file: bool) -> tuple:
+        return (
+            path,
+            os.path.dirname(path),
+            os.path.basename(path),
+            "file" if is_file else "directory",
+            stat_info.st_size if is_file else None,
+            stat_info.st_ctime,
+            stat_info.st_mtime,
+            stat_info.st_atime,
+            stat_info.st_mode,
+            stat_info.st_ino,
+            stat_info.st_dev,
+            stat_info.st_mtime_ns
+        )
+
+    def _stat_row(self, path: str) -> Optional[tuple]:
+        try:
+            stat_info = os.stat(path)
+        except FileNotFoundError:
+            try:
+                # Symlink hỏng
+                stat_info = os.lstat(path)
+            except OSError:
+                return None
+        except OSError:
+            return None
+        return self._row_from_stat(path, stat_info, os.path.isfile(path))
+
+    def _delete_tree(self, conn: sqlite3.Connection, path: str):
+        prefix = path.rstrip(os.sep) + os.sep
+        # Khoảng [prefix, prefix + chr(0x10FFFF)) chứa mọi đường dẫn con, tận dụng index của khóa chính
+        conn.execute("DELETE FROM entries WHERE path = ? OR (path >= ? AND path < ?)",
+                     (path, prefix, prefix + "\U0010ffff"))
+        conn.execute("DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+                     (path, prefix, prefix + "\U0010ffff"))
+
+    def refresh_directory(self, norm_path: str) -> List[str]:
+        """
+        Quét lại một thư mục (không đệ quy), cập nhật các entry con. Trả về danh sách thư mục con.
+        """
+        rows = []
+        subdirs = []
+        try:
+            with os.scandir(norm_path) as entries:
+                for entry in entries:
+                    try:
+                        is_file = entry.is_file()
+                    except OSError:
+                        is_file = False
+                    try:
+                        stat_info = entry.stat()
+                    except OSError:
+                        try:
+                            stat_info = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                    rows.append(self._row_from_stat(entry.path, stat_info, is_file))
+                    try:
+                        if entry.is_dir(follow_symlinks=False) and self.covers(entry.path):
+                            subdirs.append(entry.path)
+                    except OSError:
+                        pass
+        except (FileNotFoundError, NotADirectoryError):
+            with self._lock:
+                conn = self._db()
+                conn.execute("BEGIN")
+                self._delete_tree(conn, norm_path)
+                conn.execute("COMMIT")
+            return []
+
+        present = {row[0] for row in rows}
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            try:
+                stale = [r["path"] for r in conn.execute("SELECT path FROM entries WHERE parent = ?", (norm_path,))
+                         if r["path"] not in present]
+                for path in stale:
+                    self._delete_tree(conn, path)
+                conn.executemany(INSERT_ENTRY, rows)
+                own_row = self._stat_row(norm_path)
+                if own_row is not None:
+                    conn.execute(INSERT_ENTRY, own_row)
+                conn.execute("INSERT OR REPLACE INTO directories VALUES (?, ?, ?)",
+                             (norm_path, time.time(), int(norm_path in self._watched_paths)))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return subdirs
+
+    def crawl(self, root: Optional[str] = None):
+        """
+        Crawl toàn bộ cây thư mục (BFS), đăng ký inotify cho từng thư mục
+        """
+        root = root or self.root
+        self.crawl_state.update({"running": True, "started": time.time(), "finished": None, "directories": 0})
+        logger.info(f"Metadata index crawl started: {root}")
+        try:
+            pending = [root]
+            while pending and not self._stop.is_set():
+                dir_path = pending.pop()
+                self._add_watch(dir_path)
+                pending.extend(self.refresh_directory(dir_path))
+                self.crawl_state["directories"] += 1
+        finally:
+            self.crawl_state.update({"running": False, "finished": time.time()})
+            logger.info(f"Metadata index crawl finished: {self.crawl_state['directories']} directories")
+
+    # ---- inotify ----
+
+    def _add_watch(self, dir_path: str):
+        if self._inotify is None or self._watch_limit_reached or dir_path in self._watched_paths:
+            return
+        try:
+            wd = self._inotify.add_watch(dir_path)
+        except OSError as e:
+            if e.errno == 28:  # ENOSPC: hết fs.inotify.max_user_watches
+                self._watch_limit_reached = True
+                logger.warning("inotify watch limit reached, remaining directories rely on staleness refresh")
+            return
+        with self._lock:
+            # Cùng inode đã được theo dõi dưới đường dẫn khác (inotify trả lại wd cũ): đổi sang đường dẫn mới
+            old_path = self._watches.get(wd)
+            if old_path is not None:
+                self._watched_paths.pop(old_path, None)
+            self._watches[wd] = dir_path
+            self._watched_paths[dir_path] = wd
+
+    def _forget_watch(self, wd: int):
+        with self._lock:
+            dir_path = self._watches.pop(wd, None)
+            if dir_path is not None:
+                self._watched_paths.pop(dir_path, None)
+                self._db().execute("UPDATE directories SET watched = 0 WHERE path = ?", (dir_path,))
+
+    def _forget_tree(self, dir_path: str):
+        """
+        Bỏ watch của thư mục đã bị di chuyển và mọi thư mục con: inotify vẫn theo dõi inode ở vị trí mới
+        nên đường dẫn đã lưu không còn đúng. IN_MOVED_TO ở thư mục đích sẽ crawl và theo dõi lại.
+        """
+        prefix = dir_path.rstrip(os.sep) + os.sep
+        with self._lock:
+            paths = [p for p in self._watched_paths if p == dir_path or p.startswith(prefix)]
+            for path in paths:
+                wd = self._watched_paths.pop(path)
+                self._watches.pop(wd, None)
+                if self._inotify is not None:
+                    self._inotify.rm_watch(wd)
+            self._db().execute("UPDATE directories SET watched = 0 WHERE path = ? OR (path >= ? AND path < ?)",
+                               (dir_path, prefix, prefix + "\U0010ffff"))
+
+    def _touch_entry(self, path: str):
+        row = self._stat_row(path)
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            if row is None:
+                self._delete_tree(conn, path)
+            else:
+                conn.execute(INSERT_ENTRY, row)
+            conn.execute("COMMIT")
+
+    def _handle_event(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            # Mất sự kiện - đánh dấu mọi thư mục là cũ để quét lại khi được truy vấn
+            logger.warning("inotify queue overflow, marking metadata index as stale")
+            with self._lock:
+                self._db().execute("UPDATE directories SET indexed_at = 0")
+            return
+
+        if mask & IN_IGNORED:
+            self._forget_watch(wd)
+            return
+
+        dir_path = self._watches.get(wd)
+        if dir_path is None:
+            return
+
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            self._touch_entry(dir_path)
+            if mask & IN_MOVE_SELF:
+                self._forget_tree(dir_path)
+            return
+
+        path = os.path.join(dir_path, name) if name else dir_path
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            with self._lock:
+                conn = self._db()
+                conn.execute("BEGIN")
+                self._delete_tree(conn, path)
+                conn.execute("COMMIT")
+            if mask & IN_ISDIR:
+                self._forget_tree(path)
+        else:
+            self._touch_entry(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and self.covers(path):
+                # Thư mục mới: crawl và theo dõi luôn cây con
+                pending = [path]
+                while pending:
+                    sub_path = pending.pop()
+                    self._add_watch(sub_path)
+                    pending.extend(self.refresh_directory(sub_path))
+
+        # mtime của chính thư mục cha cũng thay đổi
+        self._touch_entry(dir_path)
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            try:
+                for wd, mask, name in self._inotify.read_events(timeout=1.0):
+                    self._handle_event(wd, mask, name)
+            except Exception as e:
+                logger.error(f"Metadata index watcher error: {str(e)}")
+
+    # ---- Vòng đời ----
+
+    def _acquire_writer(self) -> bool:
+        """
+        Giành quyền ghi bằng flock (không chờ). Lock tự được giải phóng khi process giữ nó chết.
+        """
+        if fcntl is None:
+            return True
+        fd = os.open(ensure_private_file(self.db_path + ".lock"), os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _spawn(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _start_writer(self):
+        self.writer = True
+        with self._lock:
+            # Watch của writer trước (nếu có) đã mất cùng process của nó
+            self._db().execute("UPDATE directories SET watched = 0")
+        if self.watch:
+            try:
+                self._inotify = _Inotify()
+            except OSError as e:
+                logger.warning(f"inotify unavailable, metadata index uses staleness refresh only: {str(e)}")
+
+        self._spawn(self.crawl, "index-crawl")
+        if self._inotify is not None:
+            self._spawn(self._watch_loop, "index-watch")
+
+    def _elect_loop(self):
+        while not self._stop.wait(INDEX_ELECTION_INTERVAL):
+            if self._acquire_writer():
+                logger.info("Metadata index writer is gone, this worker takes over")
+                self._start_writer()
+                return
+
+    def start(self):
+        self._db()
+        if self._acquire_writer():
+            self._start_writer()
+        else:
+            logger.info("Metadata index is maintained by another worker, this worker only reads it")
+            self._spawn(self._elect_loop, "index-elect")
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.writer = False
+
+    # ---- Truy vấn ----
+
+    def _is_fresh(self, dir_path: str) -> bool:
+        # Cột watched do writer ghi nên worker chỉ đọc cũng biết thư mục nào đang được inotify theo dõi
+        with self._lock:
+            row = self._db().execute("SELECT indexed_at, watched FROM directories WHERE path = ?",
+                                     (dir_path,)).fetchone()
+        if row is None:
+            return False
+        if row["watched"] and row["indexed_at"] > 0:
+            return True
+        return time.time() - row["indexed_at"] <= self.max_staleness
+
+    def query_dir(self, norm_path: str, refresh: bool = False) -> Optional[List[Dict[str, Any]]]:
+        if refresh or not self._is_fresh(norm_path):
+            if not self.writer:
+                # Chỉ writer cập nhật chỉ mục, worker khác liệt kê trực tiếp từ ổ đĩa
+                return None
+            self.refresh_directory(norm_path)
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT path, name, type, size, modified FROM entries WHERE parent = ?", (norm_path,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def query_info(self, norm_path: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        parent = os.path.dirname(norm_path)
+        if refresh or not self._is_fresh(parent):
+            if not self.writer:
+                return None
+            self._touch_entry(norm_path)
+        with self._lock:
+            row = self._db().execute(
+                f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries WHERE path = ?", (norm_path,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def search(self, pattern: Optional[str], under: str, item_type: Optional[str],
+               modified_after: Optional[float], modified_before: Optional[float], limit: int) -> List[Dict[str, Any]]:
+        prefix = under.rstrip(os.sep) + os.sep
+        sql = "SELECT path, name, type, size, modified FROM entries WHERE path >= ? AND path < ?"
+        params: List[Any] = [prefix, prefix + "\U0010ffff"]
+        if pattern:
+            sql += " AND name GLOB ?"
+            params.append(pattern)
+        if item_type:
+            sql += " AND type = ?"
+            params.append(item_type)
+        if modified_after is not None:
+            sql += " AND modified >= ?"
+            params.append(modified_after)
+        if modified_before is not None:
+            sql += " AND modified <= ?"
+            params.append(modified_before)
+        sql += " ORDER BY path LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_stale(self, root: str):
+        prefix = root.rstrip(os.sep) + os.sep
+        with self._lock:
+            self._db().execute("UPDATE directories SET indexed_at = 0 WHERE path = ? OR (path >= ? AND path < ?)",
+                               (root, prefix, prefix + "\U0010ffff"))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._db()
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            directories = conn.execute("SELECT COUNT(*) FROM directories").fetchone()[0]
+            watches = len(self._watches)
+        return {
+            "enabled": True,
+            "root": self.root,
+            "db_path": self.db_path,
+            "writer": self.writer,
+            "entries": entries,
+            "directories": directories,
+            "watching": self._inotify is not None,
+            "watches": watches,
+            "watch_limit_reached": self._watch_limit_reached,
+            "max_staleness": self.max_staleness,
+            "crawl": dict(self.crawl_state)
+        }
+
+_index: Optional[MetadataIndex] = None
+
+def get_index() -> Optional[MetadataIndex]:
+    """
+    Trả về chỉ mục nếu METADATA_INDEX_ENABLED=true, ngược lại None
+    """
+    global _index
+    if INDEX_ENABLED and _index is None:
+        _index = MetadataIndex(INDEX_DB_PATH, INDEX_ROOT, INDEX_EXCLUDE, INDEX_MAX_STALENESS, INDEX_WATCH)
+    return _index
+
+def start():
+    """
+    Khởi động crawl ban đầu và watcher inotify (gọi khi server khởi động)
+    """
+    index = get_index()
+    if index is not None:
+        index.start()
+
+def stop():
+    if _index is not None:
+        _index.stop()
+
+def lookup_dir(norm_path: str, refresh: bool = False) -> Optional[List[Dict[str, Any]]]:
+    """
+    Lấy danh sách entry con từ chỉ mục, None nếu chỉ mục tắt, đường dẫn ngoài phạm vi
+    hoặc dữ liệu đã cũ mà worker này không phải writer
+    """
+    index = get_index()
+    if index is None or not index.covers(norm_path):
+        return None
+    return index.query_dir(norm_path, refresh)
+
+def lookup_info(norm_path: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Lấy thông tin một file/thư mục từ chỉ mục, None nếu không có trong chỉ mục
+    """
+    index = get_index()
+    if index is None or not index.covers(norm_path):
+        return None
+    return index.query_info(norm_path, refresh)
+
+def _require_index() -> MetadataIndex:
+    index = get_index()
+    if index is None:
+        raise HTTPException(status_code=503, detail="Metadata index is disabled (set METADATA_INDEX_ENABLED=true)")
+    return index
+
+@handle_exceptions
+def search(path: Optional[str] = None, pattern: Optional[str] = None, item_type: Optional[str] = None,
+           modified_after: Optional[float] = None, modified_before: Optional[float] = None,
+           limit: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Tìm file/thư mục trong chỉ mục theo glob tên, loại và thời gian sửa đổi
+    """
+    index = _require_index()
+    under = normalize_path(path) if path else index.root
+    if not index.covers(under):
+        raise HTTPException(status_code=400, detail=f"Path is outside of the metadata index: {under}")
+    return index.search(pattern, under, item_type, modified_after, modified_before, limit)
+
+@handle_exceptions
+def refresh(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Buộc crawl lại một cây con (mặc định toàn bộ chỉ mục).
+    Trên worker không giữ quyền ghi, cây con chỉ được đánh dấu cũ để không được dùng tới khi writer quét lại.
+    """
+    index = _require_index()
+    root = normalize_path(path) if path else index.root
+    if not index.covers(root):
+        raise HTTPException(status_code=400, detail=f"Path is outside of the metadata index: {root}")
+    if index.writer:
+        index.crawl(root)
+    else:
+        index.mark_stale(root)
+    return index.status()
+
+@handle_exceptions
+def status() -> Dict[str, Any]:
+    """
+    Trạng thái chỉ mục: số entry, số thư mục được theo dõi, tiến độ crawl
+    """
+    index = get_index()
+    if index is None:
+        return {"enabled": False}
+    return index.status()
\ No newline at end of file
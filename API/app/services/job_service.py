@@ -0,0 +1,592 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import signal
+import sqlite3
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.services import scan_service, exec_service, file_service, copy_service
+from app.utils.common import normalize_path, handle_exceptions, logger, ensure_private_dir, ensure_private_file, STATE_DIR
+from app.utils.dispatch import get_pool
+from app.utils import metrics
+
+# Load biến môi trường
+load_dotenv()
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(STATE_DIR, "jobs.sqlite3"))
+JOB_OUTPUT_DIR = os.getenv("JOB_OUTPUT_DIR", os.path.join(STATE_DIR, "jobs"))
+JOB_MAX_CONCURRENT = int(os.getenv("JOB_MAX_CONCURRENT", "4"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))  # Giây
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))  # Job đang chạy không được gia hạn quá thời gian này thì bị thu hồi
+
+JOB_KINDS = ("command", "scan", "copy")
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+OUTPUT_STREAMS = ("stdout", "stderr")
+
+# Các parser dùng được cho job scan
+SCAN_PARSERS = {
+    "auto": scan_service.read_file_auto,
+    "docx": scan_service.read_docx,
+    "excel": scan_service.read_excel,
+    "pdf": scan_service.read_pdf,
+    "csv": scan_service.read_csv,
+    "text": scan_service.read_text_file,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    summary TEXT,
+    error TEXT,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(status, priority DESC, created);
+"""
+
+class JobManager:
+    """
+    Hàng đợi job lưu trong SQLite: lấy job theo độ ưu tiên, chạy tối đa max_concurrent job cùng lúc.
+    Job được nhận bằng UPDATE có điều kiện nên an toàn khi nhiều process cùng dùng một file DB;
+    yêu cầu hủy được ghi vào DB để process đang chạy job nhận được.
+    Process nhận job ghi owner và gia hạn heartbeat định kỳ; job chỉ bị thu hồi khi lease đã hết hạn
+    (process chạy nó đã chết), nên worker khác khởi động không lấy mất job đang chạy.
+    """
+
+    def __init__(self, db_path: str, output_dir: str, max_concurrent: int, poll_interval: float,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.max_concurrent = max(1, max_concurrent)
+        self.poll_interval = poll_interval
+        # Lease phải dài hơn vài chu kỳ gia hạn, nếu không job của process còn sống cũng bị thu hồi
+        self.lease_seconds = max(lease_seconds, 3 * poll_interval)
+        # Định danh process: pid kèm id ngẫu nhiên của lần khởi động (pid có thể được dùng lại)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self._last_heartbeat = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._running: Dict[str, threading.Event] = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    # ---- Kết nối SQLite (mỗi thread một kết nối) ----
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Job trong DB được chạy (kể cả lệnh shell), nên DB và thư mục output phải là của riêng user chạy server;
+            # nếu không, PermissionError làm server từ chối khởi động bộ lập lịch
+            ensure_private_dir(self.output_dir)
+            conn = sqlite3.connect(ensure_private_file(self.db_path), isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.output_dir, job_id)
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["summary"] = json.loads(job["summary"]) if job["summary"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    # ---- API ----
+
+    def submit(self, kind: str, params: Dict[str, Any], priority: int) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        self._db().execute(
+            "INSERT INTO jobs (id, kind, params, priority, status, created) VALUES (?, ?, ?, ?, 'queued', ?)",
+            (job_id, kind, json.dumps(params), priority, time.time())
+        )
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+        job = self._row_to_job(row)
+        if job["kind"] == "copy":
+            job["progress"] = self.read_progress(job_id)
+        return job
+
+    def read_progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Tiến độ được runner ghi ra file nên đọc được từ mọi process dùng chung DB
+        try:
+            with open(os.path.join(self.job_dir(job_id), "progress.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_progress(self, job_id: str, progress: Dict[str, Any]):
+        path = os.path.join(self.job_dir(job_id), "progress.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+        os.replace(path + ".tmp", path)
+
+    def find(self, status: Optional[str], kind: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        sql, args = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status:
+            sql += " AND status = ?"
+            args.append(status)
+        if kind:
+            sql += " AND kind = ?"
+            args.append(kind)
+        sql += " ORDER BY created DESC LIMIT ?"
+        args.append(limit)
+        return [self._row_to_job(row) for row in self._db().execute(sql, args)]
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        db = self._db()
+        job = self.get(job_id)
+        if job["status"] in FINISHED_STATUSES:
+            return job
+        # Job chưa chạy: hủy ngay; đang chạy: đặt cờ để runner dừng process
+        updated = db.execute(
+            "UPDATE jobs SET status = 'cancelled', finished = ?, cancel_requested = 1 WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        ).rowcount
+        if not updated:
+            db.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            with self._lock:
+                event = self._running.get(job_id)
+            if event is not None:
+                event.set()
+        return self.get(job_id)
+
+    def delete(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        if job["status"] not in FINISHED_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}, cancel it before deleting")
+        self._db().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return job
+
+    def read_output(self, job_id: str, stream: str, offset: int, limit: int) -> Dict[str, Any]:
+        job = self.get(job_id)
+        output_path = os.path.join(self.job_dir(job_id), f"{stream}.log")
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        offset = min(max(0, offset), size)
+        data = b""
+        if size > offset:
+            with open(output_path, "rb") as f:
+                f.seek(offset)
+                data = f.read(limit)
+        next_offset = offset + len(data)
+        return {
+            "job_id": job_id,
+            "stream": stream,
+            "status": job["status"],
+            "offset": offset,
+            "next_offset": next_offset,
+            "size": size,
+            # Hết dữ liệu khi đã đọc tới cuối và job đã kết thúc (không còn ghi thêm)
+            "eof": next_offset >= size and job["status"] in FINISHED_STATUSES,
+            "data": data.decode("utf-8", errors="replace")
+        }
+
+    def read_result(self, job_id: str) -> Any:
+        job = self.get(job_id)
+        if job["kind"] != "scan":
+            raise HTTPException(status_code=400, detail="Only scan jobs have a result, use the output endpoint")
+        if job["status"] != "succeeded":
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}, no result available")
+        with open(os.path.join(self.job_dir(job_id), "result.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def status(self) -> Dict[str, Any]:
+        counts = {status: 0 for status in JOB_STATUSES}
+        for row in self._db().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        with self._lock:
+            running_here = len(self._running)
+        return {"max_concurrent": self.max_concurrent, "running_in_this_process": running_here, "owner": self.owner,
+                "lease_seconds": self.lease_seconds, "jobs": counts}
+
+    # ---- Bộ lập lịch ----
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._recover()
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="job")
+        self._thread = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        with self._lock:
+            for event in self._running.values():
+                event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _recover(self):
+        # Job đang chạy mà lease đã hết hạn (process chạy nó đã tắt hoặc bị kill): scan được chạy lại,
+        # copy chạy lại và tiếp tục từ các file .part, lệnh shell đánh dấu thất bại (có thể có tác dụng phụ).
+        # Job của process còn sống luôn được gia hạn nên không bị động tới.
+        db = self._db()
+        now = time.time()
+        expired = "status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)"
+        requeued = db.execute(f"UPDATE jobs SET status = 'queued', started = NULL, owner = NULL, heartbeat = NULL "
+                              f"WHERE {expired} AND kind IN ('scan', 'copy')", (now - self.lease_seconds,)).rowcount
+        failed = db.execute(f"UPDATE jobs SET status = 'failed', finished = ?, "
+                            f"error = 'Interrupted: the server running it stopped', owner = NULL "
+                            f"WHERE {expired} AND kind = 'command'", (now, now - self.lease_seconds)).rowcount
+        if requeued or failed:
+            logger.warning(f"Recovered jobs with an expired lease: {requeued} requeued, {failed} marked failed")
+
+    def _heartbeat(self):
+        # Gia hạn lease cho mọi job process này đang chạy; job đã bị thu hồi (không còn thuộc process này)
+        # thì dừng lại để không chạy song song với process đã nhận lại nó
+        now = time.time()
+        if now - self._last_heartbeat < self.lease_seconds / 3:
+            return
+        self._last_heartbeat = now
+        db = self._db()
+        db.execute("UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = 'running'", (now, self.owner))
+        with self._lock:
+            running = dict(self._running)
+        if running:
+            placeholders = ", ".join("?" * len(running))
+            owned = {row["id"] for row in db.execute(f"SELECT id FROM jobs WHERE owner = ? AND id IN ({placeholders})",
+                                                     (self.owner, *running))}
+            lost = [(job_id, event) for job_id, event in running.items() if job_id not in owned]
+        else:
+            lost = []
+        for job_id, event in lost:
+            logger.warning(f"Job {job_id} is no longer owned by this process, stopping it")
+            event.set()
+        self._recover()
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        db = self._db()
+        while True:
+            row = db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created LIMIT 1").fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            claimed = db.execute("UPDATE jobs SET status = 'running', started = ?, owner = ?, heartbeat = ? "
+                                 "WHERE id = ? AND status = 'queued'",
+                                 (now, self.owner, now, row["id"])).rowcount
+            if claimed:
+                return self.get(row["id"])
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                self._heartbeat()
+                with self._lock:
+                    free = self.max_concurrent - len(self._running)
+                job = self._claim_next() if free > 0 else None
+                if job is None:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                event = threading.Event()
+                with self._lock:
+                    self._running[job["id"]] = event
+                self._executor.submit(self._run_job, job, event)
+            except Exception as e:
+                logger.error(f"Job dispatcher error: {e}")
+                self._stop.wait(self.poll_interval)
+
+    def _cancel_requested(self, job_id: str, event: threading.Event) -> bool:
+        if event.is_set():
+            return True
+        row = self._db().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is None or bool(row["cancel_requested"])
+
+    def _finish(self, job_id: str, status: str, summary: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        # Chỉ ghi kết quả khi job vẫn thuộc process này (chưa bị thu hồi vì lease hết hạn)
+        self._db().execute("UPDATE jobs SET status = ?, finished = ?, summary = ?, error = ? "
+                           "WHERE id = ? AND owner = ? AND status = 'running'",
+                           (status, time.time(), json.dumps(summary, default=str) if summary is not None else None,
+                            error, job_id, self.owner))
+
+    def _run_job(self, job: Dict[str, Any], event: threading.Event):
+        try:
+            if job["kind"] == "command":
+                self._run_command(job, event)
+            elif job["kind"] == "copy":
+                self._run_copy(job, event)
+            else:
+                self._run_scan(job, event)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Job {job['id']} failed: {detail}")
+            self._finish(job["id"], "failed", error=detail)
+        finally:
+            with self._lock:
+                self._running.pop(job["id"], None)
+            self._wakeup.set()
+
+    def _run_command(self, job: Dict[str, Any], event: threading.Event):
+        params = job["params"]
+        job_dir = self.job_dir(job["id"])
+        os.makedirs(job_dir, exist_ok=True)
+        timeout = params.get("timeout")
+        started = time.monotonic()
+
+        # Ghi thẳng stdout/stderr ra file, không giữ output trong bộ nhớ
+        with open(os.path.join(job_dir, "stdout.log"), "wb") as stdout, \
+                open(os.path.join(job_dir, "stderr.log"), "wb") as stderr:
+            process = subprocess.Popen(
+                exec_service.build_shell_command(params["command"], params.get("shell_type")),
+                shell=True, stdin=subprocess.DEVNULL, stdout=stdout, stderr=stderr,
+                start_new_session=os.name == "posix"
+            )
+            exec_service.SPAWN_SECONDS.observe(time.monotonic() - started, kind="job")
+            cancelled = timed_out = False
+            while True:
+                try:
+                    process.wait(timeout=min(self.poll_interval, 0.5))
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if self._cancel_requested(job["id"], event):
+                    cancelled = True
+                elif timeout is not None and time.monotonic() - started > timeout:
+                    timed_out = True
+                if cancelled or timed_out:
+                    _kill_process_tree(process)
+                    process.wait()
+                    break
+
+        summary = {
+            "return_code": process.returncode,
+            "duration": round(time.monotonic() - started, 3),
+            "stdout_bytes": os.path.getsize(os.path.join(job_dir, "stdout.log")),
+            "stderr_bytes": os.path.getsize(os.path.join(job_dir, "stderr.log")),
+            "timed_out": timed_out
+        }
+        exec_service.DURATION_SECONDS.observe(
+            summary["duration"], kind="job",
+            outcome="cancelled" if cancelled else exec_service.command_outcome(process.returncode, timed_out))
+        if cancelled:
+            self._finish(job["id"], "cancelled", summary)
+        elif timed_out:
+            self._finish(job["id"], "failed", summary, f"Command execution timed out after {timeout} seconds")
+        else:
+            self._finish(job["id"], "succeeded" if process.returncode == 0 else "failed", summary)
+
+    def _run_scan(self, job: Dict[str, Any], event: threading.Event):
+        params = job["params"]
+        parser = SCAN_PARSERS[params.get("parser", "auto")]
+        args = params.get("args", [])
+        started = time.monotonic()
+
+        # Phân tích trên pool cpu; không dừng được giữa chừng nên chỉ kiểm tra hủy khi chờ
+        while True:
+            try:
+                future = get_pool("cpu").submit(parser, params["path"], *args)
+                break
+            except HTTPException:
+                # Pool cpu đang đầy - chờ rồi thử lại thay vì làm job thất bại
+                if self._cancel_requested(job["id"], event):
+                    self._finish(job["id"], "cancelled")
+                    return
+                time.sleep(self.poll_interval)
+        while True:
+            try:
+                result = future.result(timeout=min(self.poll_interval, 0.5))
+                break
+            except FutureTimeoutError:
+                if self._cancel_requested(job["id"], event):
+                    future.cancel()
+                    self._finish(job["id"], "cancelled")
+                    return
+        scan_service.PARSE_SECONDS.observe(time.monotonic() - started, parser=params.get("parser", "auto"))
+
+        result_path = os.path.join(self.job_dir(job["id"]), "result.json")
+        os.makedirs(os.path.dirname(result_path), exist_ok=True)
+        with open(result_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, default=str)
+        os.replace(result_path + ".tmp", result_path)
+        self._finish(job["id"], "succeeded", {
+            "duration": round(time.monotonic() - started, 3),
+            "result_bytes": os.path.getsize(result_path)
+        })
+
+    def _run_copy(self, job: Dict[str, Any], event: threading.Event):
+        params = job["params"]
+        progress = copy_service.CopyProgress()
+
+        # Chép trên pool io; runner ghi tiến độ ra progress.json và dừng bản sao khi job bị hủy.
+        # Luôn resume: job chạy lại sau khi server khởi động lại sẽ tiếp tục các file .part.
+        while True:
+            try:
+                future = get_pool("io").submit(file_service.copy_item, params["source"], params["destination"],
+                                               params.get("skip"), True, params.get("workers"), progress)
+                break
+            except HTTPException:
+                if self._cancel_requested(job["id"], event):
+                    self._finish(job["id"], "cancelled")
+                    return
+                time.sleep(self.poll_interval)
+        while True:
+            try:
+                result = future.result(timeout=min(self.poll_interval, 0.5))
+                break
+            except FutureTimeoutError:
+                self._write_progress(job["id"], progress.snapshot())
+                if not progress.cancelled and self._cancel_requested(job["id"], event):
+                    progress.cancel()
+            except HTTPException:
+                self._write_progress(job["id"], progress.snapshot())
+                raise
+        self._write_progress(job["id"], progress.snapshot())
+        self._finish(job["id"], "cancelled" if result["cancelled"] else "succeeded", result)
+
+def _kill_process_tree(process: subprocess.Popen):
+    # Dừng cả nhóm process (shell và các process con) trên Unix
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+def get_manager() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(JOB_DB_PATH, JOB_OUTPUT_DIR, JOB_MAX_CONCURRENT, JOB_POLL_INTERVAL)
+        return _manager
+
+def start():
+    """
+    Khôi phục job dở dang và khởi động bộ lập lịch (gọi khi server khởi động)
+    """
+    get_manager().start()
+
+def stop():
+    if _manager is not None:
+        _manager.stop()
+
+@handle_exceptions
+def submit_command(command: str, timeout: Optional[int] = None, shell_type: Optional[str] = None,
+                   priority: int = 0) -> Dict[str, Any]:
+    """
+    Đưa lệnh shell vào hàng đợi job, trả về thông tin job (có id)
+    """
+    return get_manager().submit("command", {"command": command, "timeout": timeout, "shell_type": shell_type}, priority)
+
+@handle_exceptions
+def submit_scan(path: str, parser: str = "auto", args: Optional[List[Any]] = None, priority: int = 0) -> Dict[str, Any]:
+    """
+    Đưa việc phân tích file vào hàng đợi job; args là các tham số thêm của parser
+    (ví dụ sheet_name cho excel, delimiter cho csv)
+    """
+    if parser not in SCAN_PARSERS:
+        raise HTTPException(status_code=400, detail=f"Invalid parser: {parser}. Allowed: {', '.join(SCAN_PARSERS)}")
+    norm_path = normalize_path(path)
+    if not os.path.exists(norm_path):
+        raise FileNotFoundError(f"File does not exist: {path}")
+    return get_manager().submit("scan", {"path": norm_path, "parser": parser, "args": args or []}, priority)
+
+@handle_exceptions
+def submit_copy(source_path: str, destination_path: str, skip: Optional[str] = None, workers: Optional[int] = None,
+                priority: int = 0) -> Dict[str, Any]:
+    """
+    Đưa việc sao chép file/thư mục vào hàng đợi job; tiến độ (byte/file đã chép, tốc độ) nằm trong
+    trường progress của job
+    """
+    if skip is not None and skip not in copy_service.SKIP_MODES:
+        raise HTTPException(status_code=400,
+                            detail=f"Invalid skip mode: {skip}. Allowed: {', '.join(copy_service.SKIP_MODES)}")
+    norm_src = normalize_path(source_path)
+    norm_dst = normalize_path(destination_path)
+    if not os.path.exists(norm_src):
+        raise FileNotFoundError(f"Source path does not exist: {source_path}")
+    return get_manager().submit("copy", {"source": norm_src, "destination": norm_dst, "skip": skip,
+                                         "workers": workers}, priority)
+
+@handle_exceptions
+def get_job(job_id: str) -> Dict[str, Any]:
+    return get_manager().get(job_id)
+
+@handle_exceptions
+def list_jobs(status: Optional[str] = None, kind: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Danh sách job mới nhất, lọc theo trạng thái và loại
+    """
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {status}. Allowed: {', '.join(JOB_STATUSES)}")
+    if kind is not None and kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Invalid kind: {kind}. Allowed: {', '.join(JOB_KINDS)}")
+    return get_manager().find(status, kind, limit)
+
+@handle_exceptions
+def get_job_output(job_id: str, stream: str = "stdout", offset: int = 0, limit: int = 65536) -> Dict[str, Any]:
+    """
+    Đọc một đoạn output (stdout/stderr) của job lệnh, bắt đầu từ offset byte
+    """
+    if stream not in OUTPUT_STREAMS:
+        raise HTTPException(status_code=400, detail=f"Invalid stream: {stream}. Allowed: {', '.join(OUTPUT_STREAMS)}")
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    return get_manager().read_output(job_id, stream, offset, limit)
+
+@handle_exceptions
+def get_job_result(job_id: str) -> Any:
+    """
+    Kết quả của job scan đã hoàn thành (đọc lại từ file, không phân tích lại)
+    """
+    return get_manager().read_result(job_id)
+
+@handle_exceptions
+def cancel_job(job_id: str) -> Dict[str, Any]:
+    return get_manager().cancel(job_id)
+
+@handle_exceptions
+def delete_job(job_id: str) -> Dict[str, Any]:
+    return get_manager().delete(job_id)
+
+@handle_exceptions
+def status() -> Dict[str, Any]:
+    return get_manager().status()
+
+def _collect_job_metrics() -> list:
+    if _manager is None:
+        return []
+    data = _manager.status()
+    return [
+        ("jobs", "gauge", "Jobs in the queue database by status",
+         [({"status": name}, count) for name, count in data["jobs"].items()]),
+        ("jobs_running", "gauge", "Jobs running in this process", [({}, data["running_in_this_process"])]),
+        ("jobs_max_concurrent", "gauge", "Maximum number of jobs running at once", [({}, data["max_concurrent"])]),
+    ]
+
+metrics.register_collector(_collect_job_metrics)
\ No newline at end of file
@@ -1,12 +1,80 @@
 import os
 import io
+import sys
 import json
-from typing import Dict, Any, List, Optional
-import pandas as pd
-from docx import Document
-from PyPDF2 import PdfReader
-import openpyxl
+import time
+import threading
+import importlib
+from concurrent.futures import wait, FIRST_COMPLETED
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Iterator
+from fastapi import HTTPException
+from dotenv import load_dotenv
 from app.utils.common import normalize_path, handle_exceptions, logger
+from app.utils.dispatch import get_pool
+from app.utils import metrics
+
+# Các thư viện phân tích nặng (pandas, python-docx, PyPDF2, openpyxl) được import khi dùng lần đầu,
+# để các worker chỉ phục vụ /files/* hoặc /exec/* không phải trả chi phí import và bộ nhớ
+if TYPE_CHECKING:
+    import pandas as pd
+    from PyPDF2 import PdfReader
+
+# Load biến môi trường
+load_dotenv()
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "32"))
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "50000"))
+CSV_ENGINES = ("c", "python", "pyarrow")
+PRELOAD_PARSERS = os.getenv("PRELOAD_PARSERS", "")  # Danh sách parser import sẵn khi khởi động, ví dụ "pdf,excel" hoặc "all"
+
+# Module cần import cho từng parser
+PARSER_MODULES = {
+    "csv": ("numpy", "pandas"),
+    "docx": ("docx",),
+    "pdf": ("PyPDF2",),
+    "excel": ("openpyxl",),
+    "arrow": ("pyarrow", "pyarrow.csv"),
+}
+
+# Parser chạy trong process con của pool cpu nên thời gian được ghi ở process chính, nơi gọi parser
+PARSE_SECONDS = metrics.histogram("scan_parse_seconds", "Time to parse a document (cache misses only), by parser",
+                                  ("parser",))
+
+def preload_modules(parsers: Optional[str] = None) -> List[str]:
+    """
+    Danh sách module tương ứng với cấu hình PRELOAD_PARSERS ("all" hoặc tên parser, phân cách bởi dấu phẩy)
+    """
+    parsers = PRELOAD_PARSERS if parsers is None else parsers
+    names = [name.strip().lower() for name in parsers.split(",") if name.strip()]
+    if "all" in names:
+        names = list(PARSER_MODULES)
+    modules = []
+    for name in names:
+        if name not in PARSER_MODULES:
+            logger.warning(f"Unknown parser in PRELOAD_PARSERS: {name}")
+            continue
+        modules.extend(module for module in PARSER_MODULES[name] if module not in modules)
+    return modules
+
+def preload_parsers(parsers: Optional[str] = None) -> Dict[str, float]:
+    """
+    Import sẵn các thư viện phân tích, trả về thời gian import (giây) của từng module
+    """
+    timings = {}
+    for module in preload_modules(parsers):
+        started = time.perf_counter()
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Cannot preload {module}: {e}")
+            continue
+        timings[module] = round(time.perf_counter() - started, 4)
+    return timings
+
+def loaded_parsers() -> Dict[str, bool]:
+    """
+    Parser nào đã được import trong process hiện tại
+    """
+    return {name: all(module in sys.modules for module in modules) for name, modules in PARSER_MODULES.items()}
 
 @handle_exceptions
 def read_docx(path: str) -> Dict[str, Any]:
@@ -21,6 +89,8 @@ def read_docx(path: str) -> Dict[str, Any]:
     if not norm_path.lower().endswith('.docx'):
         raise ValueError(f"File is not a Word document: {path}")
     
+    from docx import Document
+    
     # Đọc file docx
     doc = Document(norm_path)
     
@@ -44,10 +114,10 @@ def read_docx(path: str) -> Dict[str, Any]:
         "full_text": "\n".join(paragraphs)
     }
 
-@handle_exceptions
-def read_excel(path: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
+def _open_excel(path: str, sheet_name: Optional[str], columns: Optional[List[str]]) -> tuple:
     """
-    Đọc và phân tích file Excel (.xlsx, .xls)
+    Mở workbook ở chế độ read_only, chọn sheet và đọc dòng tiêu đề.
+    Trả về (norm_path, workbook, sheet, tên các cột, vị trí các cột được chọn).
     """
     norm_path = normalize_path(path)
     
@@ -58,96 +128,440 @@ def read_excel(path: str, sheet_name: Optional[str] = None) -> Dict[str, Any]:
         raise ValueError(f"File is not an Excel document: {path}")
     
     # Đọc file excel
+    import openpyxl
     workbook = openpyxl.load_workbook(norm_path, read_only=True, data_only=True)
+    try:
+        # Nếu không chỉ định sheet_name, lấy sheet đầu tiên
+        if sheet_name is None:
+            sheet_name = workbook.sheetnames[0]
+        elif sheet_name not in workbook.sheetnames:
+            raise HTTPException(status_code=400, detail=f"Sheet '{sheet_name}' not found in workbook")
+        sheet = workbook[sheet_name]
+        
+        # Dòng đầu tiên là tiêu đề; cột không có tiêu đề được đặt tên column_<n>
+        header_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        header = [str(value) if value is not None else f"column_{i + 1}" for i, value in enumerate(header_row)]
+        if columns:
+            missing = [column for column in columns if column not in header]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(missing)}")
+            selected = [header.index(column) for column in columns]
+        else:
+            selected = list(range(len(header)))
+    except BaseException:
+        workbook.close()
+        raise
+    return norm_path, workbook, sheet, header, selected
+
+def _iter_excel_rows(sheet, header: List[str], selected: List[int], offset: int,
+                     limit: Optional[int]) -> Iterator[Dict[str, Any]]:
+    # Đọc thẳng từ iter_rows (read_only) - bộ nhớ chỉ phụ thuộc số dòng đang giữ, không phụ thuộc kích thước sheet
+    min_row = 2 + offset
+    max_row = min_row + limit - 1 if limit is not None else None
+    if limit == 0:
+        return
+    for row in sheet.iter_rows(min_row=min_row, max_row=max_row, values_only=True):
+        yield {header[i]: (row[i] if i < len(row) else None) for i in selected}
+
+def _check_window(offset: int, limit: Optional[int]):
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="offset and limit must be non-negative")
+
+@handle_exceptions
+def read_excel(path: str, sheet_name: Optional[str] = None, offset: int = 0, limit: Optional[int] = None,
+               columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Đọc và phân tích file Excel (.xlsx, .xls), hỗ trợ phân trang (offset/limit) và chọn cột
+    """
+    _check_window(offset, limit)
+    norm_path, workbook, sheet, header, selected = _open_excel(path, sheet_name, columns)
+    try:
+        data = list(_iter_excel_rows(sheet, header, selected, offset, limit))
+        # max_row lấy từ dimension của sheet, có thể không có trong file
+        total_rows = sheet.max_row - 1 if sheet.max_row else None
+        if total_rows is None and limit is None:
+            total_rows = offset + len(data)
+        next_offset = offset + len(data)
+        return {
+            "path": norm_path,
+            "size": os.path.getsize(norm_path),
+            "sheet_names": workbook.sheetnames,
+            "current_sheet": sheet.title,
+            "columns": [header[i] for i in selected],
+            "data": data,
+            "shape": (total_rows, len(header)),
+            "offset": offset,
+            "count": len(data),
+            "next_offset": next_offset if limit is not None and len(data) == limit
+                           and (total_rows is None or next_offset < total_rows) else None
+        }
+    finally:
+        workbook.close()
+
+@handle_exceptions
+def stream_excel_rows(path: str, sheet_name: Optional[str] = None, offset: int = 0, limit: Optional[int] = None,
+                      columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Kiểm tra file/sheet/cột rồi trả về iterator các dòng (dict) đọc trực tiếp từ sheet.
+    Workbook được đóng khi iterator kết thúc hoặc bị đóng.
+    """
+    _check_window(offset, limit)
+    _, workbook, sheet, header, selected = _open_excel(path, sheet_name, columns)
+    
+    def rows():
+        try:
+            yield from _iter_excel_rows(sheet, header, selected, offset, limit)
+        finally:
+            workbook.close()
     
-    # Lấy danh sách sheet
-    sheet_names = workbook.sheetnames
+    return rows()
+
+def _open_pdf(path: str) -> tuple:
+    norm_path = normalize_path(path)
     
-    # Nếu không chỉ định sheet_name, lấy sheet đầu tiên
-    if sheet_name is None:
-        sheet_name = sheet_names[0]
-    elif sheet_name not in sheet_names:
-        raise ValueError(f"Sheet '{sheet_name}' not found in workbook")
+    if not os.path.exists(norm_path):
+        raise FileNotFoundError(f"File does not exist: {path}")
     
-    # Lấy dữ liệu từ sheet
-    sheet = workbook[sheet_name]
+    if not norm_path.lower().endswith('.pdf'):
+        raise ValueError(f"File is not a PDF document: {path}")
     
-    # Chuyển đổi sang dataframe
-    data = []
-    for row in sheet.iter_rows(values_only=True):
-        data.append(list(row))
+    from PyPDF2 import PdfReader
+    return norm_path, PdfReader(norm_path)
+
+def _pdf_info(pdf: "PdfReader") -> Dict[str, Any]:
+    info = pdf.metadata
+    if info is None:
+        return {"title": None, "author": None, "subject": None, "creator": None, "producer": None}
+    return {
+        "title": info.title,
+        "author": info.author,
+        "subject": info.subject,
+        "creator": info.creator,
+        "producer": info.producer
+    }
+
+def _pdf_page_range(num_pages: int, page_start: Optional[int], page_end: Optional[int]) -> tuple:
+    """
+    Chuẩn hóa khoảng trang (đánh số từ 1, gồm cả hai đầu); page_end vượt quá số trang được cắt bớt
+    """
+    start = page_start if page_start is not None else 1
+    end = page_end if page_end is not None else num_pages
+    if start < 1 or (page_end is not None and end < start):
+        raise HTTPException(status_code=400, detail=f"Invalid page range: {page_start}-{page_end}")
+    if start > max(num_pages, 1):
+        raise HTTPException(status_code=400, detail=f"page_start {start} exceeds number of pages ({num_pages})")
+    return start, min(end, num_pages)
+
+def _pdf_result(overview: Dict[str, Any], start: int, end: int, pages_text: List[str]) -> Dict[str, Any]:
+    return {
+        **overview,
+        "page_start": start,
+        "page_end": end,
+        "pages": pages_text,
+        "full_text": "\n".join(pages_text)
+    }
+
+@handle_exceptions
+def read_pdf(path: str, page_start: Optional[int] = None, page_end: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Đọc và phân tích file PDF (chỉ trích xuất các trang trong khoảng page_start..page_end nếu có)
+    """
+    norm_path, pdf = _open_pdf(path)
+    num_pages = len(pdf.pages)
+    start, end = _pdf_page_range(num_pages, page_start, page_end)
     
-    df = pd.DataFrame(data[1:], columns=data[0] if data else None)
+    # Lấy text từ từng trang trong khoảng
+    pages_text = []
+    for i in range(start - 1, end):
+        page = pdf.pages[i]
+        pages_text.append(page.extract_text())
     
+    overview = {
+        "path": norm_path,
+        "size": os.path.getsize(norm_path),
+        "info": _pdf_info(pdf),
+        "num_pages": num_pages
+    }
+    return _pdf_result(overview, start, end, pages_text)
+
+@handle_exceptions
+def get_pdf_overview(path: str) -> Dict[str, Any]:
+    """
+    Metadata và số trang của file PDF (không trích xuất text)
+    """
+    norm_path, pdf = _open_pdf(path)
     return {
         "path": norm_path,
         "size": os.path.getsize(norm_path),
-        "sheet_names": sheet_names,
-        "current_sheet": sheet_name,
-        "data": df.to_dict(orient="records"),
-        "shape": df.shape
+        "info": _pdf_info(pdf),
+        "num_pages": len(pdf.pages)
     }
 
+# PdfReader gần nhất của từng worker, dùng lại cho các lô trang kế tiếp của cùng file.
+# Mỗi thread giữ reader riêng: với CPU_POOL_KIND=thread nhiều lô chạy song song trong cùng process,
+# còn PdfReader không an toàn khi dùng chung giữa các thread
+_worker_pdf = threading.local()
+
+def _worker_pdf_reader(path: str) -> "PdfReader":
+    norm_path = normalize_path(path)
+    stat = os.stat(norm_path)
+    key = (norm_path, stat.st_size, stat.st_mtime_ns)
+    if getattr(_worker_pdf, "key", None) != key:
+        _worker_pdf.key, _worker_pdf.reader = None, None
+        _, reader = _open_pdf(norm_path)
+        # Duyệt cây trang một lần cho reader này
+        len(reader.pages)
+        _worker_pdf.key, _worker_pdf.reader = key, reader
+    return _worker_pdf.reader
+
+@handle_exceptions
+def extract_pdf_pages(path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """
+    Trích xuất text của các trang start..end (chạy trong process của pool cpu)
+    """
+    pdf = _worker_pdf_reader(path)
+    return [{"page": i + 1, "text": pdf.pages[i].extract_text()} for i in range(start - 1, end)]
+
+def _pdf_chunks(start: int, end: int) -> Iterator[tuple]:
+    # Các lô đầu nhỏ (1, 2, 4... trang) để trang đầu tiên về nhanh, sau đó tăng dần tới PDF_PAGES_PER_TASK
+    size = 1
+    while start <= end:
+        chunk_end = min(end, start + size - 1)
+        yield start, chunk_end
+        start = chunk_end + 1
+        size = min(size * 2, max(1, PDF_PAGES_PER_TASK))
+
+def _iter_pdf_pages(norm_path: str, start: int, end: int) -> Iterator[Dict[str, Any]]:
+    """
+    Chia khoảng trang thành các lô, trích xuất song song trên pool cpu và trả về từng trang
+    ngay khi lô của nó xong (không theo thứ tự trang)
+    """
+    pool = get_pool("cpu")
+    max_in_flight = pool.max_workers * 2
+    in_flight = set()
+    
+    def drain():
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            in_flight.discard(future)
+            yield from future.result()
+    
+    try:
+        for chunk_start, chunk_end in _pdf_chunks(start, end):
+            while True:
+                try:
+                    in_flight.add(pool.submit(extract_pdf_pages, norm_path, chunk_start, chunk_end))
+                    break
+                except HTTPException:
+                    # Pool đang bận - chờ bớt tác vụ của chính request này rồi thử lại
+                    if in_flight:
+                        yield from drain()
+                    else:
+                        time.sleep(0.05)
+            while len(in_flight) >= max_in_flight:
+                yield from drain()
+        while in_flight:
+            yield from drain()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+def _pdf_overview_and_range(path: str, page_start: Optional[int], page_end: Optional[int]) -> tuple:
+    overview = get_pool("cpu").submit(get_pdf_overview, path).result()
+    start, end = _pdf_page_range(overview["num_pages"], page_start, page_end)
+    return overview, start, end
+
+@handle_exceptions
+def read_pdf_parallel(path: str, page_start: Optional[int] = None, page_end: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Giống read_pdf nhưng trích xuất các khoảng trang song song trên nhiều process của pool cpu.
+    Gọi từ pool io (hàm này chỉ điều phối, không tự phân tích PDF).
+    """
+    overview, start, end = _pdf_overview_and_range(path, page_start, page_end)
+    texts = {item["page"]: item["text"] for item in _iter_pdf_pages(overview["path"], start, end)}
+    return _pdf_result(overview, start, end, [texts[page] for page in range(start, end + 1)])
+
 @handle_exceptions
-def read_pdf(path: str) -> Dict[str, Any]:
+def stream_pdf_pages(path: str, page_start: Optional[int] = None, page_end: Optional[int] = None) -> Iterator[Dict[str, Any]]:
     """
-    Đọc và phân tích file PDF
+    Kiểm tra file và khoảng trang, trả về iterator {"page", "text"} theo thứ tự trang hoàn thành.
+    Gọi từ pool io.
+    """
+    overview, start, end = _pdf_overview_and_range(path, page_start, page_end)
+    return _iter_pdf_pages(overview["path"], start, end)
+
+def _frame_records(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+    """
+    DataFrame -> list dict; NaN/NaT được đổi thành None để JSON hợp lệ
+    """
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def _open_csv(path: str, delimiter: str, columns: Optional[List[str]], engine: Optional[str]) -> tuple:
+    """
+    Kiểm tra file, engine và các cột được chọn. Trả về (norm_path, danh sách cột của file)
     """
     norm_path = normalize_path(path)
     
     if not os.path.exists(norm_path):
         raise FileNotFoundError(f"File does not exist: {path}")
     
-    if not norm_path.lower().endswith('.pdf'):
-        raise ValueError(f"File is not a PDF document: {path}")
+    if engine is not None and engine not in CSV_ENGINES:
+        raise HTTPException(status_code=400, detail=f"Invalid engine: {engine}. Allowed: {', '.join(CSV_ENGINES)}")
     
-    # Đọc file PDF
-    pdf = PdfReader(norm_path)
+    import pandas as pd
     
-    # Lấy thông tin cơ bản
-    info = pdf.metadata
-    num_pages = len(pdf.pages)
+    # Chỉ đọc dòng tiêu đề
+    header = pd.read_csv(norm_path, delimiter=delimiter, nrows=0).columns.tolist()
+    if columns:
+        missing = [column for column in columns if column not in header]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(missing)}")
+    return norm_path, header
+
+def _iter_arrow_frames(norm_path: str, delimiter: str, offset: int, limit: Optional[int],
+                       columns: Optional[List[str]]) -> Iterator["pd.DataFrame"]:
+    # Engine pyarrow của pandas không hỗ trợ nrows/chunksize nên đọc theo batch bằng pyarrow.csv
+    try:
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        raise HTTPException(status_code=400, detail="Engine 'pyarrow' requires the pyarrow package")
     
-    # Lấy text từ từng trang
-    pages_text = []
-    for i in range(num_pages):
-        page = pdf.pages[i]
-        pages_text.append(page.extract_text())
+    reader = pa_csv.open_csv(
+        norm_path,
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(include_columns=columns) if columns else None
+    )
+    skip, remaining = offset, limit
+    for batch in reader:
+        if remaining == 0:
+            break
+        if skip >= batch.num_rows:
+            skip -= batch.num_rows
+            continue
+        if skip:
+            batch = batch.slice(skip)
+            skip = 0
+        if remaining is not None:
+            batch = batch.slice(0, remaining)
+            remaining -= batch.num_rows
+        yield batch.to_pandas()
+
+def _iter_csv_frames(norm_path: str, header: List[str], delimiter: str, offset: int, limit: Optional[int],
+                     columns: Optional[List[str]], engine: Optional[str], chunksize: Optional[int]) -> Iterator["pd.DataFrame"]:
+    """
+    Đọc cửa sổ dòng [offset, offset + limit) theo từng khối tối đa chunksize dòng
+    """
+    if columns:
+        # Giữ thứ tự cột như trong file cho mọi engine
+        columns = [column for column in header if column in columns]
+    if engine == "pyarrow":
+        yield from _iter_arrow_frames(norm_path, delimiter, offset, limit, columns)
+        return
+    if limit == 0:
+        return
+    
+    kwargs = {"delimiter": delimiter, "usecols": columns or None, "engine": engine or "c",
+              "chunksize": chunksize or CSV_CHUNK_ROWS}
+    if offset:
+        # Bỏ qua dòng tiêu đề và offset dòng dữ liệu, dùng lại tên cột đã đọc
+        kwargs.update(skiprows=offset + 1, header=None, names=header)
+    if limit is not None:
+        kwargs["nrows"] = limit
+    import pandas as pd
+    with pd.read_csv(norm_path, **kwargs) as reader:
+        yield from reader
+
+@handle_exceptions
+def read_csv(path: str, delimiter: str = ",", offset: int = 0, limit: Optional[int] = None,
+             columns: Optional[List[str]] = None, engine: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Đọc và phân tích file CSV, hỗ trợ cửa sổ dòng (offset/limit), chọn cột và engine pyarrow
+    """
+    _check_window(offset, limit)
+    norm_path, header = _open_csv(path, delimiter, columns, engine)
+    
+    data = []
+    for frame in _iter_csv_frames(norm_path, header, delimiter, offset, limit, columns, engine, None):
+        data.extend(_frame_records(frame))
     
+    selected = [column for column in header if column in columns] if columns else header
     return {
         "path": norm_path,
         "size": os.path.getsize(norm_path),
-        "info": {
-            "title": info.title,
-            "author": info.author,
-            "subject": info.subject,
-            "creator": info.creator,
-            "producer": info.producer
-        },
-        "num_pages": num_pages,
-        "pages": pages_text,
-        "full_text": "\n".join(pages_text)
+        "columns": selected,
+        "data": data,
+        "shape": (len(data), len(selected)),
+        "offset": offset,
+        "count": len(data),
+        "next_offset": offset + len(data) if limit is not None and len(data) == limit else None
     }
 
 @handle_exceptions
-def read_csv(path: str, delimiter: str = ",") -> Dict[str, Any]:
+def stream_csv_rows(path: str, delimiter: str = ",", offset: int = 0, limit: Optional[int] = None,
+                    columns: Optional[List[str]] = None, engine: Optional[str] = None,
+                    chunksize: Optional[int] = None) -> Iterator[Dict[str, Any]]:
     """
-    Đọc và phân tích file CSV
+    Kiểm tra file/cột rồi trả về iterator các dòng (dict), đọc từng khối chunksize dòng
+    nên bộ nhớ không phụ thuộc kích thước file
     """
-    norm_path = normalize_path(path)
+    _check_window(offset, limit)
+    if chunksize is not None and chunksize <= 0:
+        raise HTTPException(status_code=400, detail="chunksize must be positive")
+    norm_path, header = _open_csv(path, delimiter, columns, engine)
     
-    if not os.path.exists(norm_path):
-        raise FileNotFoundError(f"File does not exist: {path}")
+    def rows():
+        for frame in _iter_csv_frames(norm_path, header, delimiter, offset, limit, columns, engine, chunksize):
+            yield from _frame_records(frame)
+    
+    return rows()
+
+def _merge_dtype(current, dtype):
+    # Kiểu chung của một cột qua các khối: numeric gộp theo numpy, khác loại thì là object
+    import numpy as np
+    import pandas as pd
+    if current is None or current == dtype:
+        return dtype
+    if pd.api.types.is_numeric_dtype(current) and pd.api.types.is_numeric_dtype(dtype):
+        try:
+            return np.result_type(current, dtype)
+        except TypeError:
+            pass
+    return np.dtype(object)
+
+@handle_exceptions
+def profile_csv(path: str, delimiter: str = ",", columns: Optional[List[str]] = None,
+                engine: Optional[str] = None, sample_rows: int = 5) -> Dict[str, Any]:
+    """
+    Hồ sơ file CSV trong một lượt đọc theo khối: số dòng/cột, kiểu dữ liệu, số giá trị rỗng
+    và vài dòng đầu - không giữ toàn bộ dữ liệu trong bộ nhớ
+    """
+    norm_path, header = _open_csv(path, delimiter, columns, engine)
+    selected = [column for column in header if column in columns] if columns else header
     
-    # Đọc file CSV với pandas
-    df = pd.read_csv(norm_path, delimiter=delimiter)
+    rows = 0
+    dtypes = {column: None for column in selected}
+    null_counts = {column: 0 for column in selected}
+    head: List[Dict[str, Any]] = []
+    for frame in _iter_csv_frames(norm_path, header, delimiter, 0, None, columns, engine, None):
+        rows += len(frame)
+        nulls = frame.isna().sum()
+        for column in selected:
+            series = frame[column]
+            null_counts[column] += int(nulls[column])
+            # Bỏ qua khối toàn giá trị rỗng khi suy ra kiểu
+            if not series.isna().all():
+                dtypes[column] = _merge_dtype(dtypes[column], series.dtype)
+        if len(head) < sample_rows:
+            head.extend(_frame_records(frame.head(sample_rows - len(head))))
     
     return {
         "path": norm_path,
         "size": os.path.getsize(norm_path),
-        "columns": df.columns.tolist(),
-        "data": df.to_dict(orient="records"),
-        "shape": df.shape
+        "columns": selected,
+        "shape": (rows, len(selected)),
+        "dtypes": {column: str(dtype) if dtype is not None else "object" for column, dtype in dtypes.items()},
+        "null_counts": null_counts,
+        "head": head
     }
 
 @handle_exceptions
@@ -0,0 +1,432 @@
+import os
+import time
+import uuid
+import queue
+import shlex
+import shutil
+import signal
+import threading
+import subprocess
+from typing import Dict, Any, List, Optional
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.common import normalize_path, handle_exceptions, logger
+from app.utils import metrics
+from app.services.exec_service import SPAWN_SECONDS, DURATION_SECONDS, command_outcome
+
+# Load biến môi trường
+load_dotenv()
+SHELL_TIMEOUT = int(os.getenv("SHELL_TIMEOUT", "60"))
+SESSION_MAX = int(os.getenv("EXEC_SESSION_MAX", "16"))  # Số session tối đa cùng lúc
+SESSION_IDLE_TIMEOUT = float(os.getenv("EXEC_SESSION_IDLE_TIMEOUT", "600"))  # Giây không dùng trước khi bị đóng
+SESSION_MAX_OUTPUT = int(os.getenv("EXEC_SESSION_MAX_OUTPUT", str(10 * 1024 * 1024)))  # Byte tối đa giữ lại mỗi stream
+
+READ_CHUNK = 64 * 1024
+
+# Bọc lệnh để chạy trong shell hiện tại (giữ cd/export) với stdin là /dev/null,
+# sau đó in dấu kết thúc kèm mã thoát và thư mục hiện tại lên stdout, và dấu kết thúc lên stderr.
+# Lệnh được truyền cho eval dưới dạng một chuỗi đã quote: lỗi cú pháp (ví dụ thiếu dấu nháy) chỉ làm eval
+# trả về mã khác 0 thay vì nuốt phần còn lại của khung; "command" giữ cho sh/dash không thoát vì lỗi đó
+POSIX_FRAME = """{{ command eval {command}
+}} < /dev/null
+__ro_rc=$?
+printf '%s%d:%s\\n' '{marker}' "$__ro_rc" "$PWD"
+printf '%s\\n' '{marker}' >&2
+"""
+
+POWERSHELL_FRAME = """$global:LASTEXITCODE = 0; $__ro_ok = $true
+try {{ {command}
+}} catch {{ $__ro_ok = $false; [Console]::Error.WriteLine($_) }}
+$__ro_rc = if ($LASTEXITCODE) {{ $LASTEXITCODE }} elseif ($__ro_ok) {{ 0 }} else {{ 1 }}
+[Console]::Out.Write('{marker}' + $__ro_rc + ':' + (Get-Location).Path + "`n"); [Console]::Out.Flush()
+[Console]::Error.Write('{marker}' + "`n"); [Console]::Error.Flush()
+
+"""
+
+def _shell_argv(shell_type: Optional[str]) -> tuple:
+    """
+    Trả về (loại shell, argv) cho process shell chạy lâu dài.
+    Không nạp profile/rc để khởi động nhanh và có môi trường ổn định.
+    """
+    if shell_type is None:
+        shell_type = "powershell" if os.name == "nt" else "bash"
+    if shell_type == "bash":
+        bash = shutil.which("bash")
+        if bash:
+            return "bash", [bash, "--noprofile", "--norc"]
+        return "sh", ["/bin/sh"]
+    if shell_type == "sh":
+        return "sh", ["/bin/sh"]
+    if shell_type == "powershell":
+        powershell = shutil.which("pwsh") or shutil.which("powershell")
+        if not powershell:
+            raise HTTPException(status_code=400, detail="PowerShell is not available on this system")
+        return "powershell", [powershell, "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"]
+    raise HTTPException(status_code=400, detail=f"Unsupported session shell: {shell_type}. Allowed: bash, sh, powershell")
+
+class _FramedOutput:
+    """
+    Gom output của một stream cho tới khi gặp dấu kết thúc; chỉ giữ tối đa max_output byte
+    """
+
+    def __init__(self, marker: bytes, max_output: int):
+        self.marker = marker
+        self.max_output = max_output
+        self.data = bytearray()
+        self.pending = bytearray()
+        self.total = 0
+        self.truncated = False
+        self.trailer: Optional[bytes] = None
+
+    def _keep(self, chunk: bytes):
+        self.total += len(chunk)
+        room = self.max_output - len(self.data)
+        if len(chunk) > room:
+            self.truncated = True
+            chunk = chunk[:max(0, room)]
+        self.data += chunk
+
+    def feed(self, chunk: bytes) -> bool:
+        self.pending += chunk
+        index = self.pending.find(self.marker)
+        if index >= 0:
+            end = self.pending.find(b"\n", index)
+            if end < 0:
+                return False
+            self._keep(self.pending[:index])
+            self.trailer = bytes(self.pending[index + len(self.marker):end])
+            self.pending = bytearray()
+            return True
+        # Giữ lại phần cuối có thể là đầu của dấu kết thúc
+        keep = len(self.marker) - 1
+        if len(self.pending) > keep:
+            self._keep(self.pending[:-keep])
+            del self.pending[:-keep]
+        return False
+
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+class ShellSession:
+    """
+    Một process shell chạy lâu dài. Lệnh được ghi vào stdin và output được đọc tới dấu kết thúc,
+    nên thư mục hiện tại và biến môi trường được giữ giữa các lệnh.
+    Mỗi lúc chỉ chạy một lệnh trong một session.
+    """
+
+    def __init__(self, shell_type: Optional[str], cwd: Optional[str], env: Optional[Dict[str, str]]):
+        self.shell, argv = _shell_argv(shell_type)
+        self.id = uuid.uuid4().hex
+        self.created = time.time()
+        self.last_used = self.created
+        self.commands = 0
+        self.cwd = cwd or os.getcwd()
+        self._lock = threading.Lock()
+        self._chunks: "queue.Queue[tuple]" = queue.Queue()
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            argv, cwd=self.cwd, env={**os.environ, **(env or {})},
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=os.name == "posix"
+        )
+        SPAWN_SECONDS.observe(time.perf_counter() - started, kind="session")
+        for name, stream in (("stdout", self.process.stdout), ("stderr", self.process.stderr)):
+            threading.Thread(target=self._pump, args=(name, stream), name=f"session-{name}", daemon=True).start()
+
+    def _pump(self, name: str, stream):
+        # Đọc output của shell vào hàng đợi; None báo stream đã đóng (shell đã thoát)
+        try:
+            while True:
+                chunk = stream.read1(READ_CHUNK) if hasattr(stream, "read1") else stream.read(READ_CHUNK)
+                if not chunk:
+                    break
+                self._chunks.put((name, chunk))
+        except (OSError, ValueError):
+            pass
+        self._chunks.put((name, None))
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "shell": self.shell,
+            "pid": self.process.pid,
+            "cwd": self.cwd,
+            "alive": self.alive,
+            "busy": self.busy,
+            "commands": self.commands,
+            "created": self.created,
+            "last_used": self.last_used
+        }
+
+    def run(self, command: str, timeout: Optional[float] = None, max_output: int = SESSION_MAX_OUTPUT) -> Dict[str, Any]:
+        """
+        Chạy lệnh trong session. Hết thời gian hoặc shell thoát thì session bị đóng
+        (closed=true trong kết quả) vì không còn biết trạng thái của shell.
+        """
+        timeout = SHELL_TIMEOUT if timeout is None else timeout
+        if not self._lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail=f"Session is busy: {self.id}")
+        try:
+            return self._run(command, timeout, max_output)
+        finally:
+            self.last_used = time.time()
+            self._lock.release()
+
+    def _run(self, command: str, timeout: float, max_output: int) -> Dict[str, Any]:
+        if not self.alive:
+            raise HTTPException(status_code=410, detail=f"Session has exited: {self.id}")
+        marker = f"__REMOTE_OPS_{uuid.uuid4().hex}__"
+        if self.shell == "powershell":
+            script = POWERSHELL_FRAME.format(command=command, marker=marker)
+        else:
+            script = POSIX_FRAME.format(command=shlex.quote(command), marker=marker)
+        outputs = {
+            "stdout": _FramedOutput(marker.encode(), max_output),
+            "stderr": _FramedOutput(marker.encode(), max_output)
+        }
+        started = time.monotonic()
+        timed_out = closed = False
+        try:
+            self.process.stdin.write(script.encode("utf-8"))
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            closed = True
+
+        done = {"stdout": False, "stderr": False}
+        deadline = started + timeout
+        while not closed and not all(done.values()):
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise queue.Empty
+                name, chunk = self._chunks.get(timeout=remaining)
+            except queue.Empty:
+                timed_out = True
+                logger.error(f"Session command timed out after {timeout} seconds: {command}")
+                break
+            if chunk is None:
+                closed = True
+                break
+            if not done[name]:
+                done[name] = outputs[name].feed(chunk)
+
+        return_code = -1
+        trailer = outputs["stdout"].trailer
+        if trailer is not None:
+            rc, _, cwd = trailer.decode("utf-8", errors="replace").partition(":")
+            return_code = int(rc) if rc.lstrip("-").isdigit() else -1
+            self.cwd = cwd.strip() or self.cwd
+        if timed_out or closed:
+            # Lệnh còn chạy hoặc shell đã thoát (ví dụ lệnh 'exit') - đóng hẳn session
+            self.close()
+            if closed:
+                return_code = self.process.returncode
+        self.commands += 1
+
+        stderr = outputs["stderr"].text()
+        if timed_out:
+            stderr += f"Command execution timed out after {timeout} seconds"
+        duration = time.monotonic() - started
+        DURATION_SECONDS.observe(duration, kind="session", outcome=command_outcome(return_code, timed_out))
+        return {
+            "session_id": self.id,
+            "command": command,
+            "return_code": -1 if timed_out else return_code,
+            "stdout": outputs["stdout"].text(),
+            "stderr": stderr,
+            "success": not timed_out and return_code == 0,
+            "timed_out": timed_out,
+            "truncated": outputs["stdout"].truncated or outputs["stderr"].truncated,
+            "cwd": self.cwd,
+            "closed": timed_out or closed,
+            "duration": round(duration, 4)
+        }
+
+    def close(self):
+        # Dừng cả nhóm process (shell và các process con) trên Unix
+        if self.alive:
+            try:
+                if os.name == "posix":
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+            except (ProcessLookupError, PermissionError):
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                stream.close()
+            except (OSError, ValueError):
+                pass
+
+class SessionPool:
+    """
+    Quản lý các session theo id; session không dùng quá idle_timeout giây bị đóng bởi thread dọn dẹp
+    """
+
+    def __init__(self, max_sessions: int, idle_timeout: float):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, ShellSession] = {}
+        self._evicted = 0
+        self._stop = threading.Event()
+        self._reaper = None
+
+    def _start_reaper(self):
+        if self._reaper is None and self.idle_timeout > 0:
+            self._stop.clear()
+            self._reaper = threading.Thread(target=self._reap_loop, name="session-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = min(30.0, max(1.0, self.idle_timeout / 4))
+        while not self._stop.wait(interval):
+            self.evict_idle()
+
+    def evict_idle(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [
+                session for session in self._sessions.values()
+                if not session.busy and (not session.alive or now - session.last_used > self.idle_timeout)
+            ]
+            for session in expired:
+                self._sessions.pop(session.id, None)
+            self._evicted += len(expired)
+        for session in expired:
+            logger.info(f"Closing idle shell session {session.id}")
+            session.close()
+        return len(expired)
+
+    def create(self, shell_type: Optional[str], cwd: Optional[str], env: Optional[Dict[str, str]]) -> ShellSession:
+        self.evict_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise HTTPException(status_code=503,
+                                    detail=f"Too many shell sessions (max {self.max_sessions}), close one and try again")
+            session = ShellSession(shell_type, cwd, env)
+            self._sessions[session.id] = session
+            self._start_reaper()
+        return session
+
+    def get(self, session_id: str) -> ShellSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+        return session
+
+    def run(self, session_id: str, command: str, timeout: Optional[float]) -> Dict[str, Any]:
+        session = self.get(session_id)
+        result = session.run(command, timeout)
+        if result["closed"]:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+        return result
+
+    def close(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Session not found: {session_id}")
+        session.close()
+        return session.info()
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [session.info() for session in sessions]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_timeout": self.idle_timeout,
+                "evicted": self._evicted
+            }
+
+    def close_all(self):
+        self._stop.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._reaper = None
+        for session in sessions:
+            session.close()
+
+_pool: Optional[SessionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> SessionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool(SESSION_MAX, SESSION_IDLE_TIMEOUT)
+        return _pool
+
+def close_all():
+    """
+    Đóng tất cả session (gọi khi tắt server)
+    """
+    if _pool is not None:
+        _pool.close_all()
+
+@handle_exceptions
+def create_session(shell_type: Optional[str] = None, cwd: Optional[str] = None,
+                   env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Mở một shell session mới (bash/sh hoặc powershell) với thư mục làm việc và biến môi trường tùy chọn
+    """
+    if cwd is not None:
+        cwd = normalize_path(cwd)
+        if not os.path.isdir(cwd):
+            raise FileNotFoundError(f"Directory does not exist: {cwd}")
+    session = get_pool().create(shell_type, cwd, env)
+    logger.info(f"Opened {session.shell} session {session.id} (pid {session.process.pid})")
+    return session.info()
+
+@handle_exceptions
+def run_in_session(session_id: str, command: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Chạy lệnh trong session đã mở, trả về kết quả giống execute_command kèm cwd và duration
+    """
+    logger.info(f"Executing command in session {session_id}: {command}")
+    return get_pool().run(session_id, command, timeout)
+
+@handle_exceptions
+def get_session(session_id: str) -> Dict[str, Any]:
+    return get_pool().get(session_id).info()
+
+@handle_exceptions
+def list_sessions() -> Dict[str, Any]:
+    pool = get_pool()
+    return {**pool.stats(), "items": pool.list()}
+
+@handle_exceptions
+def close_session(session_id: str) -> Dict[str, Any]:
+    return get_pool().close(session_id)
+
+def _collect_session_metrics() -> list:
+    if _pool is None:
+        return []
+    data = _pool.stats()
+    return [
+        ("exec_sessions_open", "gauge", "Open persistent shell sessions", [({}, data["sessions"])]),
+        ("exec_sessions_max", "gauge", "Maximum number of shell sessions", [({}, data["max_sessions"])]),
+        ("exec_sessions_evicted_total", "counter", "Sessions closed by the idle reaper", [({}, data["evicted"])]),
+    ]
+
+metrics.register_collector(_collect_session_metrics)
\ No newline at end of file
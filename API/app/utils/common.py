@@ -1,9 +1,22 @@
 import os
+import json
+import stat
+import queue
+import threading
 import pathlib
-from typing import Union, Dict, Any
+import functools
+from typing import Union, Dict, Any, Iterable, Iterator, Callable
 from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 import logging
 from dotenv import load_dotenv
+from app.utils import profiling
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn, thiếu thì dùng json của thư viện chuẩn
+    orjson = None
 
 # Cấu hình logging
 logging.basicConfig(
@@ -17,6 +30,54 @@ load_dotenv()
 BASE_PATH = os.getenv("BASE_PATH", "/")
 DISABLE_PATH_SECURITY = os.getenv("DISABLE_PATH_SECURITY", "false").lower() == "true"
 
+def _default_state_dir() -> str:
+    if os.name == "nt":
+        base = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.getenv("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "remote-ops")
+
+# Thư mục chứa dữ liệu nội bộ của server (phiên upload, chỉ mục, cache, job...), riêng cho user chạy server
+STATE_DIR = os.getenv("STATE_DIR", _default_state_dir())
+
+def ensure_private_dir(path: str) -> str:
+    """
+    Tạo thư mục với quyền 0700 và kiểm tra nó thuộc user đang chạy server, không ai khác ghi được.
+    Server tin dữ liệu trong các thư mục này (đường dẫn đích của upload, lệnh của job...), nên thư mục
+    do user khác tạo sẵn (ví dụ trong /tmp) hoặc symlink bị từ chối bằng PermissionError.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"State directory is not a directory: {path}")
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"State directory is owned by another user: {path}")
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(f"State directory is writable by other users: {path}")
+        if info.st_mode & 0o077:
+            os.chmod(path, 0o700)
+    return path
+
+def ensure_private_file(path: str) -> str:
+    """
+    Kiểm tra file dữ liệu nội bộ (ví dụ database SQLite) nằm trong thư mục riêng, nếu đã tồn tại thì phải là
+    file thường thuộc user đang chạy server và không ai khác ghi được
+    """
+    ensure_private_dir(os.path.dirname(os.path.abspath(path)))
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return path
+    if not stat.S_ISREG(info.st_mode):
+        raise PermissionError(f"State file is not a regular file: {path}")
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"State file is owned by another user: {path}")
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(f"State file is writable by other users: {path}")
+    return path
+
 def normalize_path(path: str) -> str:
     """
     Chuẩn hóa đường dẫn và đảm bảo nằm trong BASE_PATH
@@ -43,10 +104,15 @@ def normalize_path(path: str) -> str:
 
 def handle_exceptions(func):
     """
-    Decorator để xử lý các ngoại lệ chung
+    Decorator để xử lý các ngoại lệ chung.
+    Nếu request hiện tại bật profiling (X-Profile), service được chạy dưới profiler.
     """
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
+            profile = profiling.current()
+            if profile is not None:
+                return profiling.run(profile, func, args, kwargs)
             return func(*args, **kwargs)
         except HTTPException:
             # Truyền qua HTTPException
@@ -63,9 +129,42 @@ def handle_exceptions(func):
     
     return wrapper
 
-def create_response(status: bool, message: str, data: Any = None) -> Dict[str, Any]:
+def _json_default(value: Any) -> Any:
+    # datetime/date/time theo ISO 8601 giống response JSON của FastAPI, các kiểu khác dùng str()
+    isoformat = getattr(value, "isoformat", None)
+    return isoformat() if isoformat is not None else str(value)
+
+def _response_default(value: Any) -> Any:
+    # Kiểu orjson không tự mã hóa được (Path, Decimal, set, model pydantic...) - xử lý như FastAPI
+    return jsonable_encoder(value)
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+def json_bytes(value: Any, default: Callable[[Any], Any] = _json_default) -> bytes:
     """
-    Tạo response chuẩn cho API
+    Mã hóa JSON (UTF-8, không escape ký tự ngoài ASCII) bằng orjson nếu có.
+    Dữ liệu không orjson hỗ trợ (ví dụ số nguyên quá 64 bit) được mã hóa lại bằng json của thư viện chuẩn.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=default, option=_ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            pass
+    return json.dumps(value, ensure_ascii=False, default=default, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse mã hóa thẳng bằng orjson. Dữ liệu của service đã là dict/list/kiểu cơ bản
+    nên không cần duyệt lại toàn bộ bằng jsonable_encoder; chỉ các giá trị lạ mới đi qua nó.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_bytes(content, _response_default)
+
+def create_response(status: bool, message: str, data: Any = None) -> FastJSONResponse:
+    """
+    Tạo response chuẩn cho API.
+    Trả về FastJSONResponse để FastAPI không chạy jsonable_encoder trên data (chậm với kết quả lớn).
     """
     response = {
         "success": status,
@@ -75,4 +174,62 @@ def create_response(status: bool, message: str, data: Any = None) -> Dict[str, A
     if data is not None:
         response["data"] = data
         
-    return response 
\ No newline at end of file
+    return FastJSONResponse(response)
+
+def iter_ndjson(items: Iterable[Any], max_chunk_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Chuyển iterator các object thành luồng NDJSON (mỗi dòng một JSON) để stream cho client.
+    Iterator nguồn chạy trên một thread riêng; các dòng đã sẵn sàng được gom thành một chunk
+    để tránh mỗi dòng phải chuyển thread một lần khi stream.
+    """
+    lines = queue.Queue(maxsize=1024)
+    stop = threading.Event()
+    end = object()
+    
+    def put(value) -> bool:
+        while not stop.is_set():
+            try:
+                lines.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in items:
+                if not put(json_bytes(item) + b"\n"):
+                    break
+            put(end)
+        except BaseException as e:
+            put(e)
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+    
+    threading.Thread(target=produce, name="ndjson-producer", daemon=True).start()
+    try:
+        while True:
+            value = lines.get()
+            chunk, size = [], 0
+            while True:
+                if value is end:
+                    if chunk:
+                        yield b"".join(chunk)
+                    return
+                if isinstance(value, BaseException):
+                    if chunk:
+                        yield b"".join(chunk)
+                    raise value
+                chunk.append(value)
+                size += len(value)
+                if size >= max_chunk_bytes:
+                    break
+                try:
+                    value = lines.get_nowait()
+                except queue.Empty:
+                    break
+            yield b"".join(chunk)
+    finally:
+        stop.set()
\ No newline at end of file
@@ -0,0 +1,190 @@
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.dispatch import run_in_pool
+
+try:
+    import zstandard
+except ImportError:  # zstd là tùy chọn (pip install zstandard)
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # brotli là tùy chọn (pip install brotli)
+    brotli = None
+
+# Load biến môi trường
+load_dotenv()
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Body nhỏ hơn ngưỡng này (byte) không nén
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_OFFLOAD_SIZE = int(os.getenv("COMPRESSION_OFFLOAD_SIZE", str(256 * 1024)))  # Chunk lớn hơn được nén trên pool io
+
+# Loại nội dung đáng nén; file tải về, ảnh, Parquet... đã nén sẵn hoặc cần giữ Range nên bỏ qua
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "application/yaml",
+    "application/vnd.apache.arrow.stream",
+)
+
+class _GzipEncoder:
+    def __init__(self):
+        # wbits=31: định dạng gzip (header + CRC) thay vì zlib
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+def available_encodings() -> List[str]:
+    """
+    Các encoding hỗ trợ theo thứ tự ưu tiên của server (zstd nhanh nhất với cùng tỉ lệ nén)
+    """
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+_ENCODERS = {"gzip": _GzipEncoder, "zstd": _ZstdEncoder, "br": _BrotliEncoder}
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Chọn encoding từ header Accept-Encoding: q cao nhất trước, bằng nhau thì theo ưu tiên của server.
+    q=0 là từ chối; "*" áp dụng cho các encoding không được nêu tên. None nếu không nén.
+    """
+    if not accept_encoding:
+        return None
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        name = parts[0].lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+
+    candidates: List[Tuple[float, int, str]] = []
+    for position, encoding in enumerate(available_encodings()):
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > 0:
+            candidates.append((-quality, position, encoding))
+    return min(candidates)[2] if candidates else None
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (media_type.startswith(COMPRESSIBLE_TYPES)
+            or media_type.endswith("+json") or media_type.endswith("+xml"))
+
+class CompressionMiddleware:
+    """
+    ASGI middleware nén response theo Accept-Encoding (zstd, br, gzip).
+    - Response thường: nén cả body nếu không nhỏ hơn COMPRESSION_MIN_SIZE, cập nhật Content-Length.
+    - StreamingResponse (NDJSON, SSE...): nén từng chunk và flush ngay nên client vẫn nhận dữ liệu theo thời gian thực.
+    Bỏ qua HEAD, 204/206/304, response đã có Content-Encoding và response hỗ trợ Range (tải file).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "encoder": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Giữ lại header cho tới khi biết body đầu tiên (kích thước, có stream hay không)
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            start = state["start"]
+            if start is not None:
+                state["start"] = None
+                headers = [(name.lower(), value) for name, value in start.get("headers", [])]
+                header_names = {name for name, _ in headers}
+                content_type = next((value.decode("latin-1") for name, value in headers if name == b"content-type"), None)
+                if (start["status"] < 200 or start["status"] in (204, 206, 304)
+                        or header_names & {b"content-encoding", b"content-range", b"accept-ranges"}
+                        or not is_compressible(content_type)
+                        or (not more_body and len(body) < COMPRESSION_MIN_SIZE)):
+                    state["passthrough"] = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                state["encoder"] = _ENCODERS[encoding]()
+                body = await _compress(state["encoder"], body, not more_body)
+                headers = [(name, value) for name, value in headers if name != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                if not any(name == b"vary" and b"accept-encoding" in value.lower() for name, value in headers):
+                    headers.append((b"vary", b"Accept-Encoding"))
+                if not more_body:
+                    headers.append((b"content-length", str(len(body)).encode()))
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            await send({"type": "http.response.body", "body": await _compress(state["encoder"], body, not more_body),
+                        "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+async def _compress(encoder, data: bytes, final: bool) -> bytes:
+    # Chunk lớn được nén trên pool io để không chặn event loop; pool đầy (503) thì nén tại chỗ
+    if len(data) >= COMPRESSION_OFFLOAD_SIZE:
+        try:
+            return await run_in_pool("io", encoder.compress, data, final)
+        except HTTPException:
+            pass
+    return encoder.compress(data, final)
\ No newline at end of file
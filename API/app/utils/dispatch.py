@@ -0,0 +1,285 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from dotenv import load_dotenv
+from app.utils.common import logger
+from app.utils import metrics, profiling
+
+# Load biến môi trường
+load_dotenv()
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Cấu hình mặc định cho từng pool:
+# - io: đọc/ghi file, liệt kê thư mục (chủ yếu chờ I/O)
+# - cpu: phân tích tài liệu (PDF, Excel, CSV...) - chạy trên nhiều process để tận dụng nhiều core
+# - exec: chờ subprocess (lệnh shell) kết thúc
+# Pool io/exec nhận generator, file đang mở, đối tượng nén... (không pickle được) nên chỉ chạy được bằng thread
+DEFAULT_POOLS = {
+    "io": {"kind": "thread", "kinds": ("thread",), "workers": min(32, CPU_COUNT * 4), "max_queue": 1000},
+    "cpu": {"kind": "process", "kinds": ("thread", "process"), "workers": CPU_COUNT, "max_queue": 100},
+    "exec": {"kind": "thread", "kinds": ("thread",), "workers": 16, "max_queue": 200},
+}
+
+# Module được import sẵn trong process forkserver; các process worker được fork từ đó nên không phải import lại
+_process_preload: List[str] = []
+
+def set_process_preload(modules: List[str]):
+    """
+    Đặt danh sách module import sẵn cho các pool process (gọi trước khi pool được tạo)
+    """
+    _process_preload[:] = modules
+
+POOL_WAIT = metrics.histogram("pool_wait_seconds", "Time a task waited in the worker pool queue", ("pool",))
+POOL_TASK = metrics.histogram("pool_task_seconds", "Run time of a task inside a pool worker", ("pool", "task"))
+
+def _pool_setting(name: str, key: str, default: Any) -> Any:
+    """
+    Đọc cấu hình pool từ biến môi trường, ví dụ CPU_POOL_WORKERS, IO_POOL_KIND
+    """
+    value = os.getenv(f"{name.upper()}_POOL_{key.upper()}")
+    if value is None:
+        return default
+    return value.lower() if isinstance(default, str) else int(value)
+
+def _pool_config(name: str) -> Dict[str, Any]:
+    """
+    Cấu hình của pool (mặc định + biến môi trường); loại pool không hỗ trợ cho pool này thì báo lỗi
+    """
+    if name not in DEFAULT_POOLS:
+        raise ValueError(f"Unknown worker pool: {name}")
+    defaults = DEFAULT_POOLS[name]
+    kind = _pool_setting(name, "kind", defaults["kind"])
+    if kind not in defaults["kinds"]:
+        raise ValueError(f"Unsupported {name.upper()}_POOL_KIND: {kind}. Allowed: {', '.join(defaults['kinds'])}")
+    return {
+        "kind": kind,
+        "workers": _pool_setting(name, "workers", defaults["workers"]),
+        "max_queue": _pool_setting(name, "max_queue", defaults["max_queue"])
+    }
+
+def check_pool_config():
+    """
+    Kiểm tra cấu hình của mọi pool (gọi khi server khởi động để báo lỗi cấu hình ngay)
+    """
+    for name in DEFAULT_POOLS:
+        _pool_config(name)
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict, profile_mode: Optional[str] = None) -> tuple:
+    """
+    Chạy hàm trong worker và ghi lại thời điểm bắt đầu/kết thúc.
+    HTTPException không pickle được nên được chuyển thành tuple để trả về từ process con.
+    Contextvar không đi theo tác vụ sang thread/process của pool nên chế độ profiling được truyền tường minh;
+    profile thu được trong worker được trả về cùng kết quả để gộp vào profile của request.
+    """
+    profile = token = None
+    if profile_mode is not None:
+        profile = profiling.Profile(profile_mode)
+        token = profiling.activate(profile)
+    started_at = time.time()
+    try:
+        result = func(*args, **kwargs)
+    except HTTPException as e:
+        return started_at, time.time(), False, (e.status_code, e.detail), profile and profile.export()
+    finally:
+        if token is not None:
+            profiling.deactivate(token)
+    return started_at, time.time(), True, result, profile and profile.export()
+
+class WorkerPool:
+    """
+    Pool giới hạn (thread hoặc process) kèm thống kê độ sâu hàng đợi và thời gian chờ
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported pool kind for '{name}': {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_queue_depth = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                if context.get_start_method() == "forkserver" and _process_preload:
+                    context.set_forkserver_preload(list(_process_preload))
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=f"{self.name}-pool")
+        return self._executor
+
+    def _queue_depth(self) -> int:
+        return max(0, self._in_flight - self.max_workers)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Đưa hàm vào pool, trả về concurrent.futures.Future.
+        Từ chối (503) nếu hàng đợi đã đầy.
+        """
+        outer = Future()
+        profile = profiling.current()
+        call_args = (_timed_call, func, args, kwargs, profile.mode if profile is not None else None)
+        with self._lock:
+            if self._queue_depth() >= self.max_queue:
+                self._rejected += 1
+                logger.warning(f"Pool '{self.name}' is saturated, rejecting task")
+                raise HTTPException(status_code=503, detail=f"Worker pool '{self.name}' is busy, try again later")
+            self._in_flight += 1
+            self._submitted += 1
+            self._peak_queue_depth = max(self._peak_queue_depth, self._queue_depth())
+            submitted_at = time.time()
+            try:
+                try:
+                    inner = self._get_executor().submit(*call_args)
+                except BrokenProcessPool:
+                    # Một process con bị chết - tạo lại pool
+                    logger.error(f"Pool '{self.name}' is broken, recreating executor")
+                    self._executor = None
+                    inner = self._get_executor().submit(*call_args)
+            except Exception:
+                self._in_flight -= 1
+                raise
+
+        task = getattr(func, "__name__", "unknown")
+        inner.add_done_callback(lambda f: self._on_done(f, outer, submitted_at, task, profile))
+        return outer
+
+    def _on_done(self, inner: Future, outer: Future, submitted_at: float, task: str,
+                 profile: Optional[profiling.Profile] = None):
+        try:
+            started_at, finished_at, ok, payload, exported = inner.result()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight -= 1
+                self._failed += 1
+            outer.set_exception(e)
+            return
+
+        wait = max(0.0, started_at - submitted_at)
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            if not ok:
+                self._failed += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._total_run += max(0.0, finished_at - started_at)
+        POOL_WAIT.observe(wait, pool=self.name)
+        POOL_TASK.observe(max(0.0, finished_at - started_at), pool=self.name, task=task)
+        if profile is not None and exported:
+            profile.merge(exported)
+
+        if ok:
+            outer.set_result(payload)
+        else:
+            outer.set_exception(HTTPException(status_code=payload[0], detail=payload[1]))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "name": self.name,
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "active": min(self._in_flight, self.max_workers),
+                "queue_depth": self._queue_depth(),
+                "peak_queue_depth": self._peak_queue_depth,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "wait_time_avg": self._total_wait / completed,
+                "wait_time_max": self._max_wait,
+                "wait_time_total": self._total_wait,
+                "run_time_avg": self._total_run / completed
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+_pools: Dict[str, WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name: str) -> WorkerPool:
+    """
+    Lấy (hoặc khởi tạo) pool theo tên: io, cpu, exec
+    """
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            config = _pool_config(name)
+            pool = WorkerPool(name, config["kind"], config["workers"], config["max_queue"])
+            _pools[name] = pool
+        return pool
+
+async def run_in_pool(name: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Chạy hàm đồng bộ (blocking) trong pool và chờ kết quả mà không chặn event loop
+    """
+    return await asyncio.wrap_future(get_pool(name).submit(func, *args, **kwargs))
+
+def warm_pool(name: str) -> Future:
+    """
+    Khởi động trước pool (forkserver và process worker) bằng một tác vụ rỗng
+    """
+    return get_pool(name).submit(os.getpid)
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Thống kê của tất cả các pool đã cấu hình
+    """
+    return {name: get_pool(name).stats() for name in DEFAULT_POOLS}
+
+def shutdown_pools(wait: bool = True):
+    """
+    Dừng tất cả các pool (gọi khi tắt server)
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
+def _collect_pool_metrics() -> list:
+    # Chỉ các pool đã được tạo (không khởi tạo pool chỉ để xuất metric)
+    with _pools_lock:
+        stats = [pool.stats() for pool in _pools.values()]
+    return [
+        ("pool_in_flight", "gauge", "Tasks running or queued in the worker pool",
+         [({"pool": item["name"]}, item["in_flight"]) for item in stats]),
+        ("pool_queue_depth", "gauge", "Tasks waiting for a free worker",
+         [({"pool": item["name"]}, item["queue_depth"]) for item in stats]),
+        ("pool_max_workers", "gauge", "Configured number of workers",
+         [({"pool": item["name"]}, item["max_workers"]) for item in stats]),
+        ("pool_rejected_total", "counter", "Tasks rejected with 503 because the queue was full",
+         [({"pool": item["name"]}, item["rejected"]) for item in stats]),
+        ("pool_failed_total", "counter", "Tasks that raised an exception",
+         [({"pool": item["name"]}, item["failed"]) for item in stats]),
+    ]
+
+metrics.register_collector(_collect_pool_metrics)
\ No newline at end of file
@@ -0,0 +1,263 @@
+import os
+import re
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from fastapi.requests import HTTPConnection
+from dotenv import load_dotenv
+from app.utils.common import logger
+
+# Load biến môi trường
+load_dotenv()
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+PREFIX = "remote_ops_"
+
+# Ngưỡng mặc định của histogram (giây), thêm 30/60 giây cho lệnh shell và parser chạy lâu
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    """
+    Metric có nhãn, lưu giá trị theo tuple giá trị nhãn (theo thứ tự labelnames)
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"Missing label {e} for metric {self.name}")
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """
+    Histogram kiểu Prometheus: đếm theo từng ngưỡng (cộng dồn khi xuất) kèm tổng và số lần quan sát
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [số lần theo từng ngưỡng (phần tử cuối là +Inf), tổng, số lần]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Đo thời gian chạy của khối with (kể cả khi có exception)
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+_metrics: Dict[str, _Metric] = {}
+_collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]] = []
+_registry_lock = threading.Lock()
+
+def _register(cls, name: str, documentation: str, labelnames: Tuple[str, ...], **kwargs) -> Any:
+    # Cùng tên thì dùng lại metric đã có (module được import lại, ví dụ khi reload)
+    with _registry_lock:
+        metric = _metrics.get(PREFIX + name)
+        if metric is None:
+            metric = _metrics[PREFIX + name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {PREFIX + name} is already registered with a different type or labels")
+        return metric
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return _register(Counter, name, documentation, labelnames)
+
+def gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    return _register(Gauge, name, documentation, labelnames)
+
+def histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+def register_collector(func: Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]):
+    """
+    Đăng ký hàm tính metric tại thời điểm xuất (ví dụ thống kê pool, CPU của process con).
+    Hàm trả về list (tên, kiểu, mô tả, [(nhãn, giá trị)...]).
+    """
+    _collectors.append(func)
+
+def render() -> str:
+    """
+    Xuất tất cả metric theo định dạng text của Prometheus (version 0.0.4)
+    """
+    lines = []
+    with _registry_lock:
+        metrics = sorted(_metrics.values(), key=lambda metric: metric.name)
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+
+    for collect in list(_collectors):
+        try:
+            families = collect()
+        except Exception as e:
+            logger.error(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {str(e)}")
+            continue
+        for name, kind, documentation, samples in families:
+            name = PREFIX + name
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                keys = tuple(labels)
+                lines.append(f"{name}{_format_labels(keys, tuple(labels[key] for key in keys))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests by route template and status code",
+                        ("method", "route", "status"))
+HTTP_DURATION = histogram("http_request_duration_seconds",
+                          "Time from receiving the request to sending the last body chunk",
+                          ("method", "route"))
+HTTP_IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests currently being handled", ("method", "route"))
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    Path template của route đã khớp (ví dụ /jobs/{job_id}) để số nhãn không tăng theo tham số.
+    scope["route"].path có thể chỉ là phần sau prefix của router nên prefix được lấy lại từ path thực tế.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        # Không khớp route nào (404) - gom chung một nhãn
+        return "unmatched"
+    rendered = path
+    for name, value in scope.get("path_params", {}).items():
+        rendered = re.sub(r"\{" + re.escape(name) + r"(:[^}]*)?\}", lambda _: str(value), rendered)
+    request_path = scope["path"]
+    prefix = request_path[:len(request_path) - len(rendered)] if request_path.endswith(rendered) else ""
+    return prefix + path
+
+def track_in_flight(connection: HTTPConnection):
+    """
+    Dependency chung của app: chạy sau khi routing xong nên biết route template.
+    Tăng gauge số request đang xử lý; MetricsMiddleware giảm lại khi response kết thúc.
+    WebSocket cũng chạy dependency này nhưng không được MetricsMiddleware theo dõi nên bỏ qua.
+    """
+    if METRICS_ENABLED and connection.scope["type"] == "http":
+        route = route_template(connection.scope)
+        HTTP_IN_FLIGHT.inc(method=connection.scope["method"], route=route)
+        connection.scope["metrics_in_flight_route"] = route
+
+class MetricsMiddleware:
+    """
+    ASGI middleware ghi số request và độ trễ theo route (template lấy từ scope sau khi routing xong).
+    Độ trễ tính tới khi gửi xong body nên bao gồm cả thời gian stream của StreamingResponse.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"]
+            route = scope.pop("metrics_in_flight_route", None)
+            if route is not None:
+                HTTP_IN_FLIGHT.dec(method=method, route=route)
+            else:
+                route = route_template(scope)
+            HTTP_DURATION.observe(time.perf_counter() - started, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status["code"])
\ No newline at end of file
@@ -0,0 +1,298 @@
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+logger = logging.getLogger("remote-ops-api")
+
+# Load biến môi trường
+load_dotenv()
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"  # Cho phép bật profiler theo từng request
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")  # Nếu đặt, request phải gửi header X-Profile-Token trùng khớp
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")  # Mặc định STATE_DIR/profiles
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # Chu kỳ lấy mẫu stack (giây)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))  # Số profile giữ lại trên đĩa
+
+# sample: lấy mẫu stack định kỳ (chi phí thấp, trọng số là số mẫu)
+# trace: ghi mọi lời gọi hàm bằng sys.setprofile (chính xác nhưng chậm hơn nhiều, trọng số là micro giây)
+PROFILE_MODES = ("sample", "trace")
+
+class Profile:
+    """
+    Profile của một request: stack dạng gộp (collapsed, "a;b;c") -> trọng số, cùng danh sách service đã gọi.
+    Định dạng collapsed đọc được bằng flamegraph.pl, speedscope hoặc inferno.
+    """
+
+    def __init__(self, mode: str, profile_id: Optional[str] = None):
+        self.id = profile_id or uuid.uuid4().hex
+        self.mode = mode
+        self.created = time.time()
+        self.stacks: Counter = Counter()
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def unit(self) -> str:
+        return "samples" if self.mode == "sample" else "microseconds"
+
+    def add(self, function: str, seconds: float, stacks: Counter):
+        with self._lock:
+            self.stacks.update(stacks)
+            self.calls.append({"function": function, "seconds": round(seconds, 6)})
+
+    def export(self) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        # Dữ liệu gửi từ worker (thread hoặc process con) về process chính
+        with self._lock:
+            return dict(self.stacks), list(self.calls)
+
+    def merge(self, exported: Tuple[Dict[str, int], List[Dict[str, Any]]]):
+        stacks, calls = exported
+        with self._lock:
+            self.stacks.update(stacks)
+            self.calls.extend(calls)
+
+    def collapsed(self) -> str:
+        with self._lock:
+            return "".join(f"{stack} {weight}\n" for stack, weight in sorted(self.stacks.items()) if weight > 0)
+
+    def save(self) -> str:
+        """
+        Ghi profile ra PROFILE_DIR/<id>.<mode>.txt và xóa các profile cũ vượt quá PROFILE_KEEP
+        """
+        path = os.path.join(_profile_dir(create=True), f"{self.id}.{self.mode}.txt")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        os.replace(path + ".tmp", path)
+        _prune_profiles()
+        return path
+
+_current: ContextVar[Optional[Profile]] = ContextVar("remote_ops_profile", default=None)
+
+def current() -> Optional[Profile]:
+    """
+    Profile của request hiện tại (None nếu request không bật profiling)
+    """
+    return _current.get()
+
+def activate(profile: Optional[Profile]):
+    return _current.set(profile)
+
+def deactivate(token):
+    _current.reset(token)
+
+_short_paths: Dict[str, str] = {}
+
+def _short_path(filename: str) -> str:
+    # Bỏ phần thư mục trong sys.path cho gọn, ví dụ .../site-packages/pandas/io/common.py -> pandas/io/common.py
+    short = _short_paths.get(filename)
+    if short is None:
+        short = filename
+        for root in sorted((p for p in sys.path if p), key=len, reverse=True):
+            if filename.startswith(root.rstrip(os.sep) + os.sep):
+                short = filename[len(root.rstrip(os.sep)) + 1:]
+                break
+        short = _short_paths[filename] = short.replace(";", ":")
+    return short
+
+def _frame_name(code) -> str:
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+
+def _sample_call(func: Callable, args: tuple, kwargs: dict, stacks: Counter) -> Any:
+    """
+    Chạy hàm trên thread hiện tại trong khi một thread khác lấy mẫu stack của nó mỗi PROFILE_INTERVAL giây
+    """
+    target = threading.get_ident()
+    stop = threading.Event()
+    boundary = _sample_call.__code__
+
+    def sample():
+        while not stop.wait(PROFILE_INTERVAL):
+            frame = sys._current_frames().get(target)
+            names = []
+            while frame is not None and frame.f_code is not boundary:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                stacks[";".join(reversed(names))] += 1
+
+    sampler = threading.Thread(target=sample, name="profile-sampler", daemon=True)
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        stop.set()
+        sampler.join()
+
+def _trace_call(func: Callable, args: tuple, kwargs: dict, stacks: Counter) -> Any:
+    """
+    Chạy hàm với sys.setprofile, cộng thời gian (self time) cho từng stack
+    """
+    stack: List[str] = []
+    elapsed: Counter = Counter()
+    last = [time.perf_counter_ns()]
+
+    def tracer(frame, event, arg):
+        now = time.perf_counter_ns()
+        if stack:
+            elapsed[tuple(stack)] += now - last[0]
+        if event == "call":
+            stack.append(_frame_name(frame.f_code))
+        elif event == "c_call":
+            stack.append(f"{getattr(arg, '__qualname__', repr(arg))} (builtin)")
+        elif stack and event in ("return", "c_return", "c_exception"):
+            stack.pop()
+        last[0] = time.perf_counter_ns()
+
+    sys.setprofile(tracer)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sys.setprofile(None)
+        for key, nanoseconds in elapsed.items():
+            stacks[";".join(key)] += nanoseconds // 1000
+
+_PROFILERS = {"sample": _sample_call, "trace": _trace_call}
+
+def run(profile: Profile, func: Callable, args: tuple, kwargs: dict) -> Any:
+    """
+    Chạy service dưới profiler (gọi từ handle_exceptions khi request bật profiling).
+    Các service lồng bên trong nằm sẵn trong stack nên không được profile riêng.
+    """
+    token = _current.set(None)
+    stacks: Counter = Counter()
+    started = time.perf_counter()
+    try:
+        return _PROFILERS[profile.mode](func, args, kwargs, stacks)
+    finally:
+        _current.reset(token)
+        profile.add(getattr(func, "__qualname__", str(func)), time.perf_counter() - started, stacks)
+
+def requested_mode(headers: Dict[str, str], query_string: str) -> Optional[str]:
+    """
+    Chế độ profiling từ header X-Profile hoặc tham số query profile (1/true = sample, sample, trace)
+    """
+    value = headers.get("x-profile")
+    if value is None:
+        for part in query_string.split("&"):
+            name, _, raw = part.partition("=")
+            if name == "profile":
+                value = raw or "1"
+                break
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ("0", "false", "off", ""):
+        return None
+    return "sample" if value in ("1", "true", "on") else value
+
+def _profile_dir(create: bool = False) -> str:
+    # common import module này, nên STATE_DIR và ensure_private_dir được import khi dùng
+    from app.utils.common import STATE_DIR, ensure_private_dir
+    path = PROFILE_DIR or os.path.join(STATE_DIR, "profiles")
+    # Thư mục riêng (0700): file .tmp được ghi theo tên đoán trước nên không được nằm trong thư mục người khác ghi được
+    return ensure_private_dir(path) if create else path
+
+def _prune_profiles():
+    try:
+        entries = [entry for entry in os.scandir(_profile_dir()) if entry.name.endswith(".txt")]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[max(0, PROFILE_KEEP):]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    Các profile đã lưu, mới nhất trước
+    """
+    try:
+        entries = [entry for entry in os.scandir(_profile_dir()) if entry.name.endswith(".txt")]
+    except FileNotFoundError:
+        return []
+    result = []
+    for entry in entries:
+        profile_id, _, mode = entry.name[:-len(".txt")].partition(".")
+        stat_info = entry.stat()
+        result.append({"id": profile_id, "mode": mode, "size": stat_info.st_size, "created": stat_info.st_mtime})
+    result.sort(key=lambda item: item["created"], reverse=True)
+    return result
+
+def read_profile(profile_id: str) -> Optional[Tuple[str, str]]:
+    """
+    (tên file, nội dung collapsed) của profile đã lưu, None nếu không có
+    """
+    if not profile_id.isalnum():
+        return None
+    for mode in PROFILE_MODES:
+        path = os.path.join(_profile_dir(), f"{profile_id}.{mode}.txt")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return os.path.basename(path), f.read()
+        except FileNotFoundError:
+            continue
+    return None
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware bật profiler cho request có header X-Profile (hoặc ?profile=).
+    Các service (@handle_exceptions) chạy trong request, kể cả trên worker pool, được profile và gộp lại;
+    profile được lưu sau khi response kết thúc, id trả về trong header X-Profile-Id.
+    Chỉ được thêm vào app khi PROFILING_ENABLED=true.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        mode = requested_mode(headers, scope.get("query_string", b"").decode("latin-1"))
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        if PROFILE_TOKEN and headers.get("x-profile-token") != PROFILE_TOKEN:
+            await _send_error(send, 403, "Invalid or missing X-Profile-Token")
+            return
+        if mode not in PROFILE_MODES:
+            await _send_error(send, 400, f"Invalid profile mode: {mode}. Allowed: {', '.join(PROFILE_MODES)}")
+            return
+
+        profile = Profile(mode)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode()), (b"x-profile-mode", mode.encode())
+                ]}
+            await send(message)
+
+        token = activate(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            deactivate(token)
+            from app.utils.dispatch import run_in_pool
+            try:
+                await run_in_pool("io", profile.save)
+                logger.info(f"Saved {mode} profile {profile.id} ({len(profile.calls)} service calls)")
+            except Exception as e:
+                logger.error(f"Cannot save profile {profile.id}: {str(e)}")
+
+async def _send_error(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
\ No newline at end of file
@@ -0,0 +1,106 @@
+import io
+import json
+from typing import Dict, Any, List, Optional
+from fastapi import HTTPException
+
+# Định dạng trả về cho kết quả dạng bảng (read_csv, read_excel)
+# - records: JSON mặc định, list các dict (lặp lại tên cột ở mỗi dòng)
+# - columns: JSON theo cột {cột: [giá trị...]}
+# - arrow: Arrow IPC stream
+# - parquet: file Parquet
+MEDIA_TYPES = {
+    "records": "application/json",
+    "columns": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+_ACCEPT_FORMATS = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/json": "records",
+}
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Chọn định dạng từ tham số format (ưu tiên) hoặc header Accept (theo q giảm dần).
+    Accept "application/json; format=columns" chọn JSON theo cột.
+    """
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise HTTPException(status_code=400,
+                                detail=f"Invalid format: {requested}. Allowed: {', '.join(MEDIA_TYPES)}")
+        return requested
+    if not accept:
+        return "records"
+
+    ranges = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        media_type = parts[0].lower()
+        params = dict(part.split("=", 1) for part in parts[1:] if "=" in part)
+        try:
+            quality = float(params.get("q", 1))
+        except ValueError:
+            quality = 1.0
+        ranges.append((-quality, position, media_type, params))
+
+    for _, _, media_type, params in sorted(ranges):
+        if media_type == "application/json" and params.get("format") == "columns":
+            return "columns"
+        if media_type in _ACCEPT_FORMATS:
+            return _ACCEPT_FORMATS[media_type]
+    return "records"
+
+def _table_parts(result: Dict[str, Any]) -> tuple:
+    data = result.get("data")
+    if not isinstance(data, list) or "columns" not in result:
+        raise HTTPException(status_code=406, detail="Columnar formats are only available for tabular results (CSV, Excel)")
+    return result["columns"], data
+
+def to_columnar(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Chuyển data từ list dict sang {cột: [giá trị...]}, giữ nguyên các trường khác
+    """
+    columns, data = _table_parts(result)
+    return {**result, "data": {column: [row.get(column) for row in data] for column in columns}}
+
+def _arrow_table(result: Dict[str, Any]):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=406, detail="Arrow/Parquet output requires the pyarrow package")
+
+    columns, data = _table_parts(result)
+    arrays = []
+    for column in columns:
+        values = [row.get(column) for row in data]
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Cột có nhiều kiểu giá trị (thường gặp ở Excel) - chuyển thành chuỗi
+            arrays.append(pa.array([None if value is None else str(value) for value in values], type=pa.string()))
+
+    # Các trường còn lại (path, shape, next_offset...) được lưu trong metadata của schema
+    info = {key: value for key, value in result.items() if key != "data"}
+    metadata = {"remote-ops": json.dumps(info, ensure_ascii=False, default=str)}
+    return pa.Table.from_arrays(arrays, names=[str(column) for column in columns], metadata=metadata)
+
+def encode_table(result: Dict[str, Any], fmt: str) -> bytes:
+    """
+    Mã hóa kết quả dạng bảng thành Arrow IPC stream hoặc Parquet
+    """
+    table = _arrow_table(result)
+    sink = io.BytesIO()
+    if fmt == "arrow":
+        import pyarrow as pa
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Unsupported binary format: {fmt}")
+    return sink.getvalue()
\ No newline at end of file
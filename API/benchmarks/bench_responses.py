@@ -0,0 +1,118 @@
+"""
+So sánh chi phí mã hóa response JSON (jsonable_encoder + json so với FastJSONResponse/orjson)
+và kích thước/thời gian nén theo từng encoding trên các payload đại diện.
+Không cần server: dữ liệu giả lập theo đúng dạng kết quả của list_dir, read_csv, read_pdf và file info.
+
+Cách chạy (từ thư mục API):
+    python benchmarks/bench_responses.py
+    python benchmarks/bench_responses.py --repeat 10 --rows 100000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from app.utils import compression
+from app.utils.common import create_response, orjson
+
+def payload_list_dir(count: int) -> dict:
+    now = time.time()
+    return {"path": "/data/project", "items": [
+        {"name": f"file_{index:06d}.py", "path": f"/data/project/src/module_{index % 50}/file_{index:06d}.py",
+         "type": "file", "size": random.randint(0, 1 << 20), "modified": now - random.random() * 1e7}
+        for index in range(count)
+    ]}
+
+def payload_read_csv(rows: int) -> dict:
+    columns = ["id", "timestamp", "customer", "country", "amount", "quantity", "discount", "status"]
+    statuses = ["paid", "pending", "refunded", "cancelled"]
+    countries = ["VN", "US", "DE", "JP", "FR", "BR"]
+    data = [{"id": index, "timestamp": f"2024-03-{index % 28 + 1:02d} 12:{index % 60:02d}:00",
+             "customer": f"Customer {index % 997}", "country": countries[index % len(countries)],
+             "amount": round(random.uniform(1, 5000), 2), "quantity": random.randint(1, 20),
+             "discount": None if index % 7 else 0.1, "status": statuses[index % len(statuses)]}
+            for index in range(rows)]
+    return {"path": "/data/sales.csv", "columns": columns, "shape": [rows, len(columns)], "data": data}
+
+def payload_read_pdf(pages: int) -> dict:
+    words = ("hợp đồng thanh toán điều khoản the agreement shall be governed by payment terms within "
+             "thirty days invoice bên mua bên bán trách nhiệm").split()
+    return {"path": "/data/report.pdf", "num_pages": pages, "pages": [
+        {"page_number": page + 1, "text": " ".join(random.choice(words) for _ in range(400))}
+        for page in range(pages)
+    ]}
+
+def payload_file_info() -> dict:
+    now = time.time()
+    return {"path": "/data/project/README.md", "name": "README.md", "type": "file", "size": 4096,
+            "created": now, "modified": now, "accessed": now, "permissions": 33188}
+
+def envelope(data):
+    return {"success": True, "message": "Benchmark payload", "data": data}
+
+def encode_before(data) -> bytes:
+    # Đường cũ: FastAPI chạy jsonable_encoder trên dict trả về, sau đó JSONResponse dùng json.dumps
+    return json.dumps(jsonable_encoder(envelope(data)), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+def encode_after(data) -> bytes:
+    return create_response(True, "Benchmark payload", data).body
+
+def best_of(func, repeat: int) -> tuple:
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return min(times), statistics.median(times), result
+
+def compress_once(encoding: str, body: bytes) -> bytes:
+    return compression._ENCODERS[encoding]().compress(body, True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--entries", type=int, default=10000, help="Số mục của list_dir")
+    parser.add_argument("--rows", type=int, default=50000, help="Số dòng của read_csv")
+    parser.add_argument("--pages", type=int, default=200, help="Số trang của read_pdf")
+    args = parser.parse_args()
+    random.seed(0)
+
+    payloads = {
+        "file_info": payload_file_info(),
+        f"list_dir ({args.entries} entries)": payload_list_dir(args.entries),
+        f"read_csv ({args.rows} rows)": payload_read_csv(args.rows),
+        f"read_pdf ({args.pages} pages)": payload_read_pdf(args.pages),
+    }
+    print(f"orjson: {'có' if orjson is not None else 'không (dùng json)'}, "
+          f"encoding: {', '.join(compression.available_encodings())}\n")
+
+    print(f"{'payload':<28} {'size':>10} {'before':>10} {'after':>10} {'speedup':>8}")
+    bodies = {}
+    for name, data in payloads.items():
+        before, _, old_body = best_of(lambda: encode_before(data), args.repeat)
+        after, _, body = best_of(lambda: encode_after(data), args.repeat)
+        if json.loads(old_body) != json.loads(body):
+            print(f"  cảnh báo: {name} - kết quả mã hóa khác nhau")
+        bodies[name] = body
+        print(f"{name:<28} {len(body) / 1024:>8.1f}KB {before * 1000:>8.2f}ms {after * 1000:>8.2f}ms "
+              f"{before / after:>7.1f}x")
+
+    print(f"\n{'payload':<28} {'encoding':>8} {'size':>10} {'ratio':>7} {'time':>10} {'MB/s':>8}")
+    for name, body in bodies.items():
+        if len(body) < compression.COMPRESSION_MIN_SIZE:
+            print(f"{name:<28} {'-':>8} (nhỏ hơn COMPRESSION_MIN_SIZE={compression.COMPRESSION_MIN_SIZE}, không nén)")
+            continue
+        for encoding in compression.available_encodings():
+            elapsed, _, compressed = best_of(lambda: compress_once(encoding, body), args.repeat)
+            print(f"{name:<28} {encoding:>8} {len(compressed) / 1024:>8.1f}KB {len(body) / len(compressed):>6.1f}x "
+                  f"{elapsed * 1000:>8.2f}ms {len(body) / elapsed / 1e6:>8.0f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+So sánh /files/search/* với việc chạy find/grep qua /exec/cmd.
+
+Cách chạy (server đang chạy ở cổng 8080):
+    python benchmarks/bench_search.py --url http://localhost:8080 --path /data/project --query "import os"
+"""
+import sys
+import time
+import json
+import shlex
+import argparse
+import httpx
+
+def timed_stream(client: httpx.Client, method: str, url: str, **kwargs):
+    """
+    Đo thời gian tới dòng kết quả đầu tiên và tổng thời gian, đếm số dòng
+    """
+    start = time.perf_counter()
+    first = None
+    lines = 0
+    with client.stream(method, url, **kwargs) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            if first is None:
+                first = time.perf_counter() - start
+            lines += 1
+    return first or 0.0, time.perf_counter() - start, lines
+
+def timed_exec(client: httpx.Client, base_url: str, command: str):
+    start = time.perf_counter()
+    response = client.post(f"{base_url}/exec/cmd", json={"command": command, "timeout": 600})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    stdout = response.json()["data"]["stdout"]
+    lines = len([line for line in stdout.splitlines() if line])
+    # Với /exec/cmd, kết quả đầu tiên chỉ có khi lệnh kết thúc
+    return elapsed, elapsed, lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8080")
+    parser.add_argument("--path", required=True, help="Thư mục cần tìm")
+    parser.add_argument("--query", default="import os", help="Chuỗi cần grep")
+    parser.add_argument("--pattern", default="*.py", help="Glob tên file")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        ("name: find via /exec/cmd",
+         lambda c: timed_exec(c, args.url, f"find {shlex.quote(args.path)} -name {shlex.quote(args.pattern)}")),
+        ("name: /files/search/name",
+         lambda c: timed_stream(c, "GET", f"{args.url}/files/search/name",
+                                params={"path": args.path, "pattern": args.pattern, "limit": 10 ** 9, "fields": "path"})),
+        ("content: grep -rnI via /exec/cmd",
+         lambda c: timed_exec(c, args.url, f"grep -rnIF {shlex.quote(args.query)} {shlex.quote(args.path)}")),
+        ("content: /files/search/content",
+         lambda c: timed_stream(c, "GET", f"{args.url}/files/search/content",
+                                params={"path": args.path, "query": args.query, "max_matches": 10 ** 9,
+                                        "max_matches_per_file": 10 ** 9})),
+    ]
+
+    with httpx.Client(timeout=None) as client:
+        for name, run in cases:
+            runs = [run(client) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r[1])
+            print(json.dumps({"case": name, "first_result_s": round(best[0], 4),
+                              "total_s": round(best[1], 4), "results": best[2]}))
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Đo throughput (request/giây) và độ trễ của API server với nhiều kết nối keep-alive đồng thời.
+Client tự gửi HTTP/1.1 thô qua asyncio để tốn ít CPU nhất có thể (trên máy ít core,
+client và server dùng chung CPU nên kết quả là cận dưới).
+
+Cách chạy (server đang chạy ở cổng 8080):
+    python benchmarks/bench_server.py --url "http://localhost:8080/" --connections 32 --duration 10
+    python benchmarks/bench_server.py --url "http://localhost:8080/files/info?path=/etc/hosts"
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from urllib.parse import urlsplit
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """
+    Đọc một response (header + body theo Content-Length hoặc chunked), trả về status code
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status
+
+async def worker(host: str, port: int, request: bytes, deadline: float, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        # Server đóng kết nối (ví dụ worker được khởi động lại) - mở kết nối mới
+        errors.append(type(e).__name__)
+        if time.perf_counter() < deadline:
+            await worker(host, port, request, deadline, latencies, errors)
+    finally:
+        writer.close()
+
+async def run(url: str, connections: int, duration: float, warmup: float) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    target = parts.path or "/"
+    if parts.query:
+        target += "?" + parts.query
+    request = f"GET {target} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: keep-alive\r\n\r\n".encode("latin-1")
+
+    if warmup > 0:
+        await asyncio.gather(*(worker(host, port, request, time.perf_counter() + warmup, [], [])
+                               for _ in range(connections)))
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, request, started + duration, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo throughput của API server")
+    parser.add_argument("--url", default="http://localhost:8080/")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.connections, args.duration, args.warmup))
+    print(f"{args.url}  connections={args.connections}")
+    print(f"  {result['requests']} requests, {result['errors']} errors")
+    print(f"  {result['rps']:.0f} req/s   p50 {result['p50_ms']:.2f} ms   p99 {result['p99_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Báo cáo thời gian khởi động và import của ứng dụng (python -X importtime), dùng để phát hiện
+các thay đổi làm chậm cold start của worker.
+
+Cách chạy (từ thư mục API):
+    python benchmarks/profile_startup.py
+    python benchmarks/profile_startup.py --runs 5 --top 20 --budget 1.0
+
+Trả về mã thoát 1 nếu thời gian import vượt --budget giây hoặc nếu một thư viện trong --forbid
+(mặc định là các thư viện phân tích nặng) bị import ngay khi khởi động.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = "pandas,numpy,docx,PyPDF2,openpyxl,pyarrow"
+
+# Chạy trong process con: import ứng dụng rồi in thời gian, bộ nhớ và các module đã nạp
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+except ImportError:
+    rss = None
+print(json.dumps({"seconds": elapsed, "max_rss_mb": rss, "modules": sorted(sys.modules)}))
+"""
+
+def run_probe(importtime: bool) -> tuple:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+    result = subprocess.run(cmd, cwd=API_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Các dòng "import time: self | cumulative | module" -> list (cumulative_us, self_us, module)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Báo cáo thời gian import khi khởi động ứng dụng")
+    parser.add_argument("--runs", type=int, default=3, help="Số lần đo (lấy trung vị)")
+    parser.add_argument("--top", type=int, default=15, help="Số module chậm nhất được liệt kê")
+    parser.add_argument("--budget", type=float, default=None, help="Thời gian import tối đa cho phép (giây)")
+    parser.add_argument("--forbid", default=HEAVY_MODULES,
+                        help="Các module không được import khi khởi động, phân cách bởi dấu phẩy")
+    args = parser.parse_args()
+
+    runs = [run_probe(importtime=False)[0] for _ in range(max(1, args.runs))]
+    seconds = statistics.median(run["seconds"] for run in runs)
+    rss = runs[-1]["max_rss_mb"]
+    loaded = set(runs[-1]["modules"])
+    _, stderr = run_probe(importtime=True)
+    rows = parse_importtime(stderr)
+
+    print(f"import app.main: {seconds:.3f}s (trung vị {len(runs)} lần)" +
+          (f", max RSS {rss:.0f} MB" if rss is not None else ""))
+    print(f"{len(loaded)} module đã nạp\n")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    # Thời gian tích lũy của một module gồm cả các module con mà nó import
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {name}")
+
+    failed = False
+    forbidden = [module.strip() for module in args.forbid.split(",") if module.strip()]
+    eager = [module for module in forbidden if module in loaded]
+    if eager:
+        print(f"\nLỖI: các module nặng bị import khi khởi động: {', '.join(eager)}")
+        failed = True
+    if args.budget is not None and seconds > args.budget:
+        print(f"\nLỖI: thời gian import {seconds:.3f}s vượt ngân sách {args.budget:.3f}s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
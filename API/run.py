@@ -15,17 +15,87 @@ PORT = os.getenv("PORT", "8080")
 NGROK_DOMAIN = os.getenv("NGROK_URL", "climbing-lioness-factual.ngrok-free.app")
 NGROK_AUTH_TOKEN = os.getenv("NGROK_AUTH_TOKEN", "2rLzNrcOqbQVc9AiRMkcQeVFGjD_6Wkix5eeBiSscWBJwd2Cs")
 
+# Cấu hình API server (xem guide.md, mục "Chạy nhiều worker")
+SERVER = os.getenv("SERVER", "uvicorn").lower()  # uvicorn | gunicorn
+WORKERS = int(os.getenv("WORKERS", "1"))  # 0 = số CPU
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")  # auto | asyncio | uvloop
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")  # auto | h11 | httptools
+SERVER_KEEP_ALIVE = int(os.getenv("SERVER_KEEP_ALIVE", "5"))  # Giây giữ kết nối keep-alive rảnh
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))  # Khởi động lại worker sau N request (0 = tắt)
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "0"))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))  # Giây chờ request đang chạy khi dừng worker
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+
 # Biến toàn cục để theo dõi các process
 processes = []
+server_state = {"process": None, "restart": False}
+
+def worker_count(workers: int) -> int:
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+def build_server_command(server: str, workers: int) -> list:
+    """Tạo lệnh chạy API server (uvicorn hoặc gunicorn với worker uvicorn)"""
+    if server == "gunicorn":
+        if sys.platform == "win32":
+            raise RuntimeError("gunicorn is not supported on Windows, use SERVER=uvicorn")
+        # Worker của gunicorn tự chọn uvloop/httptools nếu đã cài; UvicornH11Worker dùng h11
+        worker_class = "uvicorn.workers.UvicornH11Worker" if SERVER_HTTP == "h11" else "uvicorn.workers.UvicornWorker"
+        cmd = [sys.executable, "-m", "gunicorn", "app.main:app",
+               "--worker-class", worker_class,
+               "--workers", str(workers),
+               "--bind", f"{HOST}:{PORT}",
+               "--keep-alive", str(SERVER_KEEP_ALIVE),
+               "--graceful-timeout", str(SERVER_GRACEFUL_TIMEOUT),
+               "--timeout", "0",
+               "--backlog", str(SERVER_BACKLOG)]
+        if SERVER_MAX_REQUESTS > 0:
+            cmd += ["--max-requests", str(SERVER_MAX_REQUESTS),
+                    "--max-requests-jitter", str(SERVER_MAX_REQUESTS_JITTER)]
+        return cmd
+    if server != "uvicorn":
+        raise RuntimeError(f"Unsupported SERVER: {server} (uvicorn, gunicorn)")
 
-def run_uvicorn():
-    """Chạy Uvicorn server"""
-    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", PORT]
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", PORT,
+           "--loop", SERVER_LOOP,
+           "--http", SERVER_HTTP,
+           "--timeout-keep-alive", str(SERVER_KEEP_ALIVE),
+           "--timeout-graceful-shutdown", str(SERVER_GRACEFUL_TIMEOUT),
+           "--backlog", str(SERVER_BACKLOG)]
+    if workers > 1:
+        cmd += ["--workers", str(workers)]
+    if SERVER_MAX_REQUESTS > 0:
+        cmd += ["--limit-max-requests", str(SERVER_MAX_REQUESTS)]
+        if workers > 1:
+            cmd += ["--limit-max-requests-jitter", str(SERVER_MAX_REQUESTS_JITTER)]
+    return cmd
+
+def supervises_workers(server: str, workers: int) -> bool:
+    # gunicorn và uvicorn --workers có process quản lý tự khởi động lại worker và xử lý SIGHUP
+    return server == "gunicorn" or workers > 1
+
+def run_server(server: str = SERVER, workers: int = WORKERS):
+    """Chạy API server"""
+    cmd = build_server_command(server, worker_count(workers))
     print(f"Khởi động API server: {' '.join(cmd)}")
     process = subprocess.Popen(cmd)
     processes.append(process)
+    server_state["process"] = process
     return process
 
+def reload_server(signum=None, frame=None):
+    """Khởi động lại worker một cách êm (SIGHUP): worker mới được tạo trước khi worker cũ dừng"""
+    process = server_state["process"]
+    if process is None or process.poll() is not None:
+        return
+    if supervises_workers(SERVER, worker_count(WORKERS)):
+        print("\nĐang khởi động lại các worker...")
+        process.send_signal(signal.SIGHUP)
+    else:
+        # Chỉ có một process uvicorn: dừng và chạy lại
+        print("\nĐang khởi động lại API server...")
+        server_state["restart"] = True
+        process.terminate()
+
 def run_ngrok():
     """Chạy ngrok tunnel"""
     # Cấu hình ngrok auth token nếu chưa cấu hình
@@ -57,28 +127,61 @@ def display_info():
     print("\n" + "="*50)
     print(f"API đang chạy tại địa chỉ nội bộ: http://{HOST}:{PORT}")
     print(f"API được public qua ngrok: https://{NGROK_DOMAIN}")
+    print(f"Server: {SERVER}, {worker_count(WORKERS)} worker, loop={SERVER_LOOP}, http={SERVER_HTTP}")
     print("="*50)
     print("\nÁp dụng các đường dẫn API:")
     print("✅ GET  /                     - API chính")
     print("✅ GET  /files/list?path=C:/  - Liệt kê thư mục")
+    print("✅ GET  /files/walk?path=C:/     - Duyệt đệ quy (NDJSON)")
+    print("✅ GET  /files/search/name?path=C:/&pattern=*.log - Tìm file theo tên")
+    print("✅ GET  /files/search/content?path=C:/&query=TODO - Tìm nội dung file")
     print("✅ GET  /files/info?path=C:/file.txt - Thông tin file")
+    print("✅ GET  /files/hash?path=C:/file.bin - Checksum file/thư mục (có cache)")
     print("✅ POST /files/create/file    - Tạo file")
     print("✅ POST /files/create/directory - Tạo thư mục")
+    print("✅ PUT  /files/upload?path=C:/file.bin - Upload file (stream)")
+    print("✅ POST /files/upload/sessions - Upload nhiều chunk, tải tiếp")
     print("✅ GET  /files/read?path=C:/file.txt - Đọc file")
+    print("✅ GET  /files/download?path=C:/file.bin - Tải file (stream, Range)")
+    print("✅ GET  /files/archive?path=C:/folder - Tải thư mục dạng tar/zip (stream)")
+    print("✅ POST /files/extract?path=C:/folder - Giải nén archive upload")
     print("✅ POST /files/move           - Di chuyển file/thư mục")
     print("✅ POST /files/copy           - Sao chép file/thư mục")
+    print("✅ POST /files/batch          - Nhiều thao tác file trong một request")
     print("✅ DEL  /files/delete?path=C:/file.txt - Xóa file/thư mục")
     print("✅ POST /scan/read            - Quét & phân tích file tự động")
     print("✅ POST /scan/read/docx       - Đọc file Word")
     print("✅ POST /scan/read/excel      - Đọc file Excel")
+    print("✅ POST /scan/read/excel/stream - Đọc Excel, stream từng dòng")
     print("✅ POST /scan/read/pdf        - Đọc file PDF")
+    print("✅ POST /scan/read/pdf/stream - Đọc PDF, stream từng trang")
     print("✅ POST /scan/read/csv        - Đọc file CSV")
+    print("✅ POST /scan/read/csv/stream - Đọc CSV, stream từng dòng")
+    print("✅ POST /scan/read/csv/profile - Hồ sơ file CSV (kiểu dữ liệu, số dòng)")
     print("✅ POST /scan/read/text       - Đọc file văn bản")
+    print("✅ GET  /scan/cache/stats     - Thống kê cache kết quả phân tích")
     print("✅ POST /exec/cmd             - Thực thi lệnh shell/bash")
     print("✅ POST /exec/powershell      - Thực thi lệnh PowerShell")
     print("✅ POST /exec/cmd/windows     - Thực thi lệnh CMD")
     print("✅ POST /exec/bash            - Thực thi lệnh Bash")
+    print("✅ POST /exec/batch           - Thực thi nhiều lệnh đồng thời")
+    print("✅ POST /exec/stream          - Thực thi lệnh, stream output (SSE)")
+    print("✅ WS   /exec/ws              - Thực thi lệnh, stream output (WebSocket)")
+    print("✅ POST /exec/sessions        - Mở shell session chạy lâu dài")
+    print("✅ POST /exec/sessions/{id}/run - Chạy lệnh trong shell session")
+    print("✅ DEL  /exec/sessions/{id}   - Đóng shell session")
     print("✅ GET  /exec/system-info     - Lấy thông tin hệ thống")
+    print("✅ POST /jobs/command         - Tạo job chạy lệnh nền")
+    print("✅ POST /jobs/scan            - Tạo job phân tích file nền")
+    print("✅ POST /jobs/copy            - Tạo job sao chép file/thư mục nền")
+    print("✅ GET  /jobs                 - Danh sách job")
+    print("✅ GET  /jobs/{job_id}/output - Đọc output của job")
+    print("✅ GET  /jobs/{job_id}/result - Lấy kết quả job phân tích")
+    print("✅ POST /jobs/{job_id}/cancel - Hủy job")
+    print("✅ GET  /system/pools         - Thống kê worker pool")
+    print("✅ GET  /system/startup       - Thời gian khởi động, parser đã nạp")
+    print("✅ GET  /metrics              - Metric theo định dạng Prometheus")
+    print("✅ GET  /system/profiles      - Profile theo request (PROFILING_ENABLED)")
     print("="*50)
     print("\nỨng dụng đã sẵn sàng sử dụng! Nhấn Ctrl+C để dừng.")
     print("="*50 + "\n")
@@ -87,13 +190,14 @@ def main():
     # Đăng ký signal handler để dọn dẹp khi kết thúc
     if sys.platform != "win32":
         signal.signal(signal.SIGTERM, cleanup)
+        signal.signal(signal.SIGHUP, reload_server)
     signal.signal(signal.SIGINT, cleanup)
     
     try:
-        # Khởi động Uvicorn
-        uvicorn_process = run_uvicorn()
+        # Khởi động API server
+        server_process = run_server()
         
-        # Đợi Uvicorn khởi động
+        # Đợi API server khởi động
         time.sleep(2)
         
         # Khởi động ngrok
@@ -103,8 +207,19 @@ def main():
         time.sleep(3)
         display_info()
         
-        # Giữ cho script chạy
-        uvicorn_process.wait()
+        # Giữ cho script chạy; chạy lại server khi reload hoặc khi một process uvicorn
+        # duy nhất tự thoát sau SERVER_MAX_REQUESTS request
+        while True:
+            return_code = server_process.wait()
+            restart = server_state["restart"] or (
+                SERVER_MAX_REQUESTS > 0 and return_code == 0
+                and not supervises_workers(SERVER, worker_count(WORKERS))
+            )
+            if not restart:
+                break
+            server_state["restart"] = False
+            processes.remove(server_process)
+            server_process = run_server()
     except KeyboardInterrupt:
         cleanup()
     except Exception as e:
@@ -0,0 +1,41 @@
+import os
+import sys
+import shutil
+import tempfile
+import pytest
+
+# Cấu hình phải được đặt trước khi import app: mọi đường dẫn nằm trong một thư mục tạm riêng
+_ROOT = tempfile.mkdtemp(prefix="remote-ops-tests-")
+BASE_PATH = os.path.join(_ROOT, "base")
+os.makedirs(BASE_PATH)
+os.environ["BASE_PATH"] = BASE_PATH
+os.environ["STATE_DIR"] = os.path.join(_ROOT, "state")
+os.environ["JOB_DB_PATH"] = os.path.join(_ROOT, "jobs.sqlite3")
+os.environ["JOB_OUTPUT_DIR"] = os.path.join(_ROOT, "jobs")
+os.environ["UPLOAD_SESSION_DIR"] = os.path.join(_ROOT, "uploads")
+os.environ["SCAN_CACHE_DIR"] = os.path.join(_ROOT, "scan-cache")
+os.environ["HASH_CACHE_PATH"] = os.path.join(_ROOT, "hashes.sqlite3")
+os.environ["PROFILE_DIR"] = os.path.join(_ROOT, "profiles")
+os.environ["METADATA_INDEX_ENABLED"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def workdir():
+    """
+    Thư mục làm việc riêng cho từng test, nằm trong BASE_PATH
+    """
+    path = tempfile.mkdtemp(dir=BASE_PATH)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_ROOT, ignore_errors=True)
\ No newline at end of file
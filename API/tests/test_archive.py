@@ -0,0 +1,124 @@
+import io
+import os
+import tarfile
+import zipfile
+
+def _tar(entries) -> bytes:
+    """
+    entries: list (tên, dữ liệu bytes) cho file thường hoặc (tên, "->đích") cho symlink
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as archive:
+        for name, value in entries:
+            info = tarfile.TarInfo(name)
+            if isinstance(value, str):
+                info.type = tarfile.SYMTYPE
+                info.linkname = value[2:]
+                archive.addfile(info)
+            else:
+                info.size = len(value)
+                archive.addfile(info, io.BytesIO(value))
+    return buffer.getvalue()
+
+def _extract(client, path, body, **params):
+    response = client.post("/files/extract", params={"path": path, **params}, content=body)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def _snapshot(path):
+    return sorted(os.listdir(path))
+
+def test_archive_round_trip(client, workdir):
+    source = os.path.join(workdir, "src")
+    os.makedirs(os.path.join(source, "sub"))
+    with open(os.path.join(source, "a.txt"), "wb") as f:
+        f.write(b"hello" * 1000)
+    with open(os.path.join(source, "sub", "b.bin"), "wb") as f:
+        f.write(os.urandom(100000))
+    os.symlink("sub/b.bin", os.path.join(source, "link"))
+
+    for fmt, compression in (("tar", "none"), ("tar", "gzip"), ("zip", "none"), ("zip", "gzip")):
+        response = client.get("/files/archive", params={"path": source, "format": fmt, "compression": compression})
+        assert response.status_code == 200
+        destination = os.path.join(workdir, f"out-{fmt}-{compression}")
+        result = _extract(client, destination, response.content)
+        assert result["format"] == fmt
+        assert (result["files"], result["symlinks"], result["skipped_count"]) == (2, 1, 0)
+        for name in ("a.txt", os.path.join("sub", "b.bin")):
+            with open(os.path.join(source, name), "rb") as expected, \
+                    open(os.path.join(destination, "src", name), "rb") as actual:
+                assert expected.read() == actual.read()
+        assert os.readlink(os.path.join(destination, "src", "link")) == "sub/b.bin"
+
+def test_archive_filters(client, workdir):
+    os.makedirs(os.path.join(workdir, "src", ".git"))
+    for name in ("a.py", "b.txt", os.path.join(".git", "c.py")):
+        open(os.path.join(workdir, "src", name), "w").close()
+    response = client.get("/files/archive", params={"path": os.path.join(workdir, "src"),
+                                                    "include": "*.py", "exclude": ".git"})
+    names = tarfile.open(fileobj=io.BytesIO(response.content)).getnames()
+    assert names == ["src", "src/a.py"]
+
+def test_archive_rejects_invalid_options(client, workdir):
+    assert client.get("/files/archive", params={"path": workdir, "format": "rar"}).status_code == 400
+    assert client.get("/files/archive", params={"path": workdir, "format": "zip",
+                                                "compression": "zstd"}).status_code == 400
+    assert client.get("/files/archive", params={"path": os.path.join(workdir, "missing")}).status_code == 404
+
+def test_extract_skips_unsafe_paths(client, workdir):
+    destination = os.path.join(workdir, "dest")
+    body = _tar([("../escape.txt", b"x"), ("/absolute.txt", b"x"), ("ok.txt", b"ok"),
+                 ("abs-link", "->/etc"), ("up-link", "->../.."), ("good-link", "->ok.txt")])
+    result = _extract(client, destination, body)
+    skipped = {item["name"] for item in result["skipped"]}
+    assert skipped == {"../escape.txt", "/absolute.txt", "abs-link", "up-link"}
+    assert _snapshot(destination) == ["good-link", "ok.txt"]
+    assert not os.path.exists(os.path.join(workdir, "escape.txt"))
+
+def test_extract_symlink_chain_cannot_escape(client, workdir):
+    # d -> ., e -> d/.. trỏ ra thư mục cha khi kernel resolve; .x.part -> e/pwned là file tạm của x
+    destination = os.path.join(workdir, "dest")
+    os.makedirs(destination)
+    before = _snapshot(workdir)
+    body = _tar([("d", "->."), ("e", "->d/.."), (".x.part", "->e/pwned"), ("x", b"payload")])
+    result = _extract(client, destination, body)
+    assert _snapshot(workdir) == before
+    assert not os.path.lexists(os.path.join(workdir, "pwned"))
+    assert [item["name"] for item in result["skipped"]] == ["e"]
+    with open(os.path.join(destination, "x"), "rb") as f:
+        assert f.read() == b"payload"
+    assert not os.path.islink(os.path.join(destination, "x"))
+
+def test_extract_planted_part_symlink_is_not_followed(client, workdir):
+    destination = os.path.join(workdir, "dest")
+    os.makedirs(destination)
+    outside = os.path.join(workdir, "outside.txt")
+    os.symlink(outside, os.path.join(destination, ".x.part"))
+    _extract(client, destination, _tar([("x", b"payload")]))
+    assert not os.path.lexists(outside)
+    with open(os.path.join(destination, "x"), "rb") as f:
+        assert f.read() == b"payload"
+
+def test_extract_existing_symlink_cannot_create_directories_outside(client, workdir):
+    destination = os.path.join(workdir, "dest")
+    outside = os.path.join(workdir, "outside")
+    os.makedirs(destination)
+    os.makedirs(outside)
+    os.symlink(outside, os.path.join(destination, "pre"))
+    result = _extract(client, destination, _tar([("pre/new/dir/file.txt", b"x"), ("pre/file.txt", b"x")]))
+    assert result["skipped_count"] == 2
+    assert os.listdir(outside) == []
+
+def test_extract_zip_skips_unsafe_paths(client, workdir):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("../escape.txt", b"x")
+        archive.writestr("ok.txt", b"ok")
+    result = _extract(client, os.path.join(workdir, "dest"), buffer.getvalue())
+    assert result["format"] == "zip"
+    assert [item["name"] for item in result["skipped"]] == ["../escape.txt"]
+    assert not os.path.exists(os.path.join(workdir, "escape.txt"))
+
+def test_extract_rejects_invalid_archive(client, workdir):
+    response = client.post("/files/extract", params={"path": os.path.join(workdir, "dest")}, content=b"garbage" * 100)
+    assert response.status_code == 400
\ No newline at end of file
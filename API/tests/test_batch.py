@@ -0,0 +1,71 @@
+import os
+
+def _batch(client, operations, **options):
+    response = client.post("/files/batch", json={"operations": operations, **options})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_batch_runs_dependent_operations_in_order(client, workdir):
+    release = os.path.join(workdir, "release")
+    current = os.path.join(workdir, "current.json")
+    operations = [
+        {"op": "create_directory", "path": release},
+        {"op": "create_file", "path": os.path.join(release, "a.txt"), "content": "a"},
+        {"op": "create_file", "path": current, "content": "v1"},
+        {"op": "move", "source_path": current, "destination_path": os.path.join(release, "old.json")},
+        {"op": "create_file", "path": current, "content": "v2"},
+        {"op": "copy", "source_path": release, "destination_path": os.path.join(workdir, "copy")},
+        {"op": "delete", "path": os.path.join(release, "a.txt")},
+    ]
+    # Nhiều thao tác độc lập chạy song song cùng lúc
+    operations += [{"op": "create_file", "path": os.path.join(workdir, f"f{i}.txt"), "content": str(i)}
+                   for i in range(20)]
+
+    body = _batch(client, operations, concurrency=8)
+    data = body["data"]
+    assert body["success"] is True
+    assert data["succeeded"] == len(operations) and data["failed"] == data["skipped"] == 0
+    assert [result["status"] for result in data["results"]] == ["succeeded"] * len(operations)
+
+    with open(current, encoding="utf-8") as f:
+        assert f.read() == "v2"
+    with open(os.path.join(release, "old.json"), encoding="utf-8") as f:
+        assert f.read() == "v1"
+    assert not os.path.exists(os.path.join(release, "a.txt"))
+    # Bản sao được tạo trước khi a.txt bị xóa
+    assert sorted(os.listdir(os.path.join(workdir, "copy"))) == ["a.txt", "old.json"]
+    for i in range(20):
+        with open(os.path.join(workdir, f"f{i}.txt"), encoding="utf-8") as f:
+            assert f.read() == str(i)
+
+def test_batch_results_keep_request_order_on_errors(client, workdir):
+    missing = os.path.join(workdir, "missing")
+    operations = [
+        {"op": "create_file", "path": os.path.join(workdir, "ok.txt"), "content": "x"},
+        {"op": "delete", "path": missing},
+        {"op": "create_directory", "path": os.path.join(workdir, "dir")},
+    ]
+    data = _batch(client, operations)["data"]
+    assert [result["index"] for result in data["results"]] == [0, 1, 2]
+    assert [result["status"] for result in data["results"]] == ["succeeded", "failed", "succeeded"]
+    assert data["results"][1]["status_code"] == 404
+
+def test_batch_stop_on_error_skips_later_dependent_operations(client, workdir):
+    missing = os.path.join(workdir, "missing")
+    target = os.path.join(workdir, "moved")
+    operations = [
+        {"op": "move", "source_path": missing, "destination_path": target},
+        {"op": "delete", "path": target},
+    ]
+    data = _batch(client, operations, mode="stop_on_error")["data"]
+    assert [result["status"] for result in data["results"]] == ["failed", "skipped"]
+    assert [result["index"] for result in data["results"]] == [0, 1]
+
+def test_batch_copy_onto_itself_fails_without_data_loss(client, workdir):
+    path = os.path.join(workdir, "a.txt")
+    with open(path, "wb") as f:
+        f.write(b"keep me")
+    result = _batch(client, [{"op": "copy", "source_path": path, "destination_path": path}])
+    assert result["data"]["failed"] == 1
+    with open(path, "rb") as f:
+        assert f.read() == b"keep me"
\ No newline at end of file
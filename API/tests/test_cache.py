@@ -0,0 +1,69 @@
+import os
+import threading
+from app.services import cache_service
+from app.services.cache_service import ParseCache, decode
+
+def _cache(disk_dir=None) -> ParseCache:
+    return ParseCache(1024 * 1024, disk_dir, 1024 * 1024, 1)
+
+def test_memory_hit_is_not_affected_by_caller_mutation():
+    cache = _cache()
+    cache.store("key", {"rows": [{"a": 1}]})
+    first = decode(cache.get_memory("key"))
+    first["rows"][0]["a"] = 2
+    first["rows"].append({"a": 3})
+    assert decode(cache.get_memory("key")) == {"rows": [{"a": 1}]}
+
+def test_disk_tier_round_trip(workdir):
+    disk_dir = os.path.join(workdir, "cache")
+    cache = _cache(disk_dir)
+    assert cache.disk_dir == disk_dir
+    assert os.stat(disk_dir).st_mode & 0o777 == 0o700
+    cache.store("key", [1, 2, 3])
+    assert _cache(disk_dir).get_disk("key") == [1, 2, 3]
+
+def test_disk_tier_refuses_shared_directory(workdir):
+    disk_dir = os.path.join(workdir, "shared")
+    os.mkdir(disk_dir)
+    os.chmod(disk_dir, 0o777)
+    assert _cache(disk_dir).disk_dir is None
+
+def test_disk_tier_refuses_symlink(workdir):
+    target = os.path.join(workdir, "target")
+    os.mkdir(target, 0o700)
+    link = os.path.join(workdir, "link")
+    os.symlink(target, link)
+    assert _cache(link).disk_dir is None
+
+def test_disk_tier_tightens_readable_directory(workdir):
+    disk_dir = os.path.join(workdir, "readable")
+    os.mkdir(disk_dir)
+    os.chmod(disk_dir, 0o755)
+    assert _cache(disk_dir).disk_dir == disk_dir
+    assert os.stat(disk_dir).st_mode & 0o777 == 0o700
+
+def test_scan_read_is_served_from_cache(client, workdir):
+    path = os.path.join(workdir, "data.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("a,b\n1,2\n3,4\n")
+    before = client.get("/scan/cache/stats").json()["data"]
+    first = client.post("/scan/read/csv", json={"path": path}).json()["data"]
+    second = client.post("/scan/read/csv", json={"path": path}).json()["data"]
+    after = client.get("/scan/cache/stats").json()["data"]
+    assert first == second
+    assert after["memory_hits"] == before["memory_hits"] + 1
+
+def test_cache_key_is_computed_off_the_event_loop(client, workdir, monkeypatch):
+    path = os.path.join(workdir, "data.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("a,b\n1,2\n")
+    threads = []
+    make_key = cache_service.make_key
+
+    def recording_make_key(*args):
+        threads.append(threading.current_thread().name)
+        return make_key(*args)
+
+    monkeypatch.setattr(cache_service, "make_key", recording_make_key)
+    assert client.post("/scan/read/csv", json={"path": path}).status_code == 200
+    assert threads and all(name.startswith("io-pool") for name in threads)
\ No newline at end of file
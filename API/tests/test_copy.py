@@ -0,0 +1,65 @@
+import os
+import shutil
+import pytest
+from app.services import copy_service
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def _copy(client, **body):
+    return client.post("/files/copy", json=body)
+
+def test_copy_tree_then_skip_unchanged(client, workdir):
+    src, dst = os.path.join(workdir, "src"), os.path.join(workdir, "dst")
+    _write(os.path.join(src, "a.txt"), b"a" * 100)
+    _write(os.path.join(src, "sub", "b.txt"), b"b" * 10)
+    response = _copy(client, source_path=src, destination_path=dst)
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["files_copied"] == 2
+    assert _read(os.path.join(dst, "sub", "b.txt")) == b"b" * 10
+
+    # Chạy lại với skip: file đích giống nguồn (cùng size và mtime) không được chép lại
+    result = _copy(client, source_path=src, destination_path=dst, skip="size_mtime").json()["data"]
+    assert result["files_skipped"] == 2 and result["files_copied"] == 0
+
+def test_copy_resumes_from_part_file(workdir, monkeypatch):
+    monkeypatch.setattr(copy_service, "COPY_CHUNK_SIZE", 16)
+    src, dst = os.path.join(workdir, "big.bin"), os.path.join(workdir, "out.bin")
+    data = bytes(range(256)) * 4
+    _write(src, data)
+    _write(copy_service.part_path(dst), data[:300])
+
+    result = copy_service.copy_paths(src, dst, resume=True)
+    assert result["bytes_resumed"] == 300 and result["bytes_copied"] == len(data) - 300
+    assert _read(dst) == data
+    assert not os.path.exists(copy_service.part_path(dst))
+
+def test_copy_onto_itself_is_rejected(client, workdir):
+    path = os.path.join(workdir, "a.txt")
+    _write(path, b"keep me")
+    for destination in (path, workdir):
+        response = _copy(client, source_path=path, destination_path=destination)
+        assert response.status_code == 400
+    assert _read(path) == b"keep me"
+
+    src = os.path.join(workdir, "tree")
+    _write(os.path.join(src, "b.txt"), b"keep me too")
+    for destination in (src, os.path.join(src, "nested")):
+        response = _copy(client, source_path=src, destination_path=destination, resume=True)
+        assert response.status_code == 400
+    assert _read(os.path.join(src, "b.txt")) == b"keep me too"
+    assert os.listdir(src) == ["b.txt"]
+
+def test_copy_file_refuses_hard_link_of_source(workdir):
+    src, link = os.path.join(workdir, "a.txt"), os.path.join(workdir, "link.txt")
+    _write(src, b"keep me")
+    os.link(src, link)
+    with pytest.raises(shutil.SameFileError):
+        copy_service.copy_file(src, link, copy_service.CopyProgress())
+    assert _read(src) == b"keep me"
\ No newline at end of file
@@ -0,0 +1,9 @@
+import os
+
+def test_create_file(client, workdir):
+    path = os.path.join(workdir, "hello.txt")
+    response = client.post("/files/create/file", json={"path": path, "content": "xin chao"})
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "xin chao"
\ No newline at end of file
@@ -0,0 +1,33 @@
+import os
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from app.utils import dispatch
+
+class _BrokenExecutor:
+    def submit(self, *args):
+        raise BrokenProcessPool("worker died")
+
+def test_submit_releases_slot_when_retry_after_broken_pool_fails(monkeypatch):
+    pool = dispatch.WorkerPool("test", "process", 1, 10)
+    monkeypatch.setattr(pool, "_get_executor", lambda: _BrokenExecutor())
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os.getpid)
+    assert pool.stats()["in_flight"] == 0
+
+def test_thread_pool_runs_tasks():
+    pool = dispatch.WorkerPool("test", "thread", 2, 10)
+    try:
+        assert pool.submit(os.getpid).result(timeout=5) == os.getpid()
+        assert pool.stats()["in_flight"] == 0
+    finally:
+        pool.shutdown()
+
+@pytest.mark.parametrize("name", ["io", "exec"])
+def test_process_kind_rejected_for_io_and_exec(monkeypatch, name):
+    monkeypatch.setenv(f"{name.upper()}_POOL_KIND", "process")
+    with pytest.raises(ValueError):
+        dispatch._pool_config(name)
+
+def test_process_kind_allowed_for_cpu(monkeypatch):
+    monkeypatch.setenv("CPU_POOL_KIND", "process")
+    assert dispatch._pool_config("cpu")["kind"] == "process"
\ No newline at end of file
@@ -0,0 +1,68 @@
+import os
+import pytest
+from app.services import file_service
+
+DATA = bytes(range(256)) * 40
+
+@pytest.fixture
+def data_file(workdir):
+    path = os.path.join(workdir, "data.bin")
+    with open(path, "wb") as f:
+        f.write(DATA)
+    return path
+
+def test_download_full_file(client, data_file):
+    response = client.get("/files/download", params={"path": data_file})
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["content-length"] == str(len(DATA))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"]
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1000-", 1000, len(DATA) - 1),
+    ("bytes=-10", len(DATA) - 10, len(DATA) - 1),
+    ("bytes=5000-999999", 5000, len(DATA) - 1),
+])
+def test_download_range(client, data_file, header, start, end):
+    response = client.get("/files/download", params={"path": data_file}, headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == DATA[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DATA)}"
+
+def test_download_unsatisfiable_range(client, data_file):
+    response = client.get("/files/download", params={"path": data_file}, headers={"Range": f"bytes={len(DATA)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+def test_download_etag_and_if_range(client, data_file):
+    etag = client.head("/files/download", params={"path": data_file}).headers["etag"]
+    assert client.get("/files/download", params={"path": data_file},
+                      headers={"If-None-Match": etag}).status_code == 304
+
+    matching = client.get("/files/download", params={"path": data_file},
+                          headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert matching.status_code == 206 and matching.content == DATA[:10]
+    stale = client.get("/files/download", params={"path": data_file},
+                       headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and stale.content == DATA
+
+def test_download_head(client, data_file):
+    response = client.head("/files/download", params={"path": data_file}, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
+
+def test_download_has_distinct_operation_ids(client):
+    paths = client.get("/openapi.json").json()["paths"]["/files/download"]
+    assert set(paths) == {"get", "head"}
+    assert paths["get"]["operationId"] != paths["head"]["operationId"]
+
+def test_download_file_truncated_while_streaming(data_file):
+    chunks = file_service.iter_file_binary(data_file, chunk_size=4096)
+    first = next(chunks)
+    # Log bị rotate/cắt ngắn trong lúc đang tải: luồng dừng lại thay vì làm chết process
+    os.truncate(data_file, 0)
+    rest = b"".join(chunks)
+    assert first == DATA[:4096] and len(first) + len(rest) < len(DATA)
\ No newline at end of file
@@ -0,0 +1,34 @@
+import json
+
+def _batch(client, **body):
+    response = client.post("/exec/batch", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def test_batch_respects_concurrency(client):
+    result = _batch(client, commands=[{"command": "sleep 0.3"}] * 4, concurrency=2)
+    waits = sorted(item["wait"] for item in result["results"])
+    # Hai lệnh đầu chạy ngay, hai lệnh sau chờ tới khi có chỗ trống
+    assert waits[1] < 0.2 and waits[2] >= 0.25
+    assert [item["index"] for item in result["results"]] == [0, 1, 2, 3]
+    assert result["success"] is True
+
+def test_batch_item_timeout(client):
+    result = _batch(client, commands=[{"command": "sleep 5", "timeout": 1}, {"command": "echo ok"}])
+    slow, fast = result["results"]
+    assert slow["timed_out"] is True and slow["success"] is False and slow["duration"] < 3
+    assert fast["success"] is True and fast["stdout"].strip() == "ok"
+    assert result["success"] is False
+
+def test_batch_timeout_stops_queued_commands(client):
+    response = client.post("/exec/batch", json={"commands": [{"command": "sleep 5"}, {"command": "echo late"}],
+                                                 "concurrency": 1, "timeout": 0.5, "stream": True})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results = {line["index"]: line for line in lines if "index" in line}
+    assert results[0]["timed_out"] and results[1]["timed_out"]
+    assert "before the command started" in results[1]["stderr"]
+    assert lines[-1]["summary"]["timed_out"] == 2
+
+def test_batch_rejects_invalid_concurrency(client):
+    response = client.post("/exec/batch", json={"commands": [{"command": "true"}], "concurrency": 0})
+    assert response.status_code == 400
\ No newline at end of file
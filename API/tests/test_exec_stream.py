@@ -0,0 +1,27 @@
+import time
+import asyncio
+from app.services import exec_service
+
+async def _consume(command: str, timeout: int, delay: float = 0.0):
+    events = []
+    async for event in exec_service.stream_command(command, timeout=timeout):
+        events.append(event)
+        if delay and event["event"] == "stdout":
+            await asyncio.sleep(delay)
+    return events
+
+def test_stream_command_events(client):
+    events = asyncio.run(_consume("echo a; echo b 1>&2; exit 2", 10))
+    assert [e["data"] for e in events if e["event"] == "stdout"] == ["a"]
+    assert [e["data"] for e in events if e["event"] == "stderr"] == ["b"]
+    assert events[-1]["event"] == "exit" and events[-1]["return_code"] == 2
+
+def test_stream_timeout_with_slow_consumer(monkeypatch):
+    # Hàng đợi nhỏ luôn đầy khi client đọc chậm: timeout vẫn phải dừng process và kết thúc stream
+    monkeypatch.setattr(exec_service, "STREAM_QUEUE_SIZE", 2)
+    started = time.monotonic()
+    events = asyncio.run(asyncio.wait_for(_consume("yes | head -n 100000", 1, delay=0.01), 10))
+    assert time.monotonic() - started < 5
+    assert events[-1]["event"] == "exit"
+    assert events[-1]["timed_out"] is True and events[-1]["success"] is False
+    assert len(events) < 1000
\ No newline at end of file
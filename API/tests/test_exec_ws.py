@@ -0,0 +1,32 @@
+def _collect(websocket):
+    events = []
+    while True:
+        event = websocket.receive_json()
+        events.append(event)
+        if event["event"] in ("exit", "error"):
+            return events
+
+def test_exec_ws_streams_output_and_exit(client):
+    with client.websocket_connect("/exec/ws") as websocket:
+        websocket.send_json({"command": "echo hi; echo oops 1>&2; exit 3"})
+        events = _collect(websocket)
+    stdout = "".join(e["data"] for e in events if e["event"] == "stdout")
+    stderr = "".join(e["data"] for e in events if e["event"] == "stderr")
+    assert "hi" in stdout
+    assert "oops" in stderr
+    assert events[-1]["event"] == "exit"
+    assert events[-1]["return_code"] == 3
+
+def test_exec_ws_rejects_invalid_request(client):
+    with client.websocket_connect("/exec/ws") as websocket:
+        websocket.send_json({"timeout": "x"})
+        events = _collect(websocket)
+    assert events == [events[0]] and events[0]["event"] == "error"
+
+def test_exec_ws_does_not_leak_in_flight_gauge(client):
+    for _ in range(2):
+        with client.websocket_connect("/exec/ws") as websocket:
+            websocket.send_json({"command": "echo hi"})
+            _collect(websocket)
+    text = client.get("/metrics").text
+    assert "/exec/ws" not in text
\ No newline at end of file
@@ -0,0 +1,42 @@
+import os
+import hashlib
+import pytest
+from app.services import hash_service
+
+def _hash(client, path: str, **params):
+    response = client.get("/files/hash", params={"path": path, **params})
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def _write(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_hash_is_cached_until_file_changes(client, workdir):
+    path = os.path.join(workdir, "a.bin")
+    _write(path, b"first")
+    first = _hash(client, path)
+    assert first["digest"] == hashlib.sha256(b"first").hexdigest() and first["cached"] is False
+    second = _hash(client, path)
+    assert second["digest"] == first["digest"] and second["cached"] is True
+
+    # Nội dung mới (khác size/mtime) làm bản ghi cũ hết hiệu lực
+    _write(path, b"second!")
+    third = _hash(client, path)
+    assert third["digest"] == hashlib.sha256(b"second!").hexdigest() and third["cached"] is False
+    assert _hash(client, path, refresh="true")["cached"] is False
+
+def test_hash_cache_keeps_digest_across_rename(client, workdir):
+    path, renamed = os.path.join(workdir, "a.bin"), os.path.join(workdir, "b.bin")
+    _write(path, b"data")
+    _hash(client, path)
+    os.rename(path, renamed)
+    assert _hash(client, renamed)["cached"] is True
+
+def test_hash_cache_refuses_shared_directory(workdir):
+    shared = os.path.join(workdir, "shared")
+    os.mkdir(shared)
+    os.chmod(shared, 0o777)
+    cache = hash_service.HashCache(os.path.join(shared, "hashes.sqlite3"), 100)
+    with pytest.raises(PermissionError):
+        cache._db()
\ No newline at end of file
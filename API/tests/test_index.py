@@ -0,0 +1,72 @@
+import os
+import time
+import tempfile
+import pytest
+from app.services import index_service, file_service
+
+pytestmark = pytest.mark.skipif(not index_service.sys.platform.startswith("linux"), reason="inotify chỉ có trên Linux")
+
+def _wait(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+def _names(index, path: str):
+    rows = index.query_dir(path)
+    return None if rows is None else sorted(row["name"] for row in rows)
+
+@pytest.fixture
+def make_index(workdir):
+    db_path = os.path.join(tempfile.mkdtemp(), "index.sqlite3")
+    started = []
+
+    def make():
+        index = index_service.MetadataIndex(db_path, workdir, [], 30, True)
+        index.start()
+        started.append(index)
+        return index
+
+    yield make
+    for index in started:
+        index.stop()
+
+def test_index_follows_directory_rename(workdir, make_index):
+    os.makedirs(os.path.join(workdir, "sub", "inner"))
+    open(os.path.join(workdir, "sub", "a.txt"), "w").close()
+    index = make_index()
+    assert _wait(lambda: index.crawl_state["finished"] is not None)
+    old_path, new_path = os.path.join(workdir, "sub"), os.path.join(workdir, "moved")
+
+    os.rename(old_path, new_path)
+    assert _wait(lambda: _names(index, workdir) == ["moved"])
+    assert _wait(lambda: new_path in index._watched_paths)
+    assert not any(path == old_path or path.startswith(old_path + os.sep) for path in index._watched_paths)
+    assert _names(index, new_path) == ["a.txt", "inner"]
+
+    # Thư mục mới tạo lại ở đường dẫn cũ phải được theo dõi như bình thường
+    os.makedirs(old_path)
+    assert _wait(lambda: old_path in index._watched_paths)
+    open(os.path.join(old_path, "b.txt"), "w").close()
+    assert _wait(lambda: _names(index, old_path) == ["b.txt"])
+
+def test_index_single_writer(workdir, make_index, monkeypatch):
+    monkeypatch.setattr(index_service, "INDEX_ELECTION_INTERVAL", 0.05)
+    first = make_index()
+    second = make_index()
+    assert first.writer and not second.writer
+    assert second.query_dir(workdir, refresh=True) is None
+
+    first.stop()
+    assert _wait(lambda: second.writer)
+    assert second.query_dir(workdir, refresh=True) == []
+
+def test_index_info_matches_stat_info(workdir, make_index):
+    path = os.path.join(workdir, "a.txt")
+    with open(path, "wb") as f:
+        f.write(b"12345")
+    index = make_index()
+    assert _wait(lambda: index.crawl_state["finished"] is not None)
+    assert index.query_info(path) == file_service.info_from_stat(path, os.stat(path))
\ No newline at end of file
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import threading
+import time
+import pytest
+from app.services.job_service import JobManager
+
+def _manager(root: str) -> JobManager:
+    return JobManager(os.path.join(root, "jobs.sqlite3"), os.path.join(root, "jobs"), 2, 0.1, lease_seconds=30)
+
+def test_recover_leaves_jobs_of_live_workers_alone(workdir):
+    first, second = _manager(workdir), _manager(workdir)
+    copy_job = first.submit("copy", {"source": "/a", "destination": "/b"}, 0)
+    command_job = first.submit("command", {"command": "sleep 60"}, 0)
+    assert first._claim_next()["id"] == copy_job["id"]
+    assert first._claim_next()["id"] == command_job["id"]
+
+    # Worker thứ hai khởi động trong khi worker đầu vẫn gia hạn lease
+    second._recover()
+    assert second.get(copy_job["id"])["status"] == "running"
+    assert second.get(command_job["id"])["status"] == "running"
+    assert second.get(copy_job["id"])["owner"] == first.owner
+
+def test_recover_takes_over_jobs_with_expired_lease(workdir):
+    first, second = _manager(workdir), _manager(workdir)
+    copy_job = first.submit("copy", {"source": "/a", "destination": "/b"}, 0)
+    command_job = first.submit("command", {"command": "sleep 60"}, 0)
+    first._claim_next()
+    first._claim_next()
+    first._db().execute("UPDATE jobs SET heartbeat = heartbeat - 60")
+
+    second._recover()
+    assert second.get(copy_job["id"])["status"] == "queued"
+    assert second.get(command_job["id"])["status"] == "failed"
+    assert second._claim_next()["owner"] == second.owner
+
+    # Worker cũ chạy xong muộn không được ghi đè kết quả của job đã bị thu hồi
+    first._finish(copy_job["id"], "succeeded")
+    assert second.get(copy_job["id"])["status"] == "running"
+
+def test_heartbeat_stops_jobs_that_were_taken_over(workdir):
+    first, second = _manager(workdir), _manager(workdir)
+    job = first.submit("copy", {"source": "/a", "destination": "/b"}, 0)
+    first._claim_next()
+    event = first._running[job["id"]] = threading.Event()
+    first._db().execute("UPDATE jobs SET heartbeat = heartbeat - 60")
+    second._recover()
+
+    first._heartbeat()
+    assert event.is_set()
+
+def test_command_job_runs_to_completion(client):
+    job = client.post("/jobs/command", json={"command": "echo done"}).json()["data"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job['id']}").json()["data"]
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.1)
+    assert job["status"] == "succeeded"
+    output = client.get(f"/jobs/{job['id']}/output").json()["data"]
+    assert output["data"].strip() == "done"
+
+def test_manager_refuses_shared_state_directory(workdir):
+    shared = os.path.join(workdir, "shared")
+    os.mkdir(shared)
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        _manager(shared).start()
+
+def test_manager_refuses_foreign_database(workdir):
+    # Job do user khác đặt sẵn vào DB sẽ được chạy bằng shell, nên DB không thuộc server bị từ chối
+    target = os.path.join(workdir, "planted.sqlite3")
+    sqlite3.connect(target).close()
+    os.symlink(target, os.path.join(workdir, "jobs.sqlite3"))
+    with pytest.raises(PermissionError):
+        _manager(workdir).start()
+
+@pytest.mark.skipif(not hasattr(os, "getuid") or os.getuid() != 0, reason="cần root để đổi owner của file")
+def test_manager_refuses_database_owned_by_another_user(workdir):
+    path = os.path.join(workdir, "jobs.sqlite3")
+    sqlite3.connect(path).close()
+    os.chown(path, 65534, 65534)
+    with pytest.raises(PermissionError):
+        _manager(workdir).start()
+
+def test_manager_creates_private_state(workdir):
+    root = os.path.join(workdir, "state")
+    manager = _manager(root)
+    manager.submit("command", {"command": "true"}, 0)
+    assert os.stat(root).st_mode & 0o777 == 0o700
+    assert os.stat(os.path.join(root, "jobs")).st_mode & 0o777 == 0o700
\ No newline at end of file
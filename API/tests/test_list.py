@@ -0,0 +1,62 @@
+import os
+from app.services import file_service
+
+def _files(root: str, count: int):
+    for index in range(count):
+        with open(os.path.join(root, f"f{index:02d}.txt"), "wb") as f:
+            f.write(b"x" * index)
+
+def _page(client, **params):
+    response = client.get("/files/list", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def test_list_pages_cover_directory(client, workdir):
+    _files(workdir, 7)
+    names, cursor = [], None
+    while True:
+        params = dict(path=workdir, limit=3, sort="size", order="desc", fields="name")
+        if cursor:
+            params["cursor"] = cursor
+        page = _page(client, **params)
+        names += [item["name"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == [f"f{index:02d}.txt" for index in reversed(range(7))]
+
+def test_list_cursor_rejects_other_sort(client, workdir):
+    _files(workdir, 4)
+    cursor = _page(client, path=workdir, limit=2, sort="size")["next_cursor"]
+    response = client.get("/files/list", params=dict(path=workdir, limit=2, sort="name", cursor=cursor))
+    assert response.status_code == 400
+    response = client.get("/files/list", params=dict(path=workdir, limit=2, sort="size", order="desc", cursor=cursor))
+    assert response.status_code == 400
+    response = client.get("/files/list", params=dict(path=workdir, limit=2, cursor="bm90LWpzb24="))
+    assert response.status_code == 400
+
+def test_list_not_a_directory(client, workdir):
+    _files(workdir, 1)
+    response = client.get("/files/list", params=dict(path=os.path.join(workdir, "f00.txt")))
+    assert response.status_code == 400
+
+def test_list_skips_vanished_entry(workdir, monkeypatch):
+    _files(workdir, 3)
+    real_scandir = os.scandir
+
+    def scandir_then_delete(path):
+        # Xóa một entry sau khi scandir đã trả về nó
+        entries = list(real_scandir(path))
+        os.remove(os.path.join(workdir, "f01.txt"))
+        return _Entries(entries)
+
+    monkeypatch.setattr(file_service.os, "scandir", scandir_then_delete)
+    items = file_service.list_dir(workdir, fields=["name", "size"])
+    assert [item["name"] for item in items] == ["f00.txt", "f02.txt"]
+
+class _Entries(list):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
\ No newline at end of file
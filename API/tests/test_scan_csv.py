@@ -0,0 +1,60 @@
+import os
+import json
+import pytest
+
+def _csv(path: str, rows: int = 10):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,name,score\n")
+        for index in range(1, rows + 1):
+            score = "" if index == 5 else str(index * 10)
+            f.write(f"{index},row{index},{score}\n")
+
+def _read(client, **body):
+    response = client.post("/scan/read/csv", json=body)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+@pytest.mark.parametrize("engine", [None, "python", "pyarrow"])
+def test_csv_window(client, workdir, engine):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    page = _read(client, path=path, offset=3, limit=4, engine=engine)
+    assert [row["id"] for row in page["data"]] == [4, 5, 6, 7]
+    assert page["data"][1]["score"] is None
+    assert page["count"] == 4 and page["next_offset"] == 7
+
+    last = _read(client, path=path, offset=8, limit=4, engine=engine)
+    assert [row["id"] for row in last["data"]] == [9, 10]
+    assert last["next_offset"] is None
+
+@pytest.mark.parametrize("engine", [None, "pyarrow"])
+def test_csv_column_projection(client, workdir, engine):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    page = _read(client, path=path, columns=["score", "id"], limit=2, engine=engine)
+    # Cột giữ thứ tự như trong file
+    assert page["columns"] == ["id", "score"]
+    assert page["data"] == [{"id": 1, "score": 10}, {"id": 2, "score": 20}]
+
+    response = client.post("/scan/read/csv", json={"path": path, "columns": ["missing"]})
+    assert response.status_code == 400
+    response = client.post("/scan/read/csv", json={"path": path, "engine": "nope"})
+    assert response.status_code == 400
+
+def test_csv_stream_in_chunks(client, workdir):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    response = client.post("/scan/read/csv/stream", json={"path": path, "offset": 1, "limit": 7, "chunksize": 3,
+                                                          "columns": ["id"]})
+    assert response.status_code == 200
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"id": index} for index in range(2, 9)]
+
+def test_csv_profile(client, workdir):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    response = client.post("/scan/read/csv/profile", json={"path": path})
+    assert response.status_code == 200
+    profile = response.json()["data"]
+    assert profile["shape"] == [10, 3]
+    assert profile["null_counts"] == {"id": 0, "name": 0, "score": 1}
+    assert len(profile["head"]) == 5
\ No newline at end of file
@@ -0,0 +1,49 @@
+import io
+import os
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+def _csv(path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("id,name\n1,a\n2,b\n3,c\n")
+
+def test_arrow_from_accept_header(client, workdir):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    response = client.post("/scan/read/csv", json={"path": path, "limit": 2},
+                           headers={"Accept": "application/json;q=0.5, application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.to_pydict() == {"id": [1, 2], "name": ["a", "b"]}
+    info = json.loads(table.schema.metadata[b"remote-ops"])
+    assert info["next_offset"] == 2
+
+def test_parquet_from_format_field(client, workdir):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    response = client.post("/scan/read/csv", json={"path": path, "format": "parquet"},
+                           headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    assert pq.read_table(io.BytesIO(response.content)).to_pydict() == {"id": [1, 2, 3], "name": ["a", "b", "c"]}
+
+def test_columns_json_and_default_records(client, workdir):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    response = client.post("/scan/read/csv", json={"path": path}, headers={"Accept": "application/json; format=columns"})
+    assert response.json()["data"]["data"] == {"id": [1, 2, 3], "name": ["a", "b", "c"]}
+    response = client.post("/scan/read/csv", json={"path": path}, headers={"Accept": "text/html, */*"})
+    assert response.json()["data"]["data"][0] == {"id": 1, "name": "a"}
+
+def test_format_errors(client, workdir):
+    path = os.path.join(workdir, "data.csv")
+    _csv(path)
+    response = client.post("/scan/read/csv", json={"path": path, "format": "xml"})
+    assert response.status_code == 400
+    text_path = os.path.join(workdir, "notes.txt")
+    with open(text_path, "w", encoding="utf-8") as f:
+        f.write("hello")
+    response = client.post("/scan/read", json={"path": text_path, "format": "arrow"})
+    assert response.status_code == 406
\ No newline at end of file
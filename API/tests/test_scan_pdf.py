@@ -0,0 +1,34 @@
+import os
+import threading
+from PyPDF2 import PdfWriter
+from app.services import scan_service
+
+def _blank_pdf(path: str, pages: int):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+def test_pdf_reader_cache_is_per_thread(workdir):
+    first, second = os.path.join(workdir, "a.pdf"), os.path.join(workdir, "b.pdf")
+    _blank_pdf(first, 2)
+    _blank_pdf(second, 3)
+
+    readers = {}
+    barrier = threading.Barrier(2)
+
+    def read(name, path):
+        reader = scan_service._worker_pdf_reader(path)
+        barrier.wait()
+        # Thread kia đã mở file khác nhưng reader của thread này không bị thay
+        readers[name] = (reader, scan_service._worker_pdf_reader(path), len(reader.pages))
+
+    threads = [threading.Thread(target=read, args=("a", first)), threading.Thread(target=read, args=("b", second))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert readers["a"][0] is readers["a"][1] and readers["a"][2] == 2
+    assert readers["b"][0] is readers["b"][1] and readers["b"][2] == 3
\ No newline at end of file
@@ -0,0 +1,40 @@
+import os
+import json
+from app.services import file_service
+
+def _ndjson(response):
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_search_names(client, workdir):
+    for rel_path in ("a.log", "sub/b.log", "sub/c.txt", ".git/d.log"):
+        _write(os.path.join(workdir, rel_path), b"")
+    lines = _ndjson(client.get("/files/search/name", params={"path": workdir, "pattern": "*.log",
+                                                             "exclude": ".git", "fields": "path"}))
+    assert sorted(os.path.relpath(line["path"], workdir) for line in lines) == ["a.log", "sub/b.log"]
+
+def test_search_names_rejects_file_path(client, workdir):
+    _write(os.path.join(workdir, "a.log"), b"")
+    response = client.get("/files/search/name", params={"path": os.path.join(workdir, "a.log"), "pattern": "*"})
+    assert response.status_code == 400
+
+def test_search_content(client, workdir):
+    _write(os.path.join(workdir, "a.txt"), b"first\nneedle here\nlast\n")
+    _write(os.path.join(workdir, "b.bin"), b"\0needle")
+    lines = _ndjson(client.get("/files/search/content", params={"path": workdir, "query": "needle"}))
+    assert [(os.path.basename(line["path"]), line["line_number"], line["line"]) for line in lines] == \
+        [("a.txt", 2, "needle here")]
+
+def test_grep_line_numbers_across_read_blocks(workdir, monkeypatch):
+    path = os.path.join(workdir, "big.txt")
+    lines = [f"line {i}" + (" needle" if i % 7 == 0 else "") for i in range(1, 200)]
+    _write(path, "\n".join(lines).encode())
+    monkeypatch.setattr(file_service, "SEARCH_READ_BLOCK", 64)
+    results = file_service._grep_files([path], "needle", False, False, 1000, 1 << 20)
+    assert [result["line_number"] for result in results] == [i for i in range(1, 200) if i % 7 == 0]
+    assert all(result["line"] == lines[result["line_number"] - 1] for result in results)
\ No newline at end of file
@@ -0,0 +1,31 @@
+import pytest
+
+@pytest.fixture(params=["bash", "sh"])
+def session(client, request):
+    response = client.post("/exec/sessions", json={"shell_type": request.param})
+    assert response.status_code == 200, response.text
+    session_id = response.json()["data"]["session_id"]
+    yield session_id
+    client.delete(f"/exec/sessions/{session_id}")
+
+def _run(client, session_id, command, timeout=10):
+    response = client.post(f"/exec/sessions/{session_id}/run", json={"command": command, "timeout": timeout})
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+def test_session_keeps_shell_state(client, session):
+    _run(client, session, "cd /tmp && export RO_TEST=42")
+    result = _run(client, session, "echo \"$RO_TEST\" 'it'\"'\"'s'")
+    assert result["stdout"].strip() == "42 it's"
+    assert result["cwd"] == "/tmp"
+
+def test_session_heredoc(client, session):
+    result = _run(client, session, "cat <<'EOF'\nline $1\nEOF")
+    assert result["stdout"] == "line $1\n"
+
+@pytest.mark.parametrize("command", ["echo \"unterminated", "if then", "echo 'open", "{"])
+def test_session_syntax_error_returns_non_zero(client, session, command):
+    result = _run(client, session, command, timeout=5)
+    assert not result["timed_out"] and not result["closed"]
+    assert result["return_code"] != 0
+    assert _run(client, session, "echo still alive")["stdout"] == "still alive\n"
\ No newline at end of file
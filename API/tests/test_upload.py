@@ -0,0 +1,53 @@
+import os
+import hashlib
+import pytest
+from app.services import file_service
+from app.utils.common import ensure_private_dir
+
+def test_upload_stream(client, workdir):
+    path = os.path.join(workdir, "up.bin")
+    data = os.urandom(300000)
+    response = client.put("/files/upload", params={"path": path}, content=data,
+                          headers={"X-Content-SHA256": hashlib.sha256(data).hexdigest()})
+    assert response.status_code == 200, response.text
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+def test_upload_rejects_checksum_mismatch(client, workdir):
+    path = os.path.join(workdir, "bad.bin")
+    response = client.put("/files/upload", params={"path": path}, content=b"data",
+                          headers={"X-Content-SHA256": "0" * 64})
+    assert response.status_code == 400
+    assert not os.path.exists(path)
+
+def test_upload_session_resume(client, workdir):
+    path = os.path.join(workdir, "session.bin")
+    data = os.urandom(100000)
+    session = client.post("/files/upload/sessions", json={"path": path, "size": len(data)}).json()["data"]
+    session_id = session["id"]
+    assert client.put(f"/files/upload/sessions/{session_id}", params={"offset": 0},
+                      content=data[:40000]).status_code == 200
+    # Client mất kết nối rồi hỏi lại vị trí cần gửi tiếp
+    received = client.get(f"/files/upload/sessions/{session_id}").json()["data"]["received"]
+    assert received == 40000
+    assert client.put(f"/files/upload/sessions/{session_id}", params={"offset": received},
+                      content=data[received:]).status_code == 200
+    assert client.post(f"/files/upload/sessions/{session_id}/commit").status_code == 200
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+def test_upload_session_dir_is_private(client, workdir):
+    client.post("/files/upload/sessions", json={"path": os.path.join(workdir, "x.bin")})
+    assert os.stat(file_service.UPLOAD_SESSION_DIR).st_mode & 0o777 == 0o700
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_shared_state_dir_is_rejected(workdir):
+    shared = os.path.join(workdir, "shared")
+    os.mkdir(shared)
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        ensure_private_dir(shared)
+    link = os.path.join(workdir, "link")
+    os.symlink(workdir, link)
+    with pytest.raises(PermissionError):
+        ensure_private_dir(link)
\ No newline at end of file
@@ -0,0 +1,87 @@
+import os
+import json
+from app.services import file_service
+
+def _tree(root: str):
+    for rel_path, data in {"a.txt": b"12345", "sub/b.txt": b"123", "sub/deep/c.bin": b"1" * 10,
+                           "other/d.txt": b""}.items():
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+def _walk(client, **params):
+    response = client.get("/files/walk", params=params)
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+def test_walk_lists_every_entry(client, workdir):
+    _tree(workdir)
+    lines = _walk(client, path=workdir, fields="path,type,depth")
+    paths = {os.path.relpath(line["path"], workdir): line["depth"] for line in lines}
+    assert paths == {"a.txt": 1, "sub": 1, "other": 1, "sub/b.txt": 2, "sub/deep": 2, "other/d.txt": 2,
+                     "sub/deep/c.bin": 3}
+
+def test_walk_aggregate_totals(client, workdir):
+    _tree(workdir)
+    lines = _walk(client, path=workdir, aggregate="true", type="file")
+    totals = {os.path.relpath(line["path"], workdir): line for line in lines if "aggregate" in line}
+    assert len(lines) - len(totals) == 4
+    assert lines[-1]["path"] == workdir and lines[-1]["depth"] == 0
+    assert totals["."]["aggregate"] == {"files": 4, "directories": 3, "bytes": 18, "truncated": False}
+    assert totals["sub"]["aggregate"] == {"files": 2, "directories": 1, "bytes": 13, "truncated": False}
+    assert totals["sub/deep"]["aggregate"] == {"files": 1, "directories": 0, "bytes": 10, "truncated": False}
+
+def test_walk_aggregate_marks_max_depth_truncation(client, workdir):
+    _tree(workdir)
+    lines = _walk(client, path=workdir, aggregate="true", max_depth=2)
+    totals = {os.path.relpath(line["path"], workdir): line["aggregate"] for line in lines if "aggregate" in line}
+    assert totals["sub"] == {"files": 1, "directories": 1, "bytes": 3, "truncated": True}
+    assert totals["other"]["truncated"] is False
+    assert totals["."]["truncated"] is True
+
+def test_walk_aggregate_skipped_when_limited(client, workdir):
+    _tree(workdir)
+    lines = _walk(client, path=workdir, aggregate="true", limit=2)
+    assert len(lines) == 2 and not any("aggregate" in line for line in lines)
+
+def test_walk_stops_submitting_after_limit(workdir):
+    for index in range(50):
+        os.makedirs(os.path.join(workdir, f"d{index:02d}", "inner"))
+    lines = list(file_service.walk_tree(workdir, fields=["path"], limit=3, workers=4))
+    assert len(lines) == 3
+
+def test_walk_rejects_file_path(client, workdir):
+    _tree(workdir)
+    response = client.get("/files/walk", params={"path": os.path.join(workdir, "a.txt")})
+    assert response.status_code == 400
+
+def test_walk_stat_error_does_not_abort_directory(workdir, monkeypatch):
+    _tree(workdir)
+    broken = os.path.join(workdir, "sub")
+
+    class BrokenEntry:
+        def __init__(self, entry):
+            self._entry = entry
+        def __getattr__(self, name):
+            return getattr(self._entry, name)
+        def stat(self, follow_symlinks=True):
+            if self._entry.path == broken and follow_symlinks:
+                raise OSError("stat failed")
+            return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    real_scandir = os.scandir
+
+    class Scandir:
+        def __init__(self, path):
+            self._it = real_scandir(path)
+        def __enter__(self):
+            return (BrokenEntry(entry) for entry in self._it)
+        def __exit__(self, *exc):
+            self._it.close()
+
+    monkeypatch.setattr(file_service.os, "scandir", Scandir)
+    lines = list(file_service.walk_tree(workdir, fields=["path"], follow_symlinks=True))
+    paths = {os.path.relpath(line["path"], workdir) for line in lines}
+    assert {"a.txt", "other", "other/d.txt"} <= paths
+    assert any(line.get("error") and line["path"] == broken for line in lines)
\ No newline at end of file